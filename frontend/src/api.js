@@ -12,5 +12,32 @@
     return config;
   });
 
+  // Media files are opened by the browser itself, which cannot send the token
+  // header, so open them through a short-lived signed link issued per file
+  export const openMedia = async (url) => {
+    if (!url || !url.includes("/media/")) {
+      window.open(url, "_blank", "noopener,noreferrer");
+      return;
+    }
+    // Open the window now: browsers block windows opened after an await
+    const win = window.open("", "_blank");
+    if (win) {
+      win.opener = null;
+    }
+    try {
+      const response = await API.post("media-link/", { url });
+      if (win) {
+        win.location.href = response.data.url;
+      } else {
+        window.location.href = response.data.url;
+      }
+    } catch (error) {
+      if (win) {
+        win.close();
+      }
+      alert(error.response?.data?.error || "Could not open the file");
+    }
+  };
+
   export default API;
 
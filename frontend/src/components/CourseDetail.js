@@ -1,6 +1,6 @@
 ﻿import React, { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
-import API from "../api";
+import API, { openMedia } from "../api";
 import "./CourseDetail.css";
 
 function CourseDetail() {
@@ -216,13 +216,19 @@ function CourseDetail() {
     }
   };
 
-  const enrollCourse = async () => {
+  // Paid courses go through checkout, which records the payment and the enrollment together
+  const enrollCourse = async (phoneNumber) => {
     setEnrolling(true);
     try {
-      const response = await API.post("/enrollment/enroll_course/", {
-        course_id: id,
-        status: "active",
-      });
+      const response = phoneNumber
+        ? await API.post("/enrollment/checkout/", {
+            course_id: id,
+            phone_number: phoneNumber,
+          })
+        : await API.post("/enrollment/enroll_course/", {
+            course_id: id,
+            status: "active",
+          });
       setIsEnrolled(true);
       setError(null);
       setShowPaymentModal(false);
@@ -259,13 +265,7 @@ function CourseDetail() {
     setPaymentProcessing(true);
     try {
 
-      const paymentResponse = await API.post("/payment/", {
-        course: course.id,
-        amount: parseFloat(course.price),
-        payment_status: "completed",
-      });
-      
-      await enrollCourse();
+      await enrollCourse(paymentDetails.easypaisaNumber);
     } catch (error) {
       setError(
         error.response?.data?.error ||
@@ -1511,7 +1511,7 @@ function CourseDetail() {
                                           {lesson.files.map((file) => (
                                             <div key={file.id} className="file-item">
                                               {isTeacher || isEnrolled ? (
-                                                <a href={file.file_url} target="_blank" rel="noopener noreferrer" className="btn-outline-secondary">
+                                                <a href={file.file_url} onClick={(e) => { e.preventDefault(); openMedia(file.file_url); }} target="_blank" rel="noopener noreferrer" className="btn-outline-secondary">
                                                   <svg className="file-icon" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" aria-hidden="true" focusable="false">
                                                     <path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8l-6-6zM13 3.5L18.5 9H13V3.5zM12 13v4h-2v-4H7l5-5 5 5h-4z" />
                                                   </svg>
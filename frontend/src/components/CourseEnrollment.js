@@ -202,16 +202,10 @@ function CourseEnrollment() {
 
     try {
      
-      const paymentResponse = await API.post("/payment/", {
-        course: selectedCourse.id,
-        amount: parseFloat(selectedCourse.price),
-        payment_method: paymentDetails.method === "credit-card" ? "Credit Card" : paymentDetails.method === "easypaisa" ? "Easypaisa" : "Bank Transfer",
-        payment_status: "completed"
-      });
-
-      await API.post("/enrollment/enroll_course/", {
+      // Payment, enrollment and OTP consumption happen in one server-side transaction
+      await API.post("/enrollment/checkout/", {
         course_id: selectedCourse.id,
-        status: "active",
+        phone_number: paymentDetails.easypaisaNumber,
       });
 
       setEnrolledCourses([...enrolledCourses, selectedCourse.id]);
@@ -18,7 +18,7 @@ function Dashboard({ user, setUser }) {
     is_available: true,
   });
   const [categories, setCategories] = useState([]);
-  const [allEnrollments, setAllEnrollments] = useState([]); // For teacher stats
+  const [teacherAnalytics, setTeacherAnalytics] = useState(null); // For teacher stats
   const [showEditModal, setShowEditModal] = useState(false);
   const [editFormData, setEditFormData] = useState({
     qualification: "",
@@ -45,8 +45,8 @@ function Dashboard({ user, setUser }) {
           const categoryResponse = await API.get("/category/");
           setCategories(categoryResponse.data);
           
-          const allEnrollmentsResponse = await API.get("/enrollment/");
-          setAllEnrollments(allEnrollmentsResponse.data);
+          const analyticsResponse = await API.get(`/teacher/${user.profile.id}/analytics/`);
+          setTeacherAnalytics(analyticsResponse.data);
         }
         setLoading(false);
       } catch (error) {
@@ -281,15 +281,8 @@ function Dashboard({ user, setUser }) {
     const totalCourses = courses.length;
     const availableCourses = courses.filter(course => course.is_available).length;
     
-    // Count total enrollments in teacher's courses
-    const courseIds = new Set(courses.map(c => c.id));
-    let totalEnrollments = 0;
-    
-    allEnrollments.forEach(enrollment => {
-      if (courseIds.has(enrollment.course)) {
-        totalEnrollments++;
-      }
-    });
+    // Total enrollments in teacher's courses, from the analytics rollup
+    const totalEnrollments = teacherAnalytics ? teacherAnalytics.totals.enrollments : 0;
     
     return {
       totalCourses,
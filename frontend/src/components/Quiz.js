@@ -76,55 +76,24 @@ function Quiz() {
     setSubmitted(true);
 
     try {
-      
-      let score = 0;
-      let totalMarks = 0;
-
-      questions.forEach((question) => {
-        totalMarks += question.marks; 
-        const selectedAnswerId = answers[question.id];
-        const selectedAnswer = question.answers?.find((ans) => ans.id === selectedAnswerId);
-
-        if (selectedAnswer?.is_correct) {
-          score += question.marks; 
-        }
+      const response = await API.post(`/quiz/${id}/submit/`, {
+        answers: Object.values(answers),
       });
-
-      const percentage = totalMarks > 0 ? (score / totalMarks) * 100 : 0;
-      let grade = "F";
-      if (percentage >= 90) grade = "A";
-      else if (percentage >= 80) grade = "B";
-      else if (percentage >= 70) grade = "C";
-      else if (percentage >= 60) grade = "D";
-      else if (percentage >= 50) grade = "E";
-
-      // Marks obtained should be proportional to total quiz marks
-      const marksObtained = (score / totalMarks) * quiz.total_marks;
+      const grading = response.data;
 
       setResult({
-        score: score,
-        totalMarks: totalMarks,
-        marksEarned: marksObtained.toFixed(2),
-        quizTotalMarks: quiz.total_marks,
-        percentage: percentage.toFixed(2),
-        grade: grade,
+        score: grading.score,
+        totalMarks: grading.total_marks,
+        marksEarned: grading.marks_obtained.toFixed(2),
+        quizTotalMarks: grading.quiz_total_marks,
+        percentage: grading.percentage.toFixed(2),
+        grade: grading.grade,
+        questions: grading.questions,
+        attemptsLeft: grading.attempts_left,
       });
-
-      if (user && user.profile && user.profile.id) {
-        try {
-          const resultPayload = {
-            quiz: id,
-            student: user.profile.id,
-            score: marksObtained.toFixed(2),
-            grade_awarded: grade,
-          };
-          const resultResponse = await API.post("/result/", resultPayload);
-        } catch (error) {
-        
-        }
-      }
     } catch (error) {
-      alert("Failed to submit quiz. Please try again.");
+      setSubmitted(false);
+      alert(error.response?.data?.error || "Failed to submit quiz. Please try again.");
     }
   };
 
@@ -285,17 +254,25 @@ function Quiz() {
                 <hr />
 
                 <h5 className="mt-4 mb-3">Answer Summary</h5>
+                {result.attemptsLeft > 0 && (
+                  <p className="text-muted">
+                    {result.attemptsLeft} attempt{result.attemptsLeft === 1 ? "" : "s"} left. The correct answers are shown after your last attempt.
+                  </p>
+                )}
                 <div className="answers-summary">
                   {questions.map((question, index) => {
+                    const grading = result.questions?.find(
+                      (q) => q.question === question.id
+                    );
                     const selectedAnswerId = answers[question.id];
                     const selectedAnswer = question.answers?.find(
                       (ans) => ans.id === selectedAnswerId
                     );
                     const correctAnswer = question.answers?.find(
-                      (ans) => ans.is_correct
+                      (ans) => grading?.correct_answers?.includes(ans.id)
                     );
-                    const isCorrect = selectedAnswer?.is_correct;
-                    const marksAwarded = isCorrect ? question.marks : 0;
+                    const isCorrect = grading?.is_correct;
+                    const marksAwarded = grading ? grading.marks_awarded : 0;
 
                     return (
                       <div key={question.id} className="summary-item">
@@ -311,7 +288,7 @@ function Quiz() {
                           <p>
                             <strong>Your Answer:</strong> {selectedAnswer?.text || "Not answered"}
                           </p>
-                          {!isCorrect && (
+                          {!isCorrect && correctAnswer && (
                             <p>
                               <strong>Correct Answer:</strong> {correctAnswer?.text}
                             </p>
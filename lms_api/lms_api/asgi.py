@@ -3,5 +3,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms_api.settings')
+# Hot reads are served by async views (main.async_views) under ASGI
+os.environ.setdefault('LMS_ASYNC_READ_VIEWS', 'true')
+# Each ASGI request runs its ORM calls on a thread of its own, so connections
+# cannot be reused across requests; persistent connections would only leak
+os.environ.setdefault('LMS_DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -1,4 +1,6 @@
+import os
 from pathlib import Path
+from corsheaders.defaults import default_headers
  
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -26,9 +28,13 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3001",  
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'main.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,14 +62,75 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'lms_api.wsgi.application'
 
+# SQLite connection setup, run on every new connection. busy_timeout makes
+# a blocked writer wait for the lock instead of failing with "database is
+# locked", and IMMEDIATE transactions take the write lock when they begin,
+# so two transactions that read before writing cannot deadlock on upgrading
+# their locks. Set a LMS_SQLITE_* variable to an empty string to leave that
+# pragma at SQLite's default.
+#
+# Deployments should set LMS_SQLITE_JOURNAL_MODE=WAL, which lets readers work
+# alongside a writer (and makes synchronous=NORMAL safe). WAL is recorded in
+# the database file itself, so it is opt-in: otherwise any manage.py run
+# would rewrite the header of the db.sqlite3 checked into the repository.
+SQLITE_JOURNAL_MODE = os.environ.get('LMS_SQLITE_JOURNAL_MODE', '')
+SQLITE_PRAGMAS = {
+    'journal_mode': SQLITE_JOURNAL_MODE,
+    'synchronous': os.environ.get(
+        'LMS_SQLITE_SYNCHRONOUS', 'NORMAL' if SQLITE_JOURNAL_MODE.upper() == 'WAL' else ''
+    ),
+    'busy_timeout': os.environ.get('LMS_SQLITE_BUSY_TIMEOUT_MS', '5000'),
+    'mmap_size': os.environ.get('LMS_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+    # Negative sizes are in KiB: 64 MiB of page cache per connection
+    'cache_size': os.environ.get('LMS_SQLITE_CACHE_SIZE', '-65536'),
+    'temp_store': os.environ.get('LMS_SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('LMS_SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items() if value),
+            'transaction_mode': os.environ.get('LMS_SQLITE_TRANSACTION_MODE', 'IMMEDIATE') or None,
+        },
+        # Keep connections open between requests instead of reconnecting (and
+        # re-running the pragmas) every time; 0 closes them after each request
+        'CONN_MAX_AGE': int(os.environ.get('LMS_DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
-   
 }
 
+# Read replicas: LMS_SQLITE_REPLICA_PATHS is a comma separated list of SQLite
+# files (e.g. copies kept in sync by litestream or a periodic backup) opened
+# read-only as replica_1, replica_2, ... Other backends can add aliases to
+# DATABASES and REPLICA_DATABASES directly. main.db_router sends reads of
+# safe requests there; run check_replicas periodically to feed it health and
+# lag hints (through the cache, so use LMS_CACHE_BACKEND=file with several workers).
+REPLICA_DATABASES = []
+for number, path in enumerate(filter(None, os.environ.get('LMS_SQLITE_REPLICA_PATHS', '').split(',')), 1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': f'file:{path.strip()}?mode=ro',
+        'OPTIONS': {
+            # The replica's journal mode belongs to whatever keeps it in sync
+            'init_command': ';'.join(
+                f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items() if value and name != 'journal_mode'
+            ),
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['main.db_router.ReplicaRouter']
+# After a write, the same client reads from the primary for this long
+REPLICA_PIN_SECONDS = int(os.environ.get('LMS_REPLICA_PIN_SECONDS', 5))
+# Replicas reported further behind than this are not read from
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('LMS_REPLICA_MAX_LAG_SECONDS', 10))
+# How long a check_replicas report stays valid; without one a replica is assumed healthy
+REPLICA_HINT_TTL = int(os.environ.get('LMS_REPLICA_HINT_TTL', 60))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -81,16 +148,92 @@ AUTH_PASSWORD_VALIDATORS = [
 LOGIN_REDIRECT_URL = '/api/course/'
 LOGOUT_REDIRECT_URL = '/api/auth/login/'
 
+# Token buckets for the unauthenticated endpoints (main.throttling), as
+# '<burst>/<period>'; override one with LMS_THROTTLE_<SCOPE>=<rate> or 'off'
+THROTTLE_RATES = {
+    'login': '20/min',
+    'login_username': '5/min',
+    'register': '10/hour',
+    'otp_send': '10/hour',
+    'otp_send_phone': '3/10min',
+    'otp_verify': '30/min',
+    'otp_verify_phone': '5/min',
+}
+THROTTLE_RATES = {scope: os.environ.get(f'LMS_THROTTLE_{scope.upper()}', rate) for scope, rate in THROTTLE_RATES.items()}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'main.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'main.pagination.StableCursorPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_THROTTLE_RATES': {
+        scope: None if rate == 'off' else rate
+        for scope, rate in THROTTLE_RATES.items()
+    },
+    # Client address is REMOTE_ADDR unless LMS_NUM_PROXIES trusted proxies add X-Forwarded-For
+    'NUM_PROXIES': int(os.environ.get('LMS_NUM_PROXIES', 0)),
+}
+
+# Keep returning plain unpaginated arrays unless the client sends ?cursor= or
+# ?page_size=, until the frontend has migrated to paginated responses
+LEGACY_UNPAGINATED_LISTS = os.environ.get('LMS_LEGACY_UNPAGINATED_LISTS', 'true').lower() in ('1', 'true', 'yes')
+
+# Set LMS_CACHE_BACKEND=file to share cached responses and version keys
+# between worker processes on one host
+if os.environ.get('LMS_CACHE_BACKEND', 'locmem') == 'file':
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('LMS_CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+else:
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lms-default',
+    }
+
+CACHES = {
+    'default': DEFAULT_CACHE,
+    # Token -> (user, role, profile id) used by CachedTokenAuthentication; shared
+    # between workers when LMS_CACHE_BACKEND=file, so a logout or revoked token
+    # is dropped from every worker at once
+    'auth': {
+        **DEFAULT_CACHE,
+        'LOCATION': DEFAULT_CACHE['LOCATION'] + '-auth',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Stored responses and in-flight locks for Idempotency-Key (main.idempotency);
+    # shared between workers when LMS_CACHE_BACKEND=file
+    'idempotency': {
+        **DEFAULT_CACHE,
+        'LOCATION': DEFAULT_CACHE['LOCATION'] + '-idempotency',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
 }
 
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('LMS_IDEMPOTENCY_TTL_SECONDS', 86400))
+# A repeat waits this long for the first request with the same key to finish
+IDEMPOTENCY_WAIT_SECONDS = int(os.environ.get('LMS_IDEMPOTENCY_WAIT_SECONDS', 10))
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('LMS_IDEMPOTENCY_LOCK_SECONDS', 30))
+
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('LMS_AUTH_TOKEN_CACHE_TIMEOUT', 300))
+# Tokens expire this long after their last use; use refreshes them at most
+# once per AUTH_TOKEN_REFRESH_MINUTES. Purge expired ones with purge_expired_credentials.
+AUTH_TOKEN_TTL_HOURS = int(os.environ.get('LMS_AUTH_TOKEN_TTL_HOURS', 168))
+AUTH_TOKEN_REFRESH_MINUTES = int(os.environ.get('LMS_AUTH_TOKEN_REFRESH_MINUTES', 60))
+
+# Serve the hot read endpoints (course list/detail, lesson list, questions, me/)
+# from async views using the async ORM and cache; asgi.py turns this on
+ASYNC_READ_VIEWS = os.environ.get('LMS_ASYNC_READ_VIEWS', 'false').lower() in ('1', 'true', 'yes')
+
+RESPONSE_CACHE_ENABLED = os.environ.get('LMS_RESPONSE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('LMS_RESPONSE_CACHE_TIMEOUT', 300))
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -105,8 +248,50 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # Uploaded lesson files, resources and submissions, stored once per distinct content
+    'blobs': {'BACKEND': 'main.blob_store.ContentAddressedStorage'},
+}
+
+# Media serving: leave MEDIA_ACCEL unset to stream from Django, or set it to
+# 'x-accel-redirect' (nginx, internal location at MEDIA_ACCEL_PREFIX) or
+# 'x-sendfile' (Apache mod_xsendfile) to let the front server send the bytes
+MEDIA_ACCEL = os.environ.get('LMS_MEDIA_ACCEL') or None
+MEDIA_ACCEL_PREFIX = os.environ.get('LMS_MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_ACCESS_CACHE_TIMEOUT = int(os.environ.get('LMS_MEDIA_ACCESS_CACHE_TIMEOUT', 60))
+# Lifetime of the signed links media files are opened with (main.views.MediaLinkView)
+MEDIA_LINK_MAX_AGE = int(os.environ.get('LMS_MEDIA_LINK_MAX_AGE', 600))
+
+# Chunked uploads (/api/upload/sessions/)
+CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get('LMS_CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 ** 3))
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = int(os.environ.get('LMS_CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 ** 2))
+
+# Rows accepted by one bulk enrollment request (/api/enrollment/bulk/)
+BULK_ENROLL_MAX_ROWS = int(os.environ.get('LMS_BULK_ENROLL_MAX_ROWS', 20000))
+
+# Attempts a student gets at each quiz; the correct answers are only shown
+# after the last one. 0 allows unlimited attempts and never shows them.
+QUIZ_MAX_ATTEMPTS = int(os.environ.get('LMS_QUIZ_MAX_ATTEMPTS', 3))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Console output for development
+EMAIL_BACKEND = os.environ.get('LMS_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')  # Console output for development
+EMAIL_HOST = os.environ.get('LMS_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('LMS_EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('LMS_EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('LMS_EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('LMS_EMAIL_USE_TLS', 'false').lower() in ('1', 'true', 'yes')
+EMAIL_TIMEOUT = int(os.environ.get('LMS_EMAIL_TIMEOUT', 10))
+
+# OTP and other transactional mail is sent by an in-process worker pool after
+# the request's transaction commits; set LMS_MAIL_QUEUE_ENABLED=false to send inline
+MAIL_QUEUE_ENABLED = os.environ.get('LMS_MAIL_QUEUE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+MAIL_QUEUE_WORKERS = int(os.environ.get('LMS_MAIL_QUEUE_WORKERS', 2))
+MAIL_QUEUE_BATCH_SIZE = int(os.environ.get('LMS_MAIL_QUEUE_BATCH_SIZE', 20))
+MAIL_QUEUE_MAX_RETRIES = int(os.environ.get('LMS_MAIL_QUEUE_MAX_RETRIES', 3))
+MAIL_QUEUE_RETRY_BACKOFF = float(os.environ.get('LMS_MAIL_QUEUE_RETRY_BACKOFF', 1.0))
+MAIL_QUEUE_IDLE_TIMEOUT = int(os.environ.get('LMS_MAIL_QUEUE_IDLE_TIMEOUT', 30))
 
 DEFAULT_FROM_EMAIL = 'noreply@lms.com'
\ No newline at end of file
@@ -1,16 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from main.views import MediaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('main.urls')),
+    # Media goes through an access-checked view in every environment; see MEDIA_ACCEL to offload transfers
+    path(settings.MEDIA_URL.lstrip('/') + '<path:name>', MediaView.as_view(), name='media'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
 
 
 
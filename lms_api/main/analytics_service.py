@@ -0,0 +1,176 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from .models import Course, Enrollment, Payment, Result, Feedback, Quiz, CourseStats, CourseDailyStats
+
+COUNTER_FIELDS = ('enrollments', 'payments', 'revenue', 'results', 'score_sum', 'percentage_sum', 'feedbacks', 'rating_sum')
+
+# Payments that count towards revenue
+REVENUE_STATUSES = ('completed',)
+
+
+def _percentage(score, total_marks):
+    return score / total_marks * 100 if total_marks else 0.0
+
+
+def contribution(instance):
+    """
+    Return (course id, date, counter deltas) that a row adds to the rollups,
+    or None if it does not count towards any course.
+    """
+    if isinstance(instance, Enrollment):
+        return instance.course_id, instance.enrollment_date, {'enrollments': 1}
+
+    if isinstance(instance, Payment):
+        if instance.payment_status not in REVENUE_STATUSES:
+            return None
+        return instance.course_id, instance.payment_date, {'payments': 1, 'revenue': Decimal(str(instance.amount))}
+
+    if isinstance(instance, Result):
+        quiz = Quiz.objects.filter(id=instance.quiz_id).values('lesson_category__course_id', 'total_marks').first()
+        if not quiz or quiz['lesson_category__course_id'] is None:
+            return None
+        return quiz['lesson_category__course_id'], timezone.localdate(instance.created_at), {
+            'results': 1,
+            'score_sum': instance.score,
+            'percentage_sum': _percentage(instance.score, quiz['total_marks']),
+        }
+
+    if isinstance(instance, Feedback):
+        return instance.course_id, timezone.localdate(instance.created_at), {'feedbacks': 1, 'rating_sum': instance.rating}
+
+    return None
+
+
+def _bump(model, lookup, deltas, create):
+    updated = model.objects.filter(**lookup).update(**{field: F(field) + value for field, value in deltas.items()})
+    if updated or not create:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**lookup).update(**{field: F(field) + value for field, value in deltas.items()})
+
+
+def apply_contribution(entry, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) a row's contribution to the course total
+    and to its day. Removing never creates rows, so deletes cascading from a
+    course that is itself being deleted leave nothing behind.
+    """
+    if entry is None:
+        return
+    course_id, date, deltas = entry
+    if sign < 0:
+        deltas = {field: -value for field, value in deltas.items()}
+    _bump(CourseStats, {'course_id': course_id}, deltas, create=sign > 0)
+    _bump(CourseDailyStats, {'course_id': course_id, 'date': date}, deltas, create=sign > 0)
+
+
+def rebuild_course_stats():
+    """Recompute both rollup tables from the source rows with grouped aggregates"""
+    daily = defaultdict(lambda: defaultdict(int))
+
+    for row in Enrollment.objects.values('course_id', 'enrollment_date').annotate(n=Count('id')):
+        daily[row['course_id'], row['enrollment_date']]['enrollments'] += row['n']
+
+    payments = Payment.objects.filter(payment_status__in=REVENUE_STATUSES)
+    for row in payments.values('course_id', 'payment_date').annotate(n=Count('id'), total=Sum('amount')):
+        bucket = daily[row['course_id'], row['payment_date']]
+        bucket['payments'] += row['n']
+        bucket['revenue'] += row['total'] or Decimal('0')
+
+    results = Result.objects.filter(quiz__lesson_category__isnull=False).values_list(
+        'quiz__lesson_category__course_id', 'created_at', 'score', 'quiz__total_marks'
+    )
+    for course_id, created_at, score, total_marks in results.iterator():
+        bucket = daily[course_id, timezone.localdate(created_at)]
+        bucket['results'] += 1
+        bucket['score_sum'] += score
+        bucket['percentage_sum'] += _percentage(score, total_marks)
+
+    for course_id, created_at, rating in Feedback.objects.values_list('course_id', 'created_at', 'rating').iterator():
+        bucket = daily[course_id, timezone.localdate(created_at)]
+        bucket['feedbacks'] += 1
+        bucket['rating_sum'] += rating
+
+    totals = defaultdict(lambda: defaultdict(int))
+    for (course_id, _), counters in daily.items():
+        for field, value in counters.items():
+            totals[course_id][field] += value
+
+    with transaction.atomic():
+        CourseDailyStats.objects.all().delete()
+        CourseStats.objects.all().delete()
+        CourseDailyStats.objects.bulk_create(
+            (CourseDailyStats(course_id=course_id, date=date, **counters)
+             for (course_id, date), counters in daily.items()),
+            batch_size=1000
+        )
+        CourseStats.objects.bulk_create(
+            (CourseStats(course_id=course_id, **counters) for course_id, counters in totals.items()),
+            batch_size=1000
+        )
+    return len(totals), len(daily)
+
+
+def _averages(counters):
+    results, feedbacks = counters['results'], counters['feedbacks']
+    return {
+        'enrollments': counters['enrollments'],
+        'payments': counters['payments'],
+        'revenue': str(Decimal(counters['revenue'] or 0).quantize(Decimal('0.01'))),
+        'results': results,
+        'average_score': round(counters['score_sum'] / results, 2) if results else None,
+        'average_percentage': round(counters['percentage_sum'] / results, 2) if results else None,
+        'feedbacks': feedbacks,
+        'average_rating': round(counters['rating_sum'] / feedbacks, 2) if feedbacks else None,
+    }
+
+
+def teacher_analytics(teacher, days=30):
+    """
+    Per-course figures and a daily series for one teacher, read from the
+    rollups in two queries whatever the number of enrollments, payments,
+    results and feedback rows.
+    """
+    courses = Course.objects.filter(teacher=teacher).select_related('stats').order_by('id')
+    zero = dict.fromkeys(COUNTER_FIELDS, 0)
+
+    course_rows = []
+    totals = defaultdict(int)
+    for course in courses:
+        stats = getattr(course, 'stats', None)
+        counters = {field: getattr(stats, field) for field in COUNTER_FIELDS} if stats else zero
+        for field in COUNTER_FIELDS:
+            totals[field] += counters[field]
+        course_rows.append({
+            'course_id': course.id,
+            'code': course.code,
+            'title': course.title,
+            'is_available': course.is_available,
+            **_averages(counters),
+        })
+
+    since = timezone.localdate() - timedelta(days=days - 1)
+    series = (
+        CourseDailyStats.objects.filter(course__teacher=teacher, date__gte=since)
+        .values('date')
+        .annotate(**{f'total_{field}': Sum(field) for field in COUNTER_FIELDS})
+        .order_by('date')
+    )
+
+    return {
+        'teacher': teacher.id,
+        'totals': {'courses': len(course_rows), **_averages({**zero, **totals})},
+        'courses': course_rows,
+        'series': [
+            {'date': row['date'], **_averages({field: row[f'total_{field}'] for field in COUNTER_FIELDS})}
+            for row in series
+        ],
+    }
@@ -0,0 +1,185 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from .authentication import aauthenticate, describe_user
+from .db_router import pin_to_primary, recently_changed
+from .models import Course, Lesson, Question, Quiz
+from .permissions import OWNER_PATHS
+from .response_cache import (
+    aresource_versions, record_cache_event, response_cache_key, response_validators, set_validators
+)
+from .serializers import CourseSerializer, LessonSerializer, QuestionSerializer, StudentQuestionSerializer
+from .views import CourseViewSet, LessonViewSet, QuestionViewSet, CurrentUserView
+
+# Query parameters that opt a list into cursor pagination (see StableCursorPagination)
+PAGINATION_PARAMS = ('cursor', 'page_size')
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json', headers=headers)
+
+
+def error_response(exc):
+    headers = {'WWW-Authenticate': 'Token'} if exc.status_code == 401 else None
+    return json_response({'detail': exc.detail}, status=exc.status_code, headers=headers)
+
+
+def viewset_view(viewset, basename, actions, detail):
+    """The view function the router would build for these actions of a viewset"""
+    return viewset.as_view(actions, basename=basename, detail=detail)
+
+
+def async_read_view(fallback):
+    """
+    Serve GETs with the decorated coroutine ``handler(request, user, token, ...)``.
+
+    Every other method, browsable API requests and anything the handler
+    declines by returning None go to the synchronous DRF ``fallback`` view,
+    run in a thread, so the endpoint behaves exactly as before apart from
+    how its hot reads are served.
+    """
+    sync_view = sync_to_async(fallback)
+
+    def decorator(handler):
+        @csrf_exempt
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET' or 'text/html' in request.headers.get('Accept', ''):
+                return await sync_view(request, *args, **kwargs)
+            try:
+                user, token = await aauthenticate(request)
+                response = await handler(request, user, token, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+            if response is None:
+                return await sync_view(request, *args, **kwargs)
+            return response
+        return view
+    return decorator
+
+
+async def cached_read(request, basename, action, variant, resources, build):
+    """
+    ``CachedResponseMixin.cached_response`` for async views: same cache keys,
+    ETags and 304s as the DRF viewset, so both paths share cached responses.
+    ``build`` is a coroutine function returning the response data.
+    """
+    versions = await aresource_versions(resources)
+    cache_key = response_cache_key(basename, action, variant, 'json', versions, request.get_full_path())
+    etag, last_modified = response_validators(cache_key, versions)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        set_validators(not_modified, etag, last_modified)
+        return not_modified
+
+    use_cache = getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+    data = await cache.aget(cache_key) if use_cache else None
+    if data is not None:
+        record_cache_event(basename, hit=True)
+        response = json_response(data, headers={'X-Cache': 'HIT'})
+    else:
+        if use_cache and recently_changed(versions):
+            pin_to_primary()
+        data = await build()
+        response = json_response(data)
+        if use_cache:
+            record_cache_event(basename, hit=False)
+            await cache.aset(cache_key, data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+            response['X-Cache'] = 'MISS'
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def wants_page(request):
+    return any(param in request.GET for param in PAGINATION_PARAMS)
+
+
+def available_courses():
+    return Course.objects.filter(is_available=True).select_related('category', 'teacher__user')
+
+
+@async_read_view(viewset_view(CourseViewSet, 'course', {'get': 'list', 'post': 'create'}, detail=False))
+async def course_list(request, user, token):
+    if wants_page(request):
+        return None
+
+    async def build():
+        return CourseSerializer([course async for course in available_courses()], many=True).data
+
+    return await cached_read(request, 'course', 'list', CourseSerializer.__name__, CourseViewSet.cache_resources, build)
+
+
+@async_read_view(viewset_view(CourseViewSet, 'course', {
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}, detail=True))
+async def course_detail(request, user, token, pk):
+    async def build():
+        try:
+            course = await available_courses().aget(pk=pk)
+        except Course.DoesNotExist:
+            raise exceptions.NotFound('No Course matches the given query.')
+        return CourseSerializer(course).data
+
+    return await cached_read(request, 'course', 'retrieve', CourseSerializer.__name__, CourseViewSet.cache_resources, build)
+
+
+@async_read_view(viewset_view(LessonViewSet, 'lesson', {'get': 'list', 'post': 'create'}, detail=False))
+async def lesson_list(request, user, token):
+    course_id = request.GET.get('course')
+    if wants_page(request) or (course_id is not None and not course_id.isdigit()):
+        return None
+
+    async def build():
+        queryset = Lesson.objects.select_related('category').prefetch_related('files')
+        if course_id is not None:
+            queryset = queryset.filter(course_id=course_id)
+        return LessonSerializer([lesson async for lesson in queryset], many=True).data
+
+    return await cached_read(request, 'lesson', 'list', LessonSerializer.__name__, LessonViewSet.cache_resources, build)
+
+
+@async_read_view(viewset_view(QuestionViewSet, 'question', {'get': 'list', 'post': 'create'}, detail=False))
+async def question_list(request, user, token):
+    quiz_id = request.GET.get('quiz')
+    if wants_page(request) or (quiz_id and not quiz_id.isdigit()):
+        return None
+
+    # Only the owning teacher reads questions with the answer key
+    shows_key = bool(quiz_id) and user.is_authenticated and await Quiz.objects.filter(
+        pk=int(quiz_id), **{OWNER_PATHS[Quiz]: user}
+    ).aexists()
+    serializer_class = QuestionSerializer if shows_key else StudentQuestionSerializer
+
+    async def build():
+        queryset = Question.objects.prefetch_related('answers')
+        if quiz_id:
+            queryset = queryset.filter(quiz=quiz_id)
+        return serializer_class([question async for question in queryset], many=True).data
+
+    return await cached_read(request, 'question', 'list', serializer_class.__name__, QuestionViewSet.cache_resources, build)
+
+
+@async_read_view(CurrentUserView.as_view())
+async def current_user(request, user, token):
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    if token is None:
+        # Session users' profiles are not preloaded; the DRF view serves them
+        return None
+
+    role, profile_data = describe_user(user)
+    return json_response({
+        "user_id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "role": role,
+        "profile": profile_data,
+        "token": token.key,
+    })
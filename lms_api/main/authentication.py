@@ -0,0 +1,261 @@
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework import exceptions
+from .media_service import media_link_signer
+
+AUTH_CACHE_ALIAS = 'auth'
+
+
+def token_cache_key(key):
+    """Cache key for a token; the raw token never leaves the process as a key"""
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_auth_cache():
+    return caches[AUTH_CACHE_ALIAS]
+
+
+def describe_user(user):
+    """Return the user's role and profile payload as sent by the login, register and me endpoints"""
+    if hasattr(user, 'student'):
+        profile = user.student
+        return 'student', {
+            "id": profile.id,
+            "qualification": profile.qualification,
+            "mobile_no": profile.mobile_no,
+            "interested_categories": profile.interested_categories
+        }
+    if hasattr(user, 'teacher'):
+        profile = user.teacher
+        return 'teacher', {
+            "id": profile.id,
+            "qualification": profile.qualification,
+            "mobile_no": profile.mobile_no,
+            "experience": profile.experience,
+            "expertise": profile.expertise
+        }
+    return 'unknown', {}
+
+
+def cache_token(token):
+    """
+    Store a token with its user in the auth cache.
+
+    The user is loaded with its student and teacher profiles so that role
+    checks on a cached user (``hasattr(user, 'student')``) need no queries.
+    """
+    entry = _token_entry(token)
+    get_auth_cache().set(
+        token_cache_key(token.key), entry, getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300)
+    )
+    return entry
+
+
+async def acache_token(token):
+    """``cache_token`` for async views"""
+    entry = _token_entry(token)
+    await get_auth_cache().aset(
+        token_cache_key(token.key), entry, getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300)
+    )
+    return entry
+
+
+def _token_entry(token):
+    role, profile = describe_user(token.user)
+    return {
+        'token': token,
+        'role': role,
+        'profile_id': profile.get('id'),
+    }
+
+
+def token_ttl():
+    return timedelta(hours=getattr(settings, 'AUTH_TOKEN_TTL_HOURS', 168))
+
+
+def token_expired(token, now=None):
+    """
+    Tokens expire ``AUTH_TOKEN_TTL_HOURS`` after they were last refreshed;
+    ``Token.created`` holds the time of the last refresh.
+    """
+    return token.created < (now or timezone.now()) - token_ttl()
+
+
+def refresh_token(token, now=None):
+    """
+    Slide a token's expiry forward. The row is only written once per
+    ``AUTH_TOKEN_REFRESH_MINUTES``, not on every request.
+    """
+    now = now or timezone.now()
+    if token.created >= now - timedelta(minutes=getattr(settings, 'AUTH_TOKEN_REFRESH_MINUTES', 60)):
+        return False
+    Token.objects.filter(key=token.key).update(created=now)
+    token.created = now
+    return True
+
+
+async def arefresh_token(token, now=None):
+    """``refresh_token`` for async views"""
+    now = now or timezone.now()
+    if token.created >= now - timedelta(minutes=getattr(settings, 'AUTH_TOKEN_REFRESH_MINUTES', 60)):
+        return False
+    await Token.objects.filter(key=token.key).aupdate(created=now)
+    token.created = now
+    return True
+
+
+def issue_token(user):
+    """Return the user's token for a login, replacing it if it has expired"""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token):
+        token.delete()
+        token = Token.objects.create(user=user)
+    else:
+        refresh_token(token)
+    cache_token(token)
+    return token
+
+
+def _delete_in_batches(queryset, pk_field, batch_size):
+    deleted = 0
+    while True:
+        batch = list(queryset.values_list(pk_field, flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        # Short transactions, so logins are not blocked behind one long delete
+        queryset.model.objects.filter(**{f'{pk_field}__in': batch}).delete()
+        deleted += len(batch)
+
+
+def purge_expired_credentials(batch_size=1000):
+    """Delete expired auth tokens and sessions in batches; returns (tokens, sessions) deleted"""
+    from django.contrib.sessions.models import Session
+
+    now = timezone.now()
+    tokens = _delete_in_batches(Token.objects.filter(created__lt=now - token_ttl()), 'key', batch_size)
+    sessions = _delete_in_batches(Session.objects.filter(expire_date__lt=now), 'session_key', batch_size)
+    return tokens, sessions
+
+
+def invalidate_token(key):
+    get_auth_cache().delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that keeps token -> (user, role, profile id) in the
+    ``auth`` cache, a bounded LRU with a TTL. Signals drop entries when a
+    token is deleted or its user or profile changes.
+
+    Tokens expire after ``AUTH_TOKEN_TTL_HOURS`` without use; using one
+    slides its expiry forward.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = get_auth_cache().get(token_cache_key(key))
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user', 'user__student', 'user__teacher').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            entry = cache_token(token)
+
+        token = entry['token']
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        now = timezone.now()
+        if token_expired(token, now):
+            # Another worker may have refreshed it since it was cached
+            token.created = Token.objects.filter(key=key).values_list('created', flat=True).first() or token.created
+            if token_expired(token, now):
+                token.delete()
+                raise exceptions.AuthenticationFailed('Token has expired.')
+        if refresh_token(token, now):
+            cache_token(token)
+
+        return (token.user, token)
+
+
+async def aauthenticate(request):
+    """
+    Authenticate a plain Django request in an async view the way
+    ``CachedTokenAuthentication`` followed by ``SessionAuthentication`` would,
+    with the async cache and ORM. Returns (user, token), token being None
+    for a session user; an anonymous request gives (AnonymousUser, None).
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return await request.auser(), None
+    if len(auth) == 1:
+        raise exceptions.AuthenticationFailed('Invalid token header. No credentials provided.')
+    if len(auth) > 2:
+        raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain spaces.')
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+
+    entry = await get_auth_cache().aget(token_cache_key(key))
+    if entry is None:
+        try:
+            token = await Token.objects.select_related('user', 'user__student', 'user__teacher').aget(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        entry = await acache_token(token)
+
+    token = entry['token']
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+    now = timezone.now()
+    if token_expired(token, now):
+        token.created = await Token.objects.filter(key=key).values_list('created', flat=True).afirst() or token.created
+        if token_expired(token, now):
+            await token.adelete()
+            raise exceptions.AuthenticationFailed('Token has expired.')
+    if await arefresh_token(token, now):
+        await acache_token(token)
+
+    return token.user, token
+
+
+class SignedMediaAuthentication(BaseAuthentication):
+    """
+    Authenticate a media request by the ``?access=`` signature of a link
+    issued to a user for that file (see ``media_service.signed_media_url``),
+    for requests a browser makes on its own (links, <video> sources) that
+    cannot carry headers. Only used by the media view; the login token is
+    never accepted in a URL.
+    """
+
+    def authenticate(self, request):
+        signature = request.query_params.get('access')
+        if not signature:
+            return None
+        name = request.parser_context['kwargs'].get('name', '')
+        try:
+            user_id = media_link_signer(name).unsign(
+                signature, max_age=getattr(settings, 'MEDIA_LINK_MAX_AGE', 600)
+            )
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Media link has expired.')
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Invalid media link.')
+
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return (user, None)
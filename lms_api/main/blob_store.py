@@ -0,0 +1,235 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Blob, BlobUpload, LessonFile, Resource, FileSubmission
+
+BLOB_DIR = 'blobs'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def blob_name(digest, filename):
+    """Storage name of a blob: sharded by the first two bytes of its sha256, keeping the extension for serving"""
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def hash_path(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every file after the sha256 of its
+    content, so saving content that is already stored writes nothing.
+
+    Content is hashed in blocks while it streams in. Files are first written
+    to a temporary file and then hard-linked to their final name, so a
+    partially written blob is never visible and two concurrent saves of the
+    same content cannot clobber each other.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content, so an existing name already holds the same bytes
+        return name
+
+    def _temp_path(self):
+        temp_dir = self.path(os.path.join(BLOB_DIR, '.tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+        return tempfile.mkstemp(dir=temp_dir)
+
+    def _link(self, source, name):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(source, path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # Source is on another file system (e.g. the upload temp dir): copy it next to the blobs first
+            handle, temp_path = self._temp_path()
+            os.close(handle)
+            try:
+                shutil.copyfile(source, temp_path)
+                return self._link(temp_path, name)
+            finally:
+                os.remove(temp_path)
+        return name
+
+    def store_path(self, source, filename, digest=None):
+        """Store a file that is already on disk, e.g. a finished chunked upload, without copying it"""
+        name = blob_name(digest or hash_path(source), filename)
+        if self.exists(name):
+            return name
+        return self._link(source, name)
+
+    def _save(self, name, content):
+        temporary_file_path = getattr(content, 'temporary_file_path', None)
+        if temporary_file_path is not None:
+            return self.store_path(temporary_file_path(), name)
+
+        if hasattr(content, 'seek') and content.seekable():
+            # Hash first so that duplicates are detected before anything is written
+            digest = hashlib.sha256()
+            content.seek(0)
+            for chunk in content.chunks():
+                digest.update(chunk)
+            name = blob_name(digest.hexdigest(), name)
+            if self.exists(name):
+                return name
+            content.seek(0)
+
+        handle, temp_path = self._temp_path()
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(handle, 'wb') as temp:
+                for chunk in content.chunks():
+                    temp.write(chunk)
+                    digest.update(chunk)
+            return self._link(temp_path, blob_name(digest.hexdigest(), name))
+        finally:
+            os.remove(temp_path)
+
+
+def get_blob_storage():
+    return storages['blobs']
+
+
+def blob_name_from_url(url):
+    """Return the blob name a file URL points at, or None for external URLs and legacy uploads"""
+    if not url:
+        return None
+    marker = f"{settings.MEDIA_URL.rstrip('/')}/{BLOB_DIR}/"
+    index = url.find(marker)
+    if index == -1:
+        return None
+    return url[index + len(settings.MEDIA_URL.rstrip('/')) + 1:]
+
+
+def record_blob(name, size, user=None):
+    """
+    Create the Blob row, or mark an existing one as just stored so a running
+    sweep spares it. ``user`` is recorded as an uploader of the blob, which
+    lets them download it (see media_service.can_access_media).
+    """
+    blob, created = Blob.objects.get_or_create(name=name, defaults={'size': size})
+    if not created:
+        Blob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+    if user is not None:
+        BlobUpload.objects.get_or_create(user=user, name=name)
+    return blob
+
+
+def save_blob(content, filename, user=None):
+    """Store uploaded content and record its blob; returns the storage name"""
+    storage = get_blob_storage()
+    name = storage.save(filename, content)
+    record_blob(name, storage.size(name), user)
+    return name
+
+
+def store_blob_path(path, filename, digest=None, user=None):
+    """Store a file already on disk and record its blob; returns the storage name"""
+    name = get_blob_storage().store_path(path, filename, digest)
+    record_blob(name, os.path.getsize(path), user)
+    return name
+
+
+def adjust_blob_refs(old_url, new_url):
+    """Move one reference from the blob behind ``old_url`` to the blob behind ``new_url``"""
+    old_name, new_name = blob_name_from_url(old_url), blob_name_from_url(new_url)
+    if old_name == new_name:
+        return
+    if old_name:
+        Blob.objects.filter(name=old_name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    if new_name:
+        Blob.objects.filter(name=new_name).update(ref_count=F('ref_count') + 1)
+
+
+# Models whose file_url may point at a blob
+BLOB_REFERENCES = (LessonFile, Resource, FileSubmission)
+
+
+def count_blob_refs():
+    """Count the references to every blob by scanning the file_url columns"""
+    counts = Counter()
+    for model in BLOB_REFERENCES:
+        for url in model.objects.filter(file_url__contains=f'/{BLOB_DIR}/').values_list('file_url', flat=True).iterator():
+            name = blob_name_from_url(url)
+            if name:
+                counts[name] += 1
+    return counts
+
+
+def sweep_blobs(min_age_hours=24, dry_run=False):
+    """
+    Recount blob references, then delete blobs nothing refers to.
+
+    Only blobs older than ``min_age_hours`` are deleted, so a file that was
+    uploaded but not attached to a row yet survives. Files in the blob
+    directory without a Blob row (left by an interrupted save) are removed
+    under the same age rule.
+
+    The rows are read before the references are scanned, and uploads and
+    new references keep arriving while the sweep runs. So a recount applies
+    only if the row still holds the count read before the scan, and a blob
+    is deleted only if its row still has no references and was not stored
+    again since the cutoff. Its file is removed in the same transaction as
+    the row.
+    """
+    cutoff = timezone.now() - timedelta(hours=min_age_hours)
+    blobs = list(Blob.objects.values_list('pk', 'name', 'size', 'ref_count', 'updated_at'))
+    counts = count_blob_refs()
+    storage = get_blob_storage()
+    stats = {'recounted': 0, 'deleted': 0, 'freed_bytes': 0, 'untracked_deleted': 0}
+
+    known = set()
+    for pk, name, size, ref_count, updated_at in blobs:
+        known.add(name)
+        refs = counts.get(name, 0)
+        if refs != ref_count:
+            stats['recounted'] += 1
+            if not dry_run:
+                Blob.objects.filter(pk=pk, ref_count=ref_count).update(ref_count=refs)
+        if refs != 0 or updated_at >= cutoff:
+            continue
+        if dry_run:
+            stats['deleted'] += 1
+            stats['freed_bytes'] += size
+            continue
+        with transaction.atomic():
+            deleted, _ = Blob.objects.filter(pk=pk, ref_count=0, updated_at__lt=cutoff).delete()
+            if deleted:
+                storage.delete(name)
+                stats['deleted'] += 1
+                stats['freed_bytes'] += size
+
+    root = storage.path(BLOB_DIR)
+    cutoff_ts = cutoff.timestamp()
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            if name in known or counts.get(name) or os.path.getmtime(path) >= cutoff_ts:
+                continue
+            size = os.path.getsize(path)
+            if not dry_run:
+                with transaction.atomic():
+                    # Storing the same content again links this file under a new row
+                    if Blob.objects.filter(name=name).exists():
+                        continue
+                    os.remove(path)
+            stats['untracked_deleted'] += 1
+            stats['freed_bytes'] += size
+    return stats
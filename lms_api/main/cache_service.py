@@ -0,0 +1,60 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(scope, pk=None):
+    """Build the cache key that holds the version counter for a scope"""
+    if pk is None:
+        return f"version:{scope}"
+    return f"version:{scope}:{pk}"
+
+
+def get_version(scope, pk=None):
+    """
+    Return the current version number for a scope, creating it if missing.
+
+    Versions are nanosecond timestamps no earlier than the last change to the
+    scope, so they double as Last-Modified stamps. Missing counters start from
+    the current time so that an evicted counter never falls back onto a value
+    that old entries used.
+    """
+    key = version_key(scope, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(scope, pk=None):
+    """``get_version`` for async views, using the cache's async API"""
+    key = version_key(scope, pk)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(scope, pk=None):
+    """Invalidate everything cached under a scope by moving its version forward"""
+    key = version_key(scope, pk)
+    now = time.time_ns()
+    current = cache.get(key)
+    try:
+        if current is None:
+            raise ValueError(key)
+        return cache.incr(key, max(1, now - current))
+    except ValueError:
+        if not cache.add(key, now, timeout=None):
+            return cache.incr(key)
+        return now
+
+
+def bump_version_on_commit(scope, pk=None):
+    """
+    Bump a version once the current transaction commits, so a concurrent
+    reader cannot cache pre-commit data under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(scope, pk))
@@ -0,0 +1,76 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Course, Enrollment, Payment, OTP
+
+
+class CheckoutError(Exception):
+    """A checkout that cannot go ahead; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _completed(student, course_id):
+    """The enrollment and latest completed payment of an earlier checkout, or None"""
+    enrollment = Enrollment.objects.filter(student=student, course_id=course_id).first()
+    if enrollment is None:
+        return None
+    payment = Payment.objects.filter(student=student, course_id=course_id, payment_status='completed').order_by('-id').first()
+    return enrollment, payment, False
+
+
+def checkout(student, course_id, phone_number=None):
+    """
+    Pay for a course and enroll in it in one transaction.
+
+    Returns (enrollment, payment, created). Paid courses need an OTP verified
+    for ``phone_number``; it is consumed by a conditional update, so of two
+    concurrent attempts only one can use it and no row lock is held while
+    the course and earlier enrollments are checked. The amount is the
+    course price.
+
+    A student who is already enrolled gets the earlier enrollment back with
+    ``created`` False, so a retried checkout never charges twice.
+    """
+    course = Course.objects.filter(id=course_id, is_available=True).first()
+    if course is None:
+        raise CheckoutError("Course not found", status=404)
+
+    done = _completed(student, course.id)
+    if done:
+        return done
+
+    needs_payment = course.price > 0
+    if needs_payment and not phone_number:
+        raise CheckoutError("phone_number is required for paid courses")
+
+    try:
+        with transaction.atomic():
+            if needs_payment:
+                # A single UPDATE, so the transaction starts by taking the write lock
+                # instead of reading first and having to upgrade its lock later
+                now = timezone.now()
+                consumed = OTP.objects.filter(
+                    phone_number=phone_number, is_verified=True, expires_at__gte=now
+                ).update(is_verified=False, expires_at=now)
+                if not consumed:
+                    raise CheckoutError("OTP is not verified or has expired", status=403)
+
+            enrollment = Enrollment.objects.create(student=student, course=course, status='active')
+            payment = None
+            if needs_payment:
+                payment = Payment.objects.create(
+                    student=student, course=course, amount=course.price, payment_status='completed'
+                )
+    except (CheckoutError, IntegrityError) as e:
+        # A concurrent retry of the same checkout may have won the race
+        done = _completed(student, course.id)
+        if done:
+            return done
+        if isinstance(e, CheckoutError):
+            raise
+        raise CheckoutError("Checkout conflicted with another request; please retry", status=409)
+
+    return enrollment, payment, True
@@ -0,0 +1,51 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Course, Teacher, Enrollment
+
+# (model, counter field, counted model, foreign key on the counted model)
+COUNTERS = (
+    (Course, 'enrollment_count', Enrollment, 'course'),
+    (Teacher, 'courses_count', Course, 'teacher'),
+)
+
+
+def adjust_counter(model, field, pk, delta):
+    """Atomically add ``delta`` to a counter column in the database"""
+    if pk is not None:
+        model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def _actual_count(counted, fk):
+    return Coalesce(
+        Subquery(
+            counted.objects.filter(**{fk: OuterRef('pk')}).order_by()
+            .values(fk).annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+def recount(model, field, pks):
+    """Recompute one counter for the given rows, e.g. after a bulk insert that sent no signals"""
+    for counter_model, counter_field, counted, fk in COUNTERS:
+        if (counter_model, counter_field) == (model, field):
+            model.objects.filter(pk__in=list(pks)).update(**{field: _actual_count(counted, fk)})
+            return
+    raise ValueError(f'{model.__name__}.{field} is not a counter')
+
+
+def reconcile_counters(dry_run=False):
+    """
+    Find counters that differ from the rows they count and, unless dry_run,
+    fix them with one UPDATE per counter. Returns the number of drifted rows
+    per counter.
+    """
+    drifted = {}
+    for model, field, counted, fk in COUNTERS:
+        actual = _actual_count(counted, fk)
+        stale = model.objects.annotate(actual=actual).exclude(**{field: F('actual')})
+        drifted[f'{model.__name__}.{field}'] = stale.count()
+        if not dry_run and drifted[f'{model.__name__}.{field}']:
+            model.objects.filter(pk__in=stale.values('pk')).update(**{field: actual})
+    return drifted
@@ -0,0 +1,193 @@
+import hashlib
+import random
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+PRIMARY = 'default'
+
+# Always read from the primary: credentials and one-time codes must never be stale
+PRIMARY_ONLY_MODELS = frozenset({
+    'authtoken.token',
+    'sessions.session',
+    'main.otp',
+    'main.replicationheartbeat',
+})
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """Where the current request may read from; kept in a context variable"""
+    __slots__ = ('replica_ok', 'replica', 'wrote')
+
+    def __init__(self, replica_ok):
+        self.replica_ok = replica_ok
+        self.replica = None
+        self.wrote = False
+
+
+_state = ContextVar('lms_db_routing', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'REPLICA_DATABASES', ()))
+
+
+def hint_key(alias):
+    return f'replica-hint:{alias}'
+
+
+def set_replica_hint(alias, healthy, lag=None):
+    """Record a replica's health and lag (seconds, None if unknown) for the router to choose by"""
+    cache.set(hint_key(alias), {'healthy': healthy, 'lag': lag}, getattr(settings, 'REPLICA_HINT_TTL', 60))
+
+
+def replica_hints(aliases):
+    found = cache.get_many([hint_key(alias) for alias in aliases])
+    return {alias: found.get(hint_key(alias)) for alias in aliases}
+
+
+def choose_replica(aliases=None):
+    """
+    Pick a replica to read from, or None to use the primary.
+
+    Replicas marked unhealthy, or lagging more than ``REPLICA_MAX_LAG_SECONDS``,
+    are skipped; the rest are weighted towards the least lagged. A replica
+    without hints (``check_replicas`` has not run lately) is assumed healthy
+    and up to date.
+    """
+    aliases = replica_aliases() if aliases is None else aliases
+    if not aliases:
+        return None
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+    candidates, weights = [], []
+    for alias, hint in replica_hints(aliases).items():
+        if hint is None:
+            lag = 0
+        elif not hint['healthy'] or (hint['lag'] is not None and hint['lag'] > max_lag):
+            continue
+        else:
+            lag = hint['lag'] or 0
+        candidates.append(alias)
+        weights.append(1 / (1 + lag))
+    if not candidates:
+        return None
+    return random.choices(candidates, weights)[0]
+
+
+def pin_to_primary():
+    """Send the rest of the current request's reads to the primary"""
+    state = _state.get()
+    if state is not None:
+        state.replica_ok = False
+
+
+def recently_changed(versions):
+    """
+    Whether data stamped with these cache versions (nanosecond change times)
+    changed recently enough that a replica may not have it yet.
+    """
+    if not versions or not replica_aliases():
+        return False
+    age = (time.time_ns() - max(versions)) / 1_000_000_000
+    return age < getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+
+
+class ReplicaRouter:
+    """
+    Send reads made while serving a GET/HEAD/OPTIONS request to a replica
+    (one per request, chosen by ``choose_replica``) and everything else to
+    the primary.
+
+    A request reads from the primary once it has written, and so do the
+    client's requests for ``REPLICA_PIN_SECONDS`` after that (see
+    ``ReplicaRoutingMiddleware``), so nobody reads older data than they
+    just wrote. Reads outside a request (commands, signals, background
+    threads) always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_ok or model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return PRIMARY
+        if state.replica is None:
+            state.replica = choose_replica() or PRIMARY
+            if state.replica == PRIMARY:
+                state.replica_ok = False
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.replica_ok = False
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def pin_key(request):
+    """The client a read-your-writes pin applies to: its token, session or address"""
+    ident = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return 'replica-pin:' + hashlib.sha256(ident.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Set up the router's per-request state: safe requests from clients that
+    have not written in the last ``REPLICA_PIN_SECONDS`` may read from a
+    replica. Unused when no replicas are configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def enter(self, request, pinned):
+        return _state.set(RoutingState(request.method in SAFE_METHODS and not pinned))
+
+    def leave(self, token):
+        """Drop the request's state; True if the request wrote and its client must be pinned"""
+        state = _state.get()
+        _state.reset(token)
+        return state.wrote
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = pin_key(request)
+        token = self.enter(request, cache.get(key))
+        try:
+            return self.get_response(request)
+        finally:
+            if self.leave(token):
+                cache.set(key, True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+    async def __acall__(self, request):
+        key = pin_key(request)
+        token = self.enter(request, await cache.aget(key))
+        try:
+            return await self.get_response(request)
+        finally:
+            if self.leave(token):
+                await cache.aset(key, True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
@@ -0,0 +1,192 @@
+import csv
+import io
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from .models import Student, Course, Enrollment
+from .analytics_service import apply_contribution
+from .cache_service import bump_version_on_commit
+from .counter_service import recount
+
+# Keeps every IN (...) list well below SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+class BulkEnrollError(Exception):
+    """A bulk enrollment request that cannot be read at all (as opposed to individual bad rows)"""
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _enrolled_pairs(pairs, **filters):
+    """The (student id, course id) pairs among these that have an enrollment, looked up per course"""
+    by_course = {}
+    for student_id, course_id in pairs:
+        by_course.setdefault(course_id, []).append(student_id)
+    found = set()
+    for course_id, student_ids in by_course.items():
+        for chunk in _chunks(student_ids):
+            found.update(
+                Enrollment.objects.filter(course_id=course_id, student_id__in=chunk, **filters)
+                .values_list('student_id', 'course_id')
+            )
+    return found
+
+
+def _as_id(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def rows_from_csv(text, default_course_ids=()):
+    """
+    Read rows from CSV with a header naming ``username`` or ``student_id``
+    and, optionally, ``course_id``. Without a course column every row is
+    enrolled in each of ``default_course_ids``.
+    """
+    default_course_ids = [course_id for course_id in default_course_ids if _clean(course_id)]
+    reader = csv.DictReader(io.StringIO(text))
+    fields = set(reader.fieldnames or ())
+    if not fields & {'username', 'student_id'}:
+        raise BulkEnrollError("CSV needs a 'username' or 'student_id' column")
+    if 'course_id' not in fields and not default_course_ids:
+        raise BulkEnrollError("CSV needs a 'course_id' column or course_ids must be given")
+
+    rows = []
+    for record in reader:
+        student = {key: _clean(record.get(key)) for key in ('username', 'student_id') if _clean(record.get(key))}
+        if 'course_id' in fields:
+            rows.append({**student, 'course_id': _clean(record.get('course_id'))})
+        else:
+            rows.extend({**student, 'course_id': course_id} for course_id in default_course_ids)
+    return rows
+
+
+def rows_from_json(data):
+    """
+    Read rows from ``{"rows": [{"username" | "student_id", "course_id"}, ...]}``
+    or from ``usernames``/``student_ids`` lists enrolled in every course of
+    ``course_ids``.
+    """
+    if 'rows' in data:
+        if not isinstance(data['rows'], list) or not all(isinstance(row, dict) for row in data['rows']):
+            raise BulkEnrollError("rows must be a list of objects")
+        return data['rows']
+
+    course_ids = data.get('course_ids') or ([data['course_id']] if data.get('course_id') else [])
+    usernames, student_ids = data.get('usernames') or [], data.get('student_ids') or []
+    if not isinstance(course_ids, list) or not isinstance(usernames, list) or not isinstance(student_ids, list):
+        raise BulkEnrollError("course_ids, usernames and student_ids must be lists")
+    if not course_ids:
+        raise BulkEnrollError("course_ids is required")
+    if not usernames and not student_ids:
+        raise BulkEnrollError("usernames or student_ids is required")
+    students = [{'username': name} for name in usernames] + [{'student_id': pk} for pk in student_ids]
+    return [{**student, 'course_id': course_id} for course_id in course_ids for student in students]
+
+
+def _resolve_students(rows):
+    """Map usernames and student ids appearing in the rows to student ids, a chunk of lookups per query"""
+    usernames = {_clean(row.get('username')) for row in rows if _clean(row.get('username'))}
+    ids = {_as_id(row.get('student_id')) for row in rows if _as_id(row.get('student_id')) is not None}
+
+    by_username, known_ids = {}, set()
+    for chunk in _chunks(usernames):
+        by_username.update(Student.objects.filter(user__username__in=chunk).values_list('user__username', 'id'))
+    for chunk in _chunks(ids):
+        known_ids.update(Student.objects.filter(id__in=chunk).values_list('id', flat=True))
+    return by_username, known_ids
+
+
+def _course_owners(course_ids):
+    """Map each existing course among ``course_ids`` to the user id of its teacher"""
+    owners = {}
+    for chunk in _chunks(course_ids):
+        owners.update(Course.objects.filter(id__in=chunk).values_list('id', 'teacher__user_id'))
+    return owners
+
+
+def bulk_enroll(rows, user, enrollment_status='active'):
+    """
+    Enroll many students at once and report on every row.
+
+    Students and courses are resolved with a few set-based queries, existing
+    enrollments are looked up per course, and the new ones are inserted with
+    one ``bulk_create`` inside a transaction. ``bulk_create`` sends no
+    signals, so the enrollment counters, analytics rollups and cache versions
+    the per-row signals would maintain are updated here in bulk.
+    """
+    max_rows = getattr(settings, 'BULK_ENROLL_MAX_ROWS', 20000)
+    if len(rows) > max_rows:
+        raise BulkEnrollError(f"At most {max_rows} rows can be imported at once")
+
+    by_username, known_ids = _resolve_students(rows)
+    owners = _course_owners({_as_id(row.get('course_id')) for row in rows} - {None})
+
+    report, wanted = [], {}
+    for number, row in enumerate(rows, 1):
+        entry = {'row': number, 'course_id': _as_id(row.get('course_id'))}
+        username = _clean(row.get('username'))
+        if username:
+            entry['username'] = username
+            student_id = by_username.get(username)
+        else:
+            student_id = _as_id(row.get('student_id'))
+            entry['student_id'] = student_id if student_id is not None else row.get('student_id')
+            if student_id not in known_ids:
+                student_id = None
+        report.append(entry)
+
+        if entry['course_id'] is None:
+            entry.update(status='error', error="course_id is missing or not a number")
+        elif entry['course_id'] not in owners:
+            entry.update(status='error', error="Course not found")
+        elif not user.is_staff and owners[entry['course_id']] != user.id:
+            entry.update(status='error', error="You can only enroll students in your own courses")
+        elif student_id is None:
+            entry.update(status='error', error="Student not found")
+        elif (student_id, entry['course_id']) in wanted:
+            entry.update(status='duplicate', student=student_id)
+        else:
+            entry['student'] = student_id
+            wanted[student_id, entry['course_id']] = entry
+
+    with transaction.atomic():
+        existing = _enrolled_pairs(wanted)
+        new = [
+            Enrollment(student_id=student_id, course_id=course_id, status=enrollment_status)
+            for student_id, course_id in wanted if (student_id, course_id) not in existing
+        ]
+        last_id = Enrollment.objects.aggregate(last=Max('id'))['last'] or 0
+        Enrollment.objects.bulk_create(new, ignore_conflicts=True)
+        # Rows enrolled concurrently since the lookup are skipped by the unique
+        # constraint, so count only the rows this insert actually created
+        inserted = _enrolled_pairs(
+            ((enrollment.student_id, enrollment.course_id) for enrollment in new), id__gt=last_id
+        )
+
+        added = Counter(course_id for _, course_id in inserted)
+        if added:
+            recount(Course, 'enrollment_count', added.keys())
+            for course_id, count in added.items():
+                apply_contribution((course_id, new[0].enrollment_date, {'enrollments': count}))
+                bump_version_on_commit('course', course_id)
+            bump_version_on_commit('resource', 'enrollment')
+
+    for key, entry in wanted.items():
+        entry['status'] = 'enrolled' if key in inserted else 'already_enrolled'
+
+    summary = Counter(entry['status'] for entry in report)
+    return {'summary': {status: summary.get(status, 0) for status in ('enrolled', 'already_enrolled', 'duplicate', 'error')},
+            'rows': report}
@@ -0,0 +1,110 @@
+import csv
+import io
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Leading characters that make spreadsheet apps evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_rows(queryset, lookups, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield value tuples in primary key order, fetched from the database chunk_size rows at a time"""
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_stream(header, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encode rows as CSV, yielding one string per chunk of rows so the response is not built in memory"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_cell(value) for value in row])
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_stream(header, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encode rows as one JSON object per line, yielding one string per chunk of rows"""
+    encode = DjangoJSONEncoder().encode
+    lines = []
+    for row in rows:
+        lines.append(encode(dict(zip(header, row))))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_response(queryset, columns, export_format, name):
+    """
+    Stream a queryset as a CSV or NDJSON download.
+
+    ``columns`` is a sequence of (header, lookup) pairs. Only those columns are
+    selected, and rows go straight from the database cursor to the response in
+    chunks, so memory use does not grow with the number of rows.
+    """
+    header = [column for column, _ in columns]
+    rows = export_rows(queryset, [lookup for _, lookup in columns])
+    stream = csv_stream if export_format == 'csv' else ndjson_stream
+
+    response = StreamingHttpResponse(stream(header, rows), content_type=CONTENT_TYPES[export_format])
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class ExportMixin:
+    """
+    Viewset mixin adding ``GET <prefix>/export/csv/`` and ``/export/ndjson/``.
+
+    Staff export every row. Teachers export the rows of their own courses,
+    found through ``export_owner_path``. ``export_filters`` maps query
+    parameters to lookups, e.g. ``?course=3`` to ``course_id``.
+    """
+    export_name = None
+    export_columns = ()
+    export_owner_path = None
+    export_filters = {}
+
+    def get_export_queryset(self):
+        from rest_framework.exceptions import PermissionDenied, ValidationError
+        user = self.request.user
+        queryset = self.queryset.model.objects.all()
+        if not user.is_staff:
+            if not hasattr(user, 'teacher'):
+                raise PermissionDenied("Only teachers and admins can export data")
+            queryset = queryset.filter(**{self.export_owner_path: user})
+
+        for param, lookup in self.export_filters.items():
+            value = self.request.query_params.get(param)
+            if value:
+                if lookup.endswith('_id') and not value.isdigit():
+                    raise ValidationError({param: ["A valid integer is required."]})
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<export_format>csv|ndjson)')
+    def export(self, request, export_format=None):
+        return export_response(
+            self.get_export_queryset(), self.export_columns, export_format, self.export_name or self.basename
+        )
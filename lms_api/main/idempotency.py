@@ -0,0 +1,153 @@
+import hashlib
+import json
+import time
+import zlib
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.response import Response
+
+IDEMPOTENCY_CACHE_ALIAS = 'idempotency'
+IDEMPOTENT_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Response headers worth replaying; everything else is rebuilt by the renderer
+REPLAYED_HEADERS = ('Location',)
+
+# Bodies smaller than this are stored as they are
+COMPRESS_MIN_SIZE = 512
+
+
+def get_idempotency_cache():
+    return caches[IDEMPOTENCY_CACHE_ALIAS]
+
+
+class IdempotencyReplay(Exception):
+    """Raised from ``initial()`` to answer a request with a stored response instead of running the view"""
+
+    def __init__(self, response):
+        super().__init__('replay')
+        self.response = response
+
+
+def request_fingerprint(request):
+    """
+    Hash of what a request asks for, so a key reused for a different request
+    is refused. Must run before the body is parsed; multipart bodies are
+    not read into memory and are identified by their length only.
+    """
+    django_request = request._request
+    if request.content_type.startswith('multipart/'):
+        body = request.META.get('CONTENT_LENGTH', '').encode()
+    else:
+        body = django_request.body
+    return hashlib.sha256(b'\n'.join([request.method.encode(), django_request.get_full_path().encode(), body])).hexdigest()
+
+
+def encode_response(fingerprint, response):
+    body = json.dumps(response.data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    compressed = len(body) >= COMPRESS_MIN_SIZE
+    headers = {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)}
+    return (fingerprint, response.status_code, compressed, zlib.compress(body) if compressed else body, headers)
+
+
+def decode_response(entry):
+    _, status_code, compressed, body, headers = entry
+    data = json.loads(zlib.decompress(body) if compressed else body)
+    response = Response(data, status=status_code, headers=headers)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def mismatch_response():
+    return Response(
+        {"error": "Idempotency-Key was already used for a different request"},
+        status=422
+    )
+
+
+def claim(cache_key, fingerprint):
+    """
+    Return the stored entry for a key, or None once this request owns the key.
+
+    While another request with the same key is running, wait for it (polling
+    the cache, so this works across worker processes) and return its result.
+    If it never finishes within ``IDEMPOTENCY_WAIT_SECONDS`` answer 409.
+    """
+    cache = get_idempotency_cache()
+    lock_key = cache_key + ':lock'
+    lock_timeout = getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 30)
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 10)
+    delay = 0.01
+    while True:
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return entry
+        if cache.add(lock_key, fingerprint, timeout=lock_timeout):
+            # The first request may have finished between the get and the add
+            entry = cache.get(cache_key)
+            if entry is not None:
+                cache.delete(lock_key)
+            return entry
+        if cache.get(lock_key) not in (None, fingerprint):
+            raise IdempotencyReplay(mismatch_response())
+        if time.monotonic() >= deadline:
+            raise IdempotencyReplay(Response(
+                {"error": "A request with this Idempotency-Key is still being processed"},
+                status=409
+            ))
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+
+
+class IdempotentMixin:
+    """
+    Honour an ``Idempotency-Key`` header on the viewset's mutating actions.
+
+    The first response for a key (per user) is stored, compactly, for
+    ``IDEMPOTENCY_TTL_SECONDS`` and replayed for every repeat without running
+    the view again. A repeat that arrives while the first request is still
+    running waits for its response instead of racing it. Server errors are
+    not stored, so the request can be retried. ``idempotent_actions`` lists
+    the actions this applies to.
+    """
+    idempotent_actions = ('create', 'update', 'partial_update', 'destroy')
+
+    def initial(self, request, *args, **kwargs):
+        self.idempotency_key = None
+        key = request.headers.get('Idempotency-Key')
+        applies = key and request.method in IDEMPOTENT_METHODS and self.action in self.idempotent_actions
+        fingerprint = request_fingerprint(request) if applies else None
+
+        super().initial(request, *args, **kwargs)
+        if not applies or not request.user.is_authenticated:
+            return
+
+        cache_key = 'idempotency:' + hashlib.sha256(f'{request.user.pk}:{key}'.encode()).hexdigest()
+        entry = claim(cache_key, fingerprint)
+        if entry is not None:
+            raise IdempotencyReplay(decode_response(entry) if entry[0] == fingerprint else mismatch_response())
+        self.idempotency_key = (cache_key, fingerprint)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, IdempotencyReplay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self.release_idempotency_key(None)
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        self.release_idempotency_key(response)
+        return response
+
+    def release_idempotency_key(self, response):
+        if not getattr(self, 'idempotency_key', None):
+            return
+        cache_key, fingerprint = self.idempotency_key
+        self.idempotency_key = None
+        cache = get_idempotency_cache()
+        if response is not None and response.status_code < 500:
+            cache.set(cache_key, encode_response(fingerprint, response), getattr(settings, 'IDEMPOTENCY_TTL_SECONDS', 86400))
+        cache.delete(cache_key + ':lock')
@@ -0,0 +1,159 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    """
+    In-process pool of mail workers.
+
+    Each worker keeps one connection to the mail backend open while there is
+    work, sends whatever has queued up in batches of up to ``batch_size``
+    messages over it, and closes it after ``idle_timeout`` seconds without
+    mail. When sending fails, the unsent rest of the batch is retried on a
+    fresh connection with exponential backoff; messages still failing after
+    ``max_retries`` attempts are logged and dropped.
+
+    Workers start on the first enqueued message and are restarted after a
+    fork, so pre-forking servers get a pool per worker process.
+    """
+
+    def __init__(self, workers=2, batch_size=20, max_retries=3, backoff=1.0, idle_timeout=30):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A forked child inherits the queue but none of the threads
+            self._queue = queue.Queue()
+            for index in range(self.workers):
+                threading.Thread(target=self._run, name=f'mail-worker-{index}', daemon=True).start()
+            self._pid = os.getpid()
+
+    def put(self, message):
+        self._ensure_started()
+        self._queue.put((message, 0))
+
+    def flush(self, timeout=None):
+        """Wait until every queued message was sent or given up on; returns False on timeout"""
+        if self._pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _take_batch(self, first):
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        connection = None
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_timeout if connection else None)
+            except queue.Empty:
+                connection = self._close(connection)
+                continue
+
+            batch = self._take_batch(first)
+            sent = 0
+            try:
+                if connection is None:
+                    connection = get_connection(fail_silently=False)
+                    connection.open()
+                # One message per call so a failure only retries the messages not sent yet
+                for message, _ in batch:
+                    connection.send_messages([message])
+                    sent += 1
+            except Exception as exc:
+                connection = self._close(connection)
+                self._retry(batch[sent:], exc)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _close(self, connection):
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                logger.warning("Closing mail connection failed", exc_info=True)
+        return None
+
+    def _retry(self, batch, exc):
+        retry = []
+        for message, attempts in batch:
+            if attempts + 1 > self.max_retries:
+                logger.error("Giving up on mail to %s after %s attempts: %s", message.to, attempts + 1, exc)
+            else:
+                retry.append((message, attempts + 1))
+        if not retry:
+            return
+        delay = self.backoff * 2 ** (max(attempts for _, attempts in retry) - 1)
+        logger.warning("Sending %s mails failed (%s); retrying in %.1fs", len(retry), exc, delay)
+        # Sleep in this worker only; the other workers keep draining the queue
+        time.sleep(delay)
+        for item in retry:
+            self._queue.put(item)
+
+
+mail_queue = MailQueue(
+    workers=getattr(settings, 'MAIL_QUEUE_WORKERS', 2),
+    batch_size=getattr(settings, 'MAIL_QUEUE_BATCH_SIZE', 20),
+    max_retries=getattr(settings, 'MAIL_QUEUE_MAX_RETRIES', 3),
+    backoff=getattr(settings, 'MAIL_QUEUE_RETRY_BACKOFF', 1.0),
+    idle_timeout=getattr(settings, 'MAIL_QUEUE_IDLE_TIMEOUT', 30),
+)
+
+# Give queued mail a chance to go out when the process shuts down
+atexit.register(mail_queue.flush, timeout=10)
+
+
+def build_message(subject, message, recipients, html_message=None, from_email=None):
+    mail = EmailMultiAlternatives(subject, message, from_email or settings.DEFAULT_FROM_EMAIL, recipients)
+    if html_message:
+        mail.attach_alternative(html_message, 'text/html')
+    return mail
+
+
+def queue_mail(subject, message, recipients, html_message=None, from_email=None):
+    """
+    Send a transactional mail without blocking the request.
+
+    The message is handed to the worker pool once the current transaction
+    commits, so mail is never sent for rows that were rolled back. With
+    ``MAIL_QUEUE_ENABLED`` off it is sent inline instead.
+    """
+    mail = build_message(subject, message, recipients, html_message, from_email)
+    if not getattr(settings, 'MAIL_QUEUE_ENABLED', True):
+        transaction.on_commit(mail.send)
+        return
+    transaction.on_commit(lambda: mail_queue.put(mail))
@@ -0,0 +1,244 @@
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from main.models import Teacher, Student, CourseCategory, Course, LessonCategory, Lesson, LessonFile, Quiz, Question, Answer
+
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/sec and latency percentiles of the hot read endpoints served '
+        'by the sync DRF views under WSGI and by the async views under ASGI'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and server')
+        parser.add_argument('--courses', type=int, default=50, help='Number of courses to seed')
+        parser.add_argument('--no-seed', action='store_true', help='Benchmark the existing data without seeding')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows instead of deleting them')
+        # Internal: run one server in this process and print its results as JSON
+        parser.add_argument('--serve', choices=['wsgi', 'asgi'], help='Internal: measure one server in-process')
+        parser.add_argument('--targets', help='Internal: JSON list of [label, path]')
+        parser.add_argument('--token', help='Internal: token sent with every request')
+
+    def handle(self, *args, **options):
+        if options['serve']:
+            targets = json.loads(options['targets'])
+            measure = self.measure_wsgi if options['serve'] == 'wsgi' else self.measure_asgi
+            results = {
+                label: measure(path, options['token'], options['concurrency'], options['requests'])
+                for label, path in targets
+            }
+            self.stdout.write(json.dumps(results))
+            return
+
+        tag = timezone.now().strftime('%H%M%S%f')
+        seeded = [] if options['no_seed'] else self.seed(tag, options['courses'])
+        reader = User.objects.create(username=f'bench_reader_{tag}')
+        Student.objects.create(user=reader, qualification='-', mobile_no='-', address='-', interested_categories='')
+        token = Token.objects.create(user=reader)
+        try:
+            targets = self.targets()
+            for cached in (True, False):
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"Response cache {'on' if cached else 'off'}, concurrency {options['concurrency']}, "
+                    f"{options['requests']} requests per endpoint"
+                ))
+                wsgi = self.run_server('wsgi', targets, token.key, cached, options)
+                asgi = self.run_server('asgi', targets, token.key, cached, options)
+                for label, _ in targets:
+                    self.report(label, wsgi[label], asgi[label])
+        finally:
+            if not options['keep']:
+                reader.delete()
+                for obj in seeded:
+                    obj.delete()
+                self.stdout.write(self.style.NOTICE('Benchmark rows deleted'))
+
+    def seed(self, tag, course_count):
+        teacher_user = User.objects.create(username=f'bench_teacher_{tag}')
+        teacher = Teacher.objects.create(
+            user=teacher_user, qualification='-', mobile_no='-', experience=0, expertise='-'
+        )
+        category = CourseCategory.objects.create(title='Benchmark', description='-')
+        courses = Course.objects.bulk_create(
+            Course(category=category, teacher=teacher, code=f'B{tag}{i}', title=f'Course {i}',
+                   description='-', price=0)
+            for i in range(course_count)
+        )
+        lesson_categories = LessonCategory.objects.bulk_create(
+            LessonCategory(course=course, title=f'Section {i}', order=i)
+            for course in courses for i in range(3)
+        )
+        lessons = Lesson.objects.bulk_create(
+            Lesson(course=category.course, category=category, title=f'Lesson {i}', content='-', order=i)
+            for category in lesson_categories for i in range(5)
+        )
+        LessonFile.objects.bulk_create(
+            LessonFile(lesson=lesson, title='Slides', file_url='https://example.com/slides.pdf') for lesson in lessons
+        )
+        quizzes = Quiz.objects.bulk_create(
+            Quiz(lesson_category=category, title='Quiz', description='-', total_marks=10, duration=10, order=0)
+            for category in lesson_categories
+        )
+        questions = Question.objects.bulk_create(
+            Question(quiz=quiz, text=f'Question {i}', marks=1) for quiz in quizzes for i in range(10)
+        )
+        Answer.objects.bulk_create(
+            Answer(question=question, text=f'Answer {i}', is_correct=i == 0) for question in questions for i in range(4)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(courses)} courses, {len(lessons)} lessons and {len(questions)} questions'
+        ))
+        # Deleting the teacher's user cascades to everything seeded under it
+        return [teacher_user, category]
+
+    def targets(self):
+        course = Course.objects.filter(is_available=True).order_by('-id').first()
+        quiz = Quiz.objects.order_by('-id').first()
+        return [
+            ('course list', '/api/course/'),
+            ('course detail', f'/api/course/{course.id if course else 0}/'),
+            ('lesson list', f'/api/lesson/?course={course.id if course else 0}'),
+            ('quiz questions', f'/api/question/?quiz={quiz.id if quiz else 0}'),
+            ('me', '/api/me/'),
+        ]
+
+    def run_server(self, server, targets, token, cached, options):
+        """Measure one server in a fresh process, so each gets its own URLconf, caches and connections"""
+        env = dict(
+            os.environ,
+            LMS_ASYNC_READ_VIEWS='true' if server == 'asgi' else 'false',
+            LMS_RESPONSE_CACHE_ENABLED='true' if cached else 'false',
+        )
+        output = subprocess.run(
+            [sys.executable, sys.argv[0], 'benchmark_async_reads', '--serve', server,
+             '--targets', json.dumps(targets), '--token', token,
+             '--concurrency', str(options['concurrency']), '--requests', str(options['requests'])],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def report(self, label, wsgi, asgi):
+        self.stdout.write(f'  {label}')
+        for name, result in (('wsgi', wsgi), ('asgi', asgi)):
+            self.stdout.write(
+                f"    {name}: {result['rps']:8.0f} req/s  p50 {result['p50']:7.2f} ms  "
+                f"p95 {result['p95']:7.2f} ms  p99 {result['p99']:7.2f} ms  errors {result['errors']}"
+            )
+        ratio = asgi['rps'] / wsgi['rps'] if wsgi['rps'] else 0
+        self.stdout.write(self.style.SUCCESS(f'    asgi/wsgi throughput: {ratio:.2f}x'))
+
+    def summarize(self, latencies, errors, elapsed):
+        latencies = sorted(latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'errors': errors,
+        }
+
+    def measure_wsgi(self, path, token, concurrency, total):
+        """Drive the WSGI application from ``concurrency`` threads, as a threaded WSGI server would"""
+        from django.core.wsgi import get_wsgi_application
+
+        application = get_wsgi_application()
+        path, _, query = path.partition('?')
+        latencies, errors, lock = [], [0], threading.Lock()
+
+        def call():
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'REMOTE_ADDR': '127.0.0.1',
+                'HTTP_AUTHORIZATION': f'Token {token}', 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            }
+            statuses = []
+            start = time.perf_counter()
+            body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            b''.join(body)
+            body.close()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not statuses[0].startswith('200'):
+                    errors[0] += 1
+
+        call()  # warm up
+        latencies.clear()
+        errors[0] = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            for _ in range(total):
+                pool.submit(call)
+        return self.summarize(latencies, errors[0], time.perf_counter() - start)
+
+    def measure_asgi(self, path, token, concurrency, total):
+        """Drive the ASGI application with ``concurrency`` concurrent connections on one event loop"""
+        from django.core.asgi import get_asgi_application
+
+        application = get_asgi_application()
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'headers': [(b'host', HOST.encode()), (b'authorization', f'Token {token}'.encode())],
+            'client': ('127.0.0.1', 50000), 'server': (HOST, 80),
+        }
+
+        async def call(latencies, errors):
+            disconnected = asyncio.Event()
+            sent = []
+
+            async def receive():
+                if not sent:
+                    sent.append(True)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The client stays connected until the response is complete
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            status = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            start = time.perf_counter()
+            await application(dict(scope), receive, send)
+            latencies.append(time.perf_counter() - start)
+            disconnected.set()
+            if status[0] != 200:
+                errors[0] += 1
+
+        async def run():
+            await call([], [0])  # warm up
+            latencies, errors, remaining = [], [0], [total]
+
+            async def worker():
+                while remaining[0] > 0:
+                    remaining[0] -= 1
+                    await call(latencies, errors)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return self.summarize(latencies, errors[0], time.perf_counter() - start)
+
+        return asyncio.run(run())
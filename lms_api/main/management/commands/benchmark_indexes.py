@@ -0,0 +1,167 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from main.models import (
+    Teacher, Student, CourseCategory, Course, Enrollment, LessonCategory, Lesson,
+    Quiz, Result, Payment, OTP
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare query plans and timings of the hot lookups with and without the composite indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Number of students to seed')
+        parser.add_argument('--courses', type=int, default=200, help='Number of courses to seed')
+        parser.add_argument('--repeat', type=int, default=500, help='Executions per query and plan')
+        parser.add_argument('--no-seed', action='store_true', help='Benchmark the existing data without seeding')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows instead of rolling them back')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.ERROR('This benchmark uses SQLite index hints and only runs on SQLite'))
+            return
+
+        try:
+            with transaction.atomic():
+                if not options['no_seed']:
+                    self.seed(options['students'], options['courses'])
+                self.run_cases(options['repeat'])
+                if not options['keep']:
+                    raise Rollback()
+        except Rollback:
+            self.stdout.write(self.style.NOTICE('Seeded rows rolled back'))
+
+    def seed(self, student_count, course_count):
+        start = time.perf_counter()
+        tag = timezone.now().strftime('%H%M%S%f')
+
+        teacher_user = User.objects.create(username=f'bench_teacher_{tag}')
+        teacher = Teacher.objects.create(
+            user=teacher_user, qualification='-', mobile_no='-', experience=0, expertise='-'
+        )
+        category = CourseCategory.objects.create(title='Benchmark', description='-')
+
+        courses = Course.objects.bulk_create(
+            Course(category=category, teacher=teacher, code=f'B{tag}{i}', title=f'Course {i}',
+                   description='-', price=0)
+            for i in range(course_count)
+        )
+        lesson_categories = LessonCategory.objects.bulk_create(
+            LessonCategory(course=course, title=f'Section {i}', order=i)
+            for course in courses for i in range(5)
+        )
+        Lesson.objects.bulk_create(
+            (Lesson(course=category.course, category=category, title=f'Lesson {i}', content='-', order=i)
+             for category in lesson_categories for i in range(10)),
+            batch_size=2000
+        )
+        quizzes = Quiz.objects.bulk_create(
+            Quiz(lesson_category=category, title='Quiz', description='-', total_marks=10, duration=10, order=0)
+            for category in lesson_categories
+        )
+
+        users = User.objects.bulk_create(
+            (User(username=f'bench_student_{tag}_{i}') for i in range(student_count)), batch_size=2000
+        )
+        students = Student.objects.bulk_create(
+            (Student(user=user, qualification='-', mobile_no='-', address='-', interested_categories='')
+             for user in users), batch_size=2000
+        )
+
+        enrollments = []
+        payments = []
+        results = []
+        for student in students:
+            for course in random.sample(courses, min(5, len(courses))):
+                enrollments.append(Enrollment(student=student, course=course, status='active'))
+                payments.append(Payment(student=student, course=course, amount=0, payment_status='completed'))
+            for quiz in random.sample(quizzes, min(5, len(quizzes))):
+                results.append(Result(quiz=quiz, student=student, score=0, grade_awarded='F'))
+        Enrollment.objects.bulk_create(enrollments, batch_size=2000)
+        Payment.objects.bulk_create(payments, batch_size=2000)
+        Result.objects.bulk_create(results, batch_size=2000)
+
+        expires_at = timezone.now()
+        OTP.objects.bulk_create(
+            (OTP(phone_number=f'{tag[-6:]}{i:08d}', otp_code='000000', expires_at=expires_at)
+             for i in range(student_count * 5)),
+            batch_size=2000
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(courses)} courses, {len(students)} students, {len(enrollments)} enrollments '
+            f'and {len(results)} results in {time.perf_counter() - start:.2f}s'
+        ))
+
+    def baseline_hint(self, cursor, table, column):
+        """Return the index hint that reproduces the plan available before the composite indexes"""
+        if column is None:
+            return 'NOT INDEXED'
+        for name, info in connection.introspection.get_constraints(cursor, table).items():
+            if info['index'] and not info['unique'] and info['columns'] == [column]:
+                return f'INDEXED BY "{name}"'
+        return 'NOT INDEXED'
+
+    def cases(self, cursor):
+        def ids(model, field='id'):
+            return list(model.objects.values_list(field, flat=True)[:1000]) or [0]
+
+        students, courses, quizzes = ids(Student), ids(Course), ids(Quiz)
+        categories, phones = ids(LessonCategory), ids(OTP, 'phone_number')
+
+        return [
+            ('Enrollment(student, course)', Enrollment, 'student_id',
+             'SELECT 1 FROM {table} {hint} WHERE student_id = %s AND course_id = %s LIMIT 1',
+             lambda: (random.choice(students), random.choice(courses))),
+            ('Result(student, quiz)', Result, 'student_id',
+             'SELECT id, score FROM {table} {hint} WHERE student_id = %s AND quiz_id = %s',
+             lambda: (random.choice(students), random.choice(quizzes))),
+            ('Lesson(course, category, order)', Lesson, 'course_id',
+             'SELECT id, title FROM {table} {hint} WHERE course_id = %s ORDER BY category_id, "order"',
+             lambda: (random.choice(courses),)),
+            ('LessonCategory(course, order)', LessonCategory, 'course_id',
+             'SELECT id, title FROM {table} {hint} WHERE course_id = %s ORDER BY "order"',
+             lambda: (random.choice(courses),)),
+            ('Quiz(lesson_category, order)', Quiz, 'lesson_category_id',
+             'SELECT id, title FROM {table} {hint} WHERE lesson_category_id = %s ORDER BY "order"',
+             lambda: (random.choice(categories),)),
+            ('OTP(phone_number)', OTP, None,
+             'SELECT id, otp_code FROM {table} {hint} WHERE phone_number = %s',
+             lambda: (random.choice(phones),)),
+            ('Payment(student, course)', Payment, 'student_id',
+             'SELECT id, amount FROM {table} {hint} WHERE student_id = %s AND course_id = %s',
+             lambda: (random.choice(students), random.choice(courses))),
+        ]
+
+    def measure(self, cursor, sql, params, repeat):
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params())
+        plan = '; '.join(row[-1] for row in cursor.fetchall())
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cursor.execute(sql, params())
+            cursor.fetchall()
+        return plan, (time.perf_counter() - start) / repeat * 1_000_000
+
+    def run_cases(self, repeat):
+        with connection.cursor() as cursor:
+            for label, model, column, template, params in self.cases(cursor):
+                table = model._meta.db_table
+                before_sql = template.format(table=table, hint=self.baseline_hint(cursor, table, column))
+                after_sql = template.format(table=table, hint='')
+
+                before_plan, before_us = self.measure(cursor, before_sql, params, repeat)
+                after_plan, after_us = self.measure(cursor, after_sql, params, repeat)
+
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(f'  before: {before_us:9.1f} us/query  {before_plan}')
+                self.stdout.write(f'  after:  {after_us:9.1f} us/query  {after_plan}')
+                speedup = before_us / after_us if after_us else 0
+                self.stdout.write(self.style.SUCCESS(f'  speedup: {speedup:.1f}x'))
@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import OperationalError, close_old_connections, connection
+from django.utils import timezone
+from main.models import Teacher, Student, CourseCategory, Course, LessonCategory, Quiz, Enrollment, Result, OTP
+
+# Environment of each profile
+PROFILES = {
+    'baseline': {
+        'LMS_SQLITE_JOURNAL_MODE': 'DELETE',
+        'LMS_SQLITE_SYNCHRONOUS': 'FULL',
+        'LMS_SQLITE_BUSY_TIMEOUT_MS': '',
+        'LMS_SQLITE_MMAP_SIZE': '',
+        'LMS_SQLITE_CACHE_SIZE': '',
+        'LMS_SQLITE_TEMP_STORE': '',
+        'LMS_SQLITE_TRANSACTION_MODE': '',
+        'LMS_DB_CONN_MAX_AGE': '0',
+    },
+    # The settings as configured, with WAL as recommended for deployments
+    'tuned': {'LMS_SQLITE_JOURNAL_MODE': 'WAL'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent write throughput, latency and "database is locked" errors with '
+        'SQLite defaults and with the configured pragmas, on scratch copies of the database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads')
+        parser.add_argument('--ops', type=int, default=300, help='Writes per writer thread')
+        # Internal: run the workload against the configured database and print its results as JSON
+        parser.add_argument('--run', action='store_true', help='Internal: run the workload in-process')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.ERROR('This benchmark only runs on SQLite'))
+            return
+        if options['run']:
+            self.stdout.write(json.dumps(self.run_workload(options['writers'], options['readers'], options['ops'])))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['writers']} writers x {options['ops']} writes, {options['readers']} readers"
+        ))
+        scratch = tempfile.mkdtemp(prefix='lms-sqlite-bench-')
+        try:
+            results = {}
+            for name, overrides in PROFILES.items():
+                path = os.path.join(scratch, f'{name}.sqlite3')
+                self.copy_database(path)
+                results[name] = self.run_profile(path, overrides, options)
+                self.report(name, results[name])
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        baseline, tuned = results['baseline'], results['tuned']
+        gain = tuned['writes_per_s'] / baseline['writes_per_s'] if baseline['writes_per_s'] else 0
+        self.stdout.write(self.style.SUCCESS(f'  write throughput: {gain:.1f}x'))
+
+    def copy_database(self, path):
+        """Snapshot the configured database with SQLite's online backup, so the real one is never written"""
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def run_profile(self, path, overrides, options):
+        env = dict(os.environ, LMS_SQLITE_PATH=path, **overrides)
+        output = subprocess.run(
+            [sys.executable, sys.argv[0], 'benchmark_sqlite_writes', '--run',
+             '--writers', str(options['writers']), '--readers', str(options['readers']),
+             '--ops', str(options['ops'])],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"  {name:8}: {result['writes_per_s']:7.0f} writes/s  p50 {result['p50']:7.2f} ms  "
+            f"p99 {result['p99']:8.2f} ms  locked errors {result['write_errors']}  |  "
+            f"{result['reads_per_s']:6.0f} reads/s  read errors {result['read_errors']}"
+        )
+        self.stdout.write(f"            pragmas: {result['pragmas']}")
+
+    def seed(self, writers, ops):
+        tag = timezone.now().strftime('%H%M%S%f')
+        teacher_user = User.objects.create(username=f'bench_teacher_{tag}')
+        teacher = Teacher.objects.create(user=teacher_user, qualification='-', mobile_no='-', experience=0, expertise='-')
+        category = CourseCategory.objects.create(title='Benchmark', description='-')
+        courses = Course.objects.bulk_create(
+            Course(category=category, teacher=teacher, code=f'W{tag}{i}', title=f'Course {i}', description='-', price=0)
+            for i in range(10)
+        )
+        lesson_category = LessonCategory.objects.create(course=courses[0], title='Section', order=0)
+        quiz = Quiz.objects.create(lesson_category=lesson_category, title='Quiz', description='-', total_marks=10, duration=10)
+        users = User.objects.bulk_create(
+            (User(username=f'bench_writer_{tag}_{i}') for i in range(writers * ops)), batch_size=2000
+        )
+        students = Student.objects.bulk_create(
+            (Student(user=user, qualification='-', mobile_no='-', address='-', interested_categories='')
+             for user in users), batch_size=2000
+        )
+        return courses, quiz, students
+
+    def run_workload(self, writers, readers, ops):
+        """
+        Writer threads mix the app's hot writes (an enrollment with its counter
+        and rollup updates, an OTP ``update_or_create`` and a quiz result) while
+        reader threads list courses. Each operation is one "request": the
+        connection is released afterwards the way request_finished does it.
+        """
+        courses, quiz, students = self.seed(writers, ops)
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for name in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+        connection.close()
+
+        lock = threading.Lock()
+        latencies, counts = [], {'write_errors': 0, 'reads': 0, 'read_errors': 0}
+        done = threading.Event()
+
+        def write(thread, i):
+            student = students[thread * ops + i]
+            operation = i % 3
+            if operation == 0:
+                Enrollment.objects.create(student=student, course=courses[i % len(courses)], status='active')
+            elif operation == 1:
+                OTP.objects.update_or_create(
+                    phone_number=f'9{thread:03d}{i % 20:06d}',
+                    defaults={'otp_code': f'{i % 1000000:06d}', 'expires_at': timezone.now()}
+                )
+            else:
+                Result.objects.create(quiz=quiz, student=student, score=i % 10, grade_awarded='A')
+
+        def writer(thread):
+            for i in range(ops):
+                start = time.perf_counter()
+                try:
+                    write(thread, i)
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latencies.append(elapsed)
+                except OperationalError:
+                    with lock:
+                        counts['write_errors'] += 1
+                finally:
+                    close_old_connections()
+
+        def reader():
+            while not done.is_set():
+                try:
+                    list(Course.objects.filter(is_available=True).select_related('category', 'teacher__user')[:20])
+                    key = 'reads'
+                except OperationalError:
+                    key = 'read_errors'
+                finally:
+                    close_old_connections()
+                with lock:
+                    counts[key] += 1
+
+        reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+        writer_threads = [threading.Thread(target=writer, args=(thread,)) for thread in range(writers)]
+        start = time.perf_counter()
+        for thread in reader_threads + writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for thread in reader_threads:
+            thread.join()
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+
+        return {
+            'writes_per_s': len(latencies) / elapsed,
+            'p50': percentile(0.50),
+            'p99': percentile(0.99),
+            'write_errors': counts['write_errors'],
+            'reads_per_s': counts['reads'] / elapsed,
+            'read_errors': counts['read_errors'],
+            'pragmas': pragmas,
+        }
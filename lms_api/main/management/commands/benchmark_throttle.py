@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from main.throttling import TokenBucketThrottle
+from main.views import LoginView
+
+# Environment of each profile and whether bucket updates are serialised
+PROFILES = {
+    'locmem': ({'LMS_CACHE_BACKEND': 'locmem'}, True),
+    'file, unlocked': ({'LMS_CACHE_BACKEND': 'file'}, False),
+    'file, locked': ({'LMS_CACHE_BACKEND': 'file'}, True),
+}
+
+
+class BenchmarkThrottle(TokenBucketThrottle):
+    """One bucket shared by every request, at the rate given on the command line"""
+    scope = 'benchmark'
+
+    def __init__(self, rate, serialize_updates):
+        self.rate = rate
+        self.retry_after = None
+        self.serialize_updates = serialize_updates
+        self.cache = caches['default']
+
+    def get_ident_value(self, request, view):
+        return 'benchmark-client'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the CPU a burst of failed logins costs with and without the login throttles, then hammer '
+        'one token bucket from several worker processes and count how many requests get through on each '
+        'cache backend the throttle can run on'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Worker processes')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per worker process')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per thread')
+        parser.add_argument('--capacity', type=int, default=100, help='Bucket capacity; it does not refill during the run')
+        parser.add_argument('--logins', type=int, default=50, help='Failed logins sent by one client for the cost comparison')
+        # Internal: run one worker's share of the load and print its results as JSON
+        parser.add_argument('--run', action='store_true', help='Internal: run the workload in-process')
+        parser.add_argument('--unlocked', action='store_true', help='Internal: do not serialise bucket updates')
+        parser.add_argument('--start-at', type=float, default=0, help='Internal: when to start, so workers collide')
+
+    def handle(self, *args, **options):
+        if options['run']:
+            self.stdout.write(json.dumps(self.run_workload(options)))
+            return
+
+        self.measure_login_cost(options['logins'])
+
+        sent = options['processes'] * options['threads'] * options['requests']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['processes']} processes x {options['threads']} threads x {options['requests']} requests "
+            f"({sent} in all) against a bucket of {options['capacity']}"
+        ))
+        scratch = tempfile.mkdtemp(prefix='lms-throttle-bench-')
+        try:
+            for name, (overrides, serialized) in PROFILES.items():
+                location = os.path.join(scratch, name.replace(', ', '-'))
+                env = dict(os.environ, LMS_CACHE_LOCATION=location, **overrides)
+                self.report(name, self.run_profile(env, serialized, options), options['capacity'])
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def measure_login_cost(self, attempts):
+        """
+        Send failed logins from one client straight to LoginView, with the
+        configured login throttles and with them off. Every attempt the
+        throttles let through runs the password hasher (Django hashes for
+        unknown usernames too), which is the CPU a brute-force or
+        credential-stuffing burst costs the server. Each run uses a fresh
+        address and username so its buckets start full; nothing is written.
+        """
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{attempts} failed logins from one client'))
+        factory = APIRequestFactory()
+        view = LoginView.as_view()
+        rates = dict(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'])
+        profiles = {
+            'throttled': rates,
+            'unthrottled': dict(rates, login=None, login_username=None),
+        }
+        costs = {}
+        for run, (name, profile_rates) in enumerate(profiles.items()):
+            address = f'198.51.100.{run + 1}'
+            username = f'benchmark-{uuid.uuid4().hex}'
+            hashed = refused = 0
+            with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': profile_rates}):
+                wall, cpu = time.perf_counter(), time.process_time()
+                for _ in range(attempts):
+                    request = factory.post('/api/login/', {'username': username, 'password': 'wrong'},
+                                           format='json', REMOTE_ADDR=address)
+                    if view(request).status_code == 429:
+                        refused += 1
+                    else:
+                        hashed += 1
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            costs[name] = cpu
+            self.stdout.write(
+                f"  {name:11}: {hashed:5} reached the password hasher, {refused:5} refused  "
+                f"CPU {cpu * 1000:8.0f} ms ({cpu / attempts * 1000:6.2f} ms per attempt)  "
+                f"wall {wall:6.2f} s"
+            )
+        if costs['throttled']:
+            self.stdout.write(self.style.SUCCESS(
+                f"  throttling cut the CPU spent on the burst {costs['unthrottled'] / costs['throttled']:.0f}x"
+            ))
+
+    def run_profile(self, env, serialized, options):
+        command = [
+            sys.executable, sys.argv[0], 'benchmark_throttle', '--run',
+            '--threads', str(options['threads']), '--requests', str(options['requests']),
+            '--capacity', str(options['capacity']), '--start-at', str(time.time() + 2),
+        ]
+        if not serialized:
+            command.append('--unlocked')
+        workers = [
+            subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+            for _ in range(options['processes'])
+        ]
+        results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+        return {
+            'allowed': sum(result['allowed'] for result in results),
+            'requests': sum(result['requests'] for result in results),
+            'elapsed': max(result['elapsed'] for result in results),
+        }
+
+    def report(self, name, result, capacity):
+        over = result['allowed'] - capacity
+        style = self.style.SUCCESS if over <= 0 else self.style.ERROR
+        self.stdout.write(
+            f"  {name:15}: {result['allowed']:6} allowed  "
+            + style(f"{max(over, 0):6} over the limit")
+            + f"  {result['requests'] / result['elapsed']:8.0f} checks/s"
+        )
+
+    def run_workload(self, options):
+        throttle_rate = f"{options['capacity']}/d"
+        serialized = not options['unlocked']
+        lock = threading.Lock()
+        counts = {'allowed': 0}
+
+        def client():
+            throttle = BenchmarkThrottle(throttle_rate, serialized)
+            allowed = sum(throttle.allow_request(None, None) for _ in range(options['requests']))
+            with lock:
+                counts['allowed'] += allowed
+
+        threads = [threading.Thread(target=client) for _ in range(options['threads'])]
+        time.sleep(max(0, options['start_at'] - time.time()))
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'allowed': counts['allowed'],
+            'requests': options['threads'] * options['requests'],
+            'elapsed': time.perf_counter() - start,
+        }
@@ -0,0 +1,60 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from django.utils import timezone
+from main.db_router import PRIMARY, replica_aliases, set_replica_hint
+from main.models import ReplicationHeartbeat
+
+
+class Command(BaseCommand):
+    help = 'Measure the health and lag of the read replicas and record them as hints for the database router'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep checking every this many seconds instead of once')
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            self.stdout.write(self.style.NOTICE('No read replicas are configured'))
+            return
+
+        while True:
+            self.check(aliases)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def check(self, aliases):
+        """
+        Compare each replica's heartbeat with the primary's before stamping a
+        new one: a replica that has caught up holds the same beat, and one that
+        is behind holds an older beat (or none), that much older than the primary.
+        """
+        beat = ReplicationHeartbeat.objects.using(PRIMARY).filter(pk=1).values_list('beat_at', flat=True).first()
+        for alias in aliases:
+            try:
+                replica_beat = ReplicationHeartbeat.objects.using(alias).filter(pk=1).values_list('beat_at', flat=True).first()
+            except DatabaseError as e:
+                set_replica_hint(alias, healthy=False)
+                self.stdout.write(self.style.ERROR(f'{alias}: unreachable ({e})'))
+                continue
+
+            if beat is None:
+                lag = None
+            elif replica_beat is None:
+                lag = float('inf')
+            else:
+                lag = max(0.0, (beat - replica_beat).total_seconds())
+            set_replica_hint(alias, healthy=True, lag=lag)
+            if lag is None:
+                described = 'lag unknown until the next check'
+            elif replica_beat is None:
+                described = 'has no heartbeat yet'
+            else:
+                described = f'lag {lag:.1f}s'
+            self.stdout.write(self.style.SUCCESS(f'{alias}: healthy, {described}'))
+
+        now = timezone.now()
+        if not ReplicationHeartbeat.objects.using(PRIMARY).filter(pk=1).update(beat_at=now):
+            ReplicationHeartbeat.objects.using(PRIMARY).create(pk=1, beat_at=now)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from main.authentication import purge_expired_credentials
+
+
+class Command(BaseCommand):
+    help = 'Delete expired auth tokens and sessions in batches; run it periodically (e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per transaction')
+
+    def handle(self, *args, **options):
+        tokens, sessions = purge_expired_credentials(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {tokens} expired tokens and {sessions} expired sessions'))
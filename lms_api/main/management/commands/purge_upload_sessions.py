@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from main.upload_service import purge_stale_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions idle for longer than --hours, with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Idle time after which a session is purged')
+
+    def handle(self, *args, **options):
+        count = purge_stale_sessions(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {count} upload sessions'))
@@ -0,0 +1,14 @@
+import time
+from django.core.management.base import BaseCommand
+from main.analytics_service import rebuild_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the course analytics rollups from enrollments, payments, results and feedback'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        courses, days = rebuild_course_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {courses} courses over {days} course-days in {time.perf_counter() - start:.2f}s'
+        ))
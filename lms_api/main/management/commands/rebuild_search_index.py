@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from main.search_service import create_search_table, rebuild_search_index, search_enabled
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the course, lesson, category and teacher tables'
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            self.stdout.write(self.style.ERROR('Full-text search uses SQLite FTS5 and only runs on SQLite'))
+            return
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            create_search_table()
+            counts = rebuild_search_index()
+
+        summary = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {summary} in {time.perf_counter() - start:.2f}s'
+        ))
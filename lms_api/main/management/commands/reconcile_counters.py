@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from main.counter_service import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount Course.enrollment_count and Teacher.courses_count and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drifted counters')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_counters(options['dry_run'])
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        for counter, count in drifted.items():
+            self.stdout.write(self.style.SUCCESS(f'{verb} {count} drifted {counter} values'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from main.blob_store import sweep_blobs
+
+
+class Command(BaseCommand):
+    help = 'Recount references to stored blobs and delete the ones no lesson file, resource or submission uses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age-hours', type=int, default=24,
+                            help='Keep unreferenced blobs stored more recently than this')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting')
+
+    def handle(self, *args, **options):
+        stats = sweep_blobs(options['min_age_hours'], options['dry_run'])
+        prefix = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {stats['deleted']} blobs and {stats['untracked_deleted']} untracked files, "
+            f"freeing {stats['freed_bytes']} bytes; fixed {stats['recounted']} reference counts"
+        ))
@@ -0,0 +1,214 @@
+import hashlib
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.signing import TimestampSigner
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from .blob_store import BLOB_DIR
+from .models import BlobUpload, LessonFile, Resource, FileSubmission
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOB_NAME_RE = re.compile(rf'^{BLOB_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.\w+)?$')
+
+
+def media_path(name):
+    """Absolute path of a media file, or None for names outside MEDIA_ROOT or in hidden directories"""
+    if any(part.startswith('.') for part in name.split('/')):
+        return None
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def media_name_from_url(url):
+    """The media file name a URL points at, or None for URLs outside MEDIA_URL"""
+    index = url.find(settings.MEDIA_URL) if url else -1
+    if index == -1:
+        return None
+    return url[index + len(settings.MEDIA_URL):].split('?', 1)[0] or None
+
+
+def media_link_signer(name):
+    """Signer for media links; salted with the file name, so a signature only opens the file it was issued for"""
+    return TimestampSigner(salt=f'media-link:{name}')
+
+
+def signed_media_url(request, user, name):
+    """
+    Absolute URL of a media file carrying a signature of the user's id as
+    ``?access=``, valid for ``MEDIA_LINK_MAX_AGE`` seconds. Browsers open
+    links and <video> sources without our Authorization header, and the
+    login token must never end up in a URL (history, Referer, access logs).
+    """
+    signature = media_link_signer(name).sign(str(user.id))
+    return request.build_absolute_uri(settings.MEDIA_URL + name) + '?access=' + signature
+
+
+def can_access_media(user, name):
+    """
+    Whether a user may download a media file: staff always, teachers and
+    enrolled students for files their course links to, the assignment's
+    teacher for files submitted to it, and anyone for files they uploaded
+    themselves. A link only vouches for a file its course's teacher (or the
+    submitting student) uploaded, since anyone can paste any URL into one.
+    The answer is cached briefly because a player seeking through a video
+    sends many range requests.
+    """
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+
+    key = f'media-access:{user.id}:' + hashlib.sha256(name.encode()).hexdigest()
+    allowed = cache.get(key)
+    if allowed is None:
+        suffix = settings.MEDIA_URL + name
+        allowed = (
+            LessonFile.objects.filter(
+                file_url__endswith=suffix, lesson__course__teacher__user__blob_uploads__name=name
+            ).filter(
+                Q(lesson__course__teacher__user=user) | Q(lesson__course__enrollment__student__user=user)
+            ).exists()
+            or Resource.objects.filter(
+                file_url__endswith=suffix, course__teacher__user__blob_uploads__name=name
+            ).filter(
+                Q(course__teacher__user=user) | Q(course__enrollment__student__user=user)
+            ).exists()
+            # A submission is shown only to the assignment's teacher
+            or FileSubmission.objects.filter(
+                file_url__endswith=suffix, assignment__lesson__course__teacher__user=user,
+                student__user__blob_uploads__name=name
+            ).exists()
+            or BlobUpload.objects.filter(user=user, name=name).exists()
+        )
+        cache.set(key, allowed, getattr(settings, 'MEDIA_ACCESS_CACHE_TIMEOUT', 60))
+    return allowed
+
+
+def media_validators(name, stat):
+    """Return (etag, cache control) for a file; blobs are named by their digest and never change"""
+    match = BLOB_NAME_RE.match(name)
+    if match:
+        return f'"{match.group(1)}"', IMMUTABLE_CACHE_CONTROL
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', REVALIDATE_CACHE_CONTROL
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header into inclusive (start, end).
+
+    Returns None when the header is absent or not a single byte range, in
+    which case the whole file is sent, and raises ValueError when the range
+    cannot be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def range_applies(request, etag, last_modified):
+    """Honour If-Range: only send a partial response if the client's copy is still current"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and date >= last_modified
+
+
+def stream_file_range(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length:
+            block = source.read(min(STREAM_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def set_media_headers(response, etag, last_modified, cache_control):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def accel_response(name, path):
+    """Hand the transfer to the front server, which then handles ranges and sendfile itself"""
+    mode = getattr(settings, 'MEDIA_ACCEL', None)
+    response = HttpResponse()
+    if mode == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + name
+        # Let nginx pick the content type from the file it serves
+        del response['Content-Type']
+    else:
+        response['X-Sendfile'] = path
+        response['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    return response
+
+
+def media_response(request, name, path):
+    """
+    Build the response for an authorized media request: 304 for a current
+    cached copy, 206 for a satisfiable single range, otherwise the whole
+    file through FileResponse, which the WSGI server can send with
+    sendfile. With ``MEDIA_ACCEL`` set the body is left to the front server.
+    """
+    stat = os.stat(path)
+    etag, cache_control = media_validators(name, stat)
+    last_modified = int(stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return set_media_headers(not_modified, etag, last_modified, cache_control)
+
+    if getattr(settings, 'MEDIA_ACCEL', None):
+        return set_media_headers(accel_response(name, path), etag, last_modified, cache_control)
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    byte_range = None
+    if range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return set_media_headers(response, etag, last_modified, cache_control)
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(stream_file_range(path, start, length), status=206,
+                                         content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(length)
+    return set_media_headers(response, etag, last_modified, cache_control)
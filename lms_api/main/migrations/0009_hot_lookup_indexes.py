@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:26
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def remove_duplicate_rows(apps, schema_editor):
+    """Keep one enrollment per student/course and the newest OTP per phone before adding the constraints"""
+    Enrollment = apps.get_model('main', 'Enrollment')
+    OTP = apps.get_model('main', 'OTP')
+
+    keep_enrollments = Enrollment.objects.values('student', 'course').annotate(keep_id=Min('id')).values('keep_id')
+    Enrollment.objects.exclude(id__in=keep_enrollments).delete()
+
+    keep_otps = OTP.objects.values('phone_number').annotate(keep_id=Max('id')).values('keep_id')
+    OTP.objects.exclude(id__in=keep_otps).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_otp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'category', 'order'], name='lesson_course_category_order'),
+        ),
+        migrations.AddIndex(
+            model_name='lessoncategory',
+            index=models.Index(fields=['course', 'order'], name='lessoncategory_course_order'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['student', 'course'], name='payment_student_course'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['lesson_category', 'order'], name='quiz_category_order'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['student', 'quiz'], name='result_student_quiz'),
+        ),
+        migrations.RunPython(remove_duplicate_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_enrollment_student_course'),
+        ),
+        migrations.AddConstraint(
+            model_name='otp',
+            constraint=models.UniqueConstraint(fields=('phone_number',), name='unique_otp_phone_number'),
+        ),
+    ]
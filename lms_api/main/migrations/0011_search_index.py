@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# The search index as main.search_service defined it when this migration was
+# written, frozen here in raw SQL so the migration does not change with it.
+# Each row's rowid is object id * 4 + kind code (course 0, lesson 1, category 2, teacher 3).
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS main_search_index USING fts5("
+    "title, body, kind UNINDEXED, object_id UNINDEXED, course_id UNINDEXED, available UNINDEXED, "
+    "tokenize = 'porter unicode61', prefix = '2 3')"
+)
+SET_RANK = "INSERT INTO main_search_index(main_search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+POPULATE = [
+    """
+    INSERT INTO main_search_index(rowid, title, body, kind, object_id, course_id, available)
+    SELECT main_course.id * 4 + 0, main_course.title, main_course.description,
+           'course', main_course.id, main_course.id, main_course.is_available
+    FROM main_course
+    """,
+    """
+    INSERT INTO main_search_index(rowid, title, body, kind, object_id, course_id, available)
+    SELECT main_lesson.id * 4 + 1, main_lesson.title, main_lesson.content,
+           'lesson', main_lesson.id, main_lesson.course_id, main_course.is_available
+    FROM main_lesson JOIN main_course ON main_course.id = main_lesson.course_id
+    """,
+    """
+    INSERT INTO main_search_index(rowid, title, body, kind, object_id, course_id, available)
+    SELECT main_coursecategory.id * 4 + 2, main_coursecategory.title, main_coursecategory.description,
+           'category', main_coursecategory.id, NULL, 1
+    FROM main_coursecategory
+    """,
+    """
+    INSERT INTO main_search_index(rowid, title, body, kind, object_id, course_id, available)
+    SELECT main_teacher.id * 4 + 3,
+           COALESCE(NULLIF(TRIM(auth_user.first_name || ' ' || auth_user.last_name), ''), auth_user.username),
+           main_teacher.expertise, 'teacher', main_teacher.id, NULL, auth_user.is_active
+    FROM main_teacher JOIN auth_user ON auth_user.id = main_teacher.user_id
+    """,
+]
+OPTIMIZE = "INSERT INTO main_search_index(main_search_index) VALUES ('optimize')"
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; search is disabled on other databases
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        cursor.execute(SET_RANK)
+        for statement in POPULATE:
+            cursor.execute(statement)
+        cursor.execute(OPTIMIZE)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS main_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:44
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+def populate_course_stats(apps, schema_editor):
+    """
+    Fill both rollup tables from the source rows, as rebuild_course_stats did
+    when this migration was written; kept here with the historical models so
+    the migration does not change when the live service does.
+    """
+    Enrollment = apps.get_model('main', 'Enrollment')
+    Payment = apps.get_model('main', 'Payment')
+    Result = apps.get_model('main', 'Result')
+    Feedback = apps.get_model('main', 'Feedback')
+    CourseStats = apps.get_model('main', 'CourseStats')
+    CourseDailyStats = apps.get_model('main', 'CourseDailyStats')
+
+    daily = defaultdict(lambda: defaultdict(int))
+
+    for row in Enrollment.objects.values('course_id', 'enrollment_date').annotate(n=Count('id')):
+        daily[row['course_id'], row['enrollment_date']]['enrollments'] += row['n']
+
+    payments = Payment.objects.filter(payment_status='completed')
+    for row in payments.values('course_id', 'payment_date').annotate(n=Count('id'), total=Sum('amount')):
+        bucket = daily[row['course_id'], row['payment_date']]
+        bucket['payments'] += row['n']
+        bucket['revenue'] += row['total'] or Decimal('0')
+
+    results = Result.objects.filter(quiz__lesson_category__isnull=False).values_list(
+        'quiz__lesson_category__course_id', 'created_at', 'score', 'quiz__total_marks'
+    )
+    for course_id, created_at, score, total_marks in results.iterator():
+        bucket = daily[course_id, timezone.localdate(created_at)]
+        bucket['results'] += 1
+        bucket['score_sum'] += score
+        bucket['percentage_sum'] += score / total_marks * 100 if total_marks else 0.0
+
+    for course_id, created_at, rating in Feedback.objects.values_list('course_id', 'created_at', 'rating').iterator():
+        bucket = daily[course_id, timezone.localdate(created_at)]
+        bucket['feedbacks'] += 1
+        bucket['rating_sum'] += rating
+
+    totals = defaultdict(lambda: defaultdict(int))
+    for (course_id, _), counters in daily.items():
+        for field, value in counters.items():
+            totals[course_id][field] += value
+
+    CourseDailyStats.objects.bulk_create(
+        (CourseDailyStats(course_id=course_id, date=date, **counters)
+         for (course_id, date), counters in daily.items()),
+        batch_size=1000
+    )
+    CourseStats.objects.bulk_create(
+        (CourseStats(course_id=course_id, **counters) for course_id, counters in totals.items()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('enrollments', models.IntegerField(default=0)),
+                ('payments', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('results', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('feedbacks', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='main.course')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': '20. Course Stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrollments', models.IntegerField(default=0)),
+                ('payments', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('results', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('feedbacks', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('date', models.DateField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='main.course')),
+            ],
+            options={
+                'verbose_name_plural': '21. Course Daily Stats',
+                'constraints': [models.UniqueConstraint(fields=('course', 'date'), name='unique_course_daily_stats')],
+            },
+        ),
+        migrations.RunPython(populate_course_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:46
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, fk):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+def populate_counters(apps, schema_editor):
+    Course = apps.get_model('main', 'Course')
+    Teacher = apps.get_model('main', 'Teacher')
+    Enrollment = apps.get_model('main', 'Enrollment')
+    Course.objects.update(enrollment_count=count_of(Enrollment, 'course'))
+    Teacher.objects.update(courses_count=count_of(Course, 'teacher'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_course_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='courses_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_replication_heartbeat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blob_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': '23. Blob Uploads',
+                'constraints': [models.UniqueConstraint(fields=('user', 'name'), name='unique_blob_upload_user_name')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_blob_uploads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='teacher',
+            name='experience',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
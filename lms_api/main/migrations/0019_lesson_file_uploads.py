@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def record_lesson_file_uploads(apps, schema_editor):
+    """
+    Record each course's teacher as the uploader of the media their lesson
+    files link to, so files linked before uploads were recorded stay
+    downloadable. Lesson files could only be added by the course's teacher;
+    resources could be added by anyone, so they are not trusted here.
+    """
+    LessonFile = apps.get_model('main', 'LessonFile')
+    BlobUpload = apps.get_model('main', 'BlobUpload')
+
+    marker = settings.MEDIA_URL
+    links = LessonFile.objects.filter(file_url__contains=marker).values_list(
+        'file_url', 'lesson__course__teacher__user_id'
+    )
+    uploads = set()
+    for file_url, user_id in links.iterator():
+        name = file_url[file_url.find(marker) + len(marker):]
+        if name and user_id is not None:
+            uploads.add((user_id, name))
+    BlobUpload.objects.bulk_create(
+        [BlobUpload(user_id=user_id, name=name) for user_id, name in uploads],
+        batch_size=500, ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_teacher_experience_min_value'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_lesson_file_uploads, migrations.RunPython.noop),
+    ]
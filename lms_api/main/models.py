@@ -1,13 +1,36 @@
+import uuid
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
 
-class Teacher(models.Model):
+
+class CounterFieldsMixin:
+    """
+    Keep denormalized counters out of ordinary saves. The counters are only
+    changed with F() updates, so writing back the value an instance was
+    loaded with could undo increments made since.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Teacher(CounterFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     qualification = models.CharField(max_length=200)
     mobile_no = models.CharField(max_length=20) 
     experience = models.IntegerField(validators=[MinValueValidator(0)])
     expertise = models.TextField()
+    courses_count = models.IntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    counter_fields = ('courses_count',)
     
     def __str__(self):
         return self.user.get_full_name() or self.user.username
@@ -19,6 +42,7 @@ class Teacher(models.Model):
 class CourseCategory(models.Model):
     title = models.CharField(max_length=150)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -27,7 +51,7 @@ class CourseCategory(models.Model):
         verbose_name_plural = "2. Course Categories"
 
 
-class Course(models.Model):
+class Course(CounterFieldsMixin, models.Model):
     category = models.ForeignKey(CourseCategory, on_delete=models.CASCADE)
     teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='courses')
     code = models.CharField(max_length=20, unique=True)
@@ -35,7 +59,11 @@ class Course(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     is_available = models.BooleanField(default=True)
+    enrollment_count = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    counter_fields = ('enrollment_count',)
     
     def __str__(self):
         return f"{self.code} - {self.title}"
@@ -69,6 +97,9 @@ class Enrollment(models.Model):
 
     class Meta:
         verbose_name_plural = "5. Enrollments"
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment_student_course'),
+        ]
 
 
 class LessonCategory(models.Model):
@@ -76,6 +107,7 @@ class LessonCategory(models.Model):
     title = models.CharField(max_length=150)
     description = models.TextField(blank=True, null=True)
     order = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.course.code} - {self.title}"
@@ -83,6 +115,9 @@ class LessonCategory(models.Model):
     class Meta:
         verbose_name_plural = "6a. Lesson Categories"
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['course', 'order'], name='lessoncategory_course_order'),
+        ]
 
 
 class Lesson(models.Model):
@@ -93,6 +128,7 @@ class Lesson(models.Model):
     upload_date = models.DateField(auto_now_add=True)
     video_url = models.URLField(blank=True, null=True)
     order = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.course.code} - {self.title}"
@@ -100,12 +136,16 @@ class Lesson(models.Model):
     class Meta:
         verbose_name_plural = "6. Lessons"
         ordering = ['category', 'order']
+        indexes = [
+            models.Index(fields=['course', 'category', 'order'], name='lesson_course_category_order'),
+        ]
 
 
 class LessonFile(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='files')
     title = models.CharField(max_length=150)
     file_url = models.URLField()
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.lesson.title} - {self.title}"
@@ -151,6 +191,7 @@ class Quiz(models.Model):
     total_marks = models.IntegerField()
     duration = models.IntegerField()
     order = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         category_str = self.lesson_category.title if self.lesson_category else "No Category"
@@ -159,11 +200,15 @@ class Quiz(models.Model):
     class Meta:
         verbose_name_plural = "9. Quizzes"
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['lesson_category', 'order'], name='quiz_category_order'),
+        ]
 
 class Question(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
     text = models.TextField()
     marks = models.IntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.quiz.title} - {self.text[:50]}"
@@ -175,6 +220,7 @@ class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
     text = models.TextField()
     is_correct = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.question.text[:50]} - {self.text[:50]}"
@@ -187,12 +233,16 @@ class Result(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     score = models.FloatField()
     grade_awarded = models.CharField(max_length=10)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.quiz.title} - {self.student.user.username} - {self.score}"
 
     class Meta:
         verbose_name_plural = "12. Results"
+        indexes = [
+            models.Index(fields=['student', 'quiz'], name='result_student_quiz'),
+        ]
 
 
 class Payment(models.Model):
@@ -207,6 +257,9 @@ class Payment(models.Model):
 
     class Meta:
         verbose_name_plural = "13. Payments"
+        indexes = [
+            models.Index(fields=['student', 'course'], name='payment_student_course'),
+        ]
 
 
 class Feedback(models.Model):
@@ -214,6 +267,7 @@ class Feedback(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     comments = models.TextField()
     rating = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.course.code} - {self.student.user.username} - {self.rating}"
@@ -261,3 +315,104 @@ class OTP(models.Model):
 
     class Meta:
         verbose_name_plural = "17. OTPs"
+        constraints = [
+            models.UniqueConstraint(fields=['phone_number'], name='unique_otp_phone_number'),
+        ]
+
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(validators=[MinValueValidator(1)])
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.BigIntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    class Meta:
+        verbose_name_plural = "18. Upload Sessions"
+
+class Blob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+    class Meta:
+        verbose_name_plural = "19. Blobs"
+
+
+class BlobUpload(models.Model):
+    """Who uploaded a blob; identical content is stored once, so one blob may have several uploaders"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blob_uploads')
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} by {self.user_id}"
+
+    class Meta:
+        verbose_name_plural = "23. Blob Uploads"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_blob_upload_user_name'),
+        ]
+
+
+class CourseCounters(models.Model):
+    """Running totals kept by the analytics signals; averages are sums divided by counts"""
+    enrollments = models.IntegerField(default=0)
+    payments = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    results = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    percentage_sum = models.FloatField(default=0)
+    feedbacks = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class CourseStats(CourseCounters):
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.course_id}"
+
+    class Meta:
+        verbose_name_plural = "20. Course Stats"
+
+
+class CourseDailyStats(CourseCounters):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+
+    def __str__(self):
+        return f"Stats for {self.course_id} on {self.date}"
+
+    class Meta:
+        verbose_name_plural = "21. Course Daily Stats"
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'date'], name='unique_course_daily_stats'),
+        ]
+
+
+class ReplicationHeartbeat(models.Model):
+    """Single row the check_replicas command stamps on the primary; how old it is on a replica is that replica's lag"""
+    beat_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Heartbeat at {self.beat_at}"
+
+    class Meta:
+        verbose_name_plural = "22. Replication Heartbeats"
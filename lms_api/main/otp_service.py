@@ -3,7 +3,7 @@ import string
 from datetime import datetime, timedelta
 from django.utils import timezone
 from .models import OTP
-from django.core.mail import send_mail
+from .mail_service import queue_mail
 from django.conf import settings
 import logging
 
@@ -18,15 +18,14 @@ def generate_otp(length=6):
 def send_otp_email(phone_number, email):
     """
     Generate OTP and send it via email
+
+    The mail is queued and goes out once the OTP row is committed, so the
+    request does not wait on the mail server.
     """
     try:
-        print(f"\n OTP REQUEST: Phone={phone_number}, Email={email}")
-        
         otp_code = generate_otp()
-        print(f"OTP Generated: {otp_code}")
-        
         expires_at = timezone.now() + timedelta(minutes=5)
-        
+
         otp_obj, created = OTP.objects.update_or_create(
             phone_number=phone_number,
             defaults={
@@ -37,7 +36,6 @@ def send_otp_email(phone_number, email):
                 'attempts': 0
             }
         )
-        print(f" OTP Saved to Database: ID={otp_obj.id}")
         
         subject = 'LMS Payment Verification Code'
         message = f"""
@@ -71,20 +69,8 @@ LMS Team
         </html>
         """
         
-        print(f" Sending email to: {email}")
-        print(f" Using backend: {settings.EMAIL_BACKEND}")
-        print(f" From: {settings.DEFAULT_FROM_EMAIL}")
-        
-        email_result = send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        
-        print(f" Email sent successfully! Result: {email_result}")
+        queue_mail(subject, message, [email], html_message=html_message)
+        logger.info("OTP %s queued for %s", otp_obj.id, email)
         
         return {
             'success': True,
@@ -93,9 +79,7 @@ LMS Team
         }
     
     except Exception as e:
-        error_msg = f" ERROR in send_otp_email: {str(e)}"
-        print(error_msg)
-        logger.error(error_msg, exc_info=True)
+        logger.error("ERROR in send_otp_email: %s", e, exc_info=True)
         return {
             'success': False,
             'message': str(e)
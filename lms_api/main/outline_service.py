@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from .models import Course, LessonCategory, Lesson, Quiz, Result
+from .serializers import CourseSerializer, LessonCategorySerializer, LessonSerializer, QuizSerializer, ResultSerializer
+from .cache_service import get_version
+from .db_router import pin_to_primary, recently_changed
+
+OUTLINE_CACHE_TIMEOUT = 60 * 60
+
+
+def build_course_outline(course_id):
+    """
+    Build the shared part of a course outline (everything except per-user results).
+
+    Uses a fixed number of queries regardless of how many lessons, files or
+    quizzes the course has.
+    """
+    course = Course.objects.select_related('category', 'teacher__user').get(pk=course_id)
+    categories = LessonCategory.objects.filter(course_id=course_id).order_by('order', 'id')
+    lessons = (
+        Lesson.objects.filter(course_id=course_id)
+        .select_related('category')
+        .prefetch_related('files')
+        .order_by('order', 'id')
+    )
+    quizzes = Quiz.objects.filter(lesson_category__course_id=course_id).order_by('order', 'id')
+
+    tree = []
+    by_category = {}
+    for category_data in LessonCategorySerializer(categories, many=True).data:
+        node = dict(category_data, lessons=[], quizzes=[])
+        by_category[node['id']] = node
+        tree.append(node)
+
+    uncategorized_lessons = []
+    for lesson_data in LessonSerializer(lessons, many=True).data:
+        node = by_category.get(lesson_data['category'])
+        if node is None:
+            uncategorized_lessons.append(lesson_data)
+        else:
+            node['lessons'].append(lesson_data)
+
+    for quiz_data in QuizSerializer(quizzes, many=True).data:
+        by_category[quiz_data['lesson_category']]['quizzes'].append(quiz_data)
+
+    return {
+        'course': CourseSerializer(course).data,
+        'lesson_categories': tree,
+        'uncategorized_lessons': uncategorized_lessons,
+    }
+
+
+def get_course_outline(course_id, user=None):
+    """
+    Return the outline document for a course, served from the cache while the
+    course version is unchanged. The caller's own results are always read live.
+    """
+    version = get_version('course', course_id)
+    cache_key = f"course-outline:{course_id}:{version}"
+    outline = cache.get(cache_key)
+    if outline is None:
+        if recently_changed([version]):
+            # A replica may not have the change yet; build what gets cached from the primary
+            pin_to_primary()
+        outline = build_course_outline(course_id)
+        cache.set(cache_key, outline, OUTLINE_CACHE_TIMEOUT)
+
+    results = []
+    if user is not None and user.is_authenticated:
+        results = ResultSerializer(
+            Result.objects.filter(student__user=user, quiz__lesson_category__course_id=course_id),
+            many=True
+        ).data
+
+    return dict(outline, version=version, results=results)
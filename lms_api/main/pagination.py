@@ -0,0 +1,34 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class StableCursorPagination(CursorPagination):
+    """
+    Cursor pagination over a stable, indexed ordering.
+
+    Viewsets can set ``cursor_ordering`` to paginate along their natural
+    order (for example ``('order', 'id')``); everything else pages by primary key.
+
+    While ``LEGACY_UNPAGINATED_LISTS`` is on, lists are only paginated when the
+    client opts in by sending ``cursor`` or ``page_size``, so existing callers
+    keep receiving plain arrays.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if getattr(settings, 'LEGACY_UNPAGINATED_LISTS', False) and not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
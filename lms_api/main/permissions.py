@@ -0,0 +1,90 @@
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+from .models import Course, LessonCategory, Lesson, LessonFile, Resource, Quiz, Question, Answer
+
+# Lookup from each teacher-owned model to the user of the teacher who owns it
+OWNER_PATHS = {
+    Course: 'teacher__user',
+    LessonCategory: 'course__teacher__user',
+    Lesson: 'course__teacher__user',
+    LessonFile: 'lesson__course__teacher__user',
+    Resource: 'course__teacher__user',
+    Quiz: 'lesson_category__course__teacher__user',
+    Question: 'quiz__lesson_category__course__teacher__user',
+    Answer: 'question__quiz__lesson_category__course__teacher__user',
+}
+
+
+def is_owner(request, model, pk):
+    """
+    Check whether the requesting user is the teacher who owns a row.
+
+    The whole ownership chain is resolved in one joined query and the answer is
+    memoized on the request, so repeated checks for the same row are free.
+    """
+    user = request.user
+    if not user or not user.is_authenticated or pk is None:
+        return False
+
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return False
+
+    memo = request.__dict__.setdefault('_ownership_memo', {})
+    key = (model, pk)
+    if key not in memo:
+        memo[key] = model.objects.filter(pk=pk, **{OWNER_PATHS[model]: user}).exists()
+    return memo[key]
+
+
+class IsTeacherOwner(BasePermission):
+    """
+    Anyone may read; writes require the requesting teacher to own the object
+    through the ownership path declared for its model in OWNER_PATHS.
+    """
+    message = "You can only modify content in your own courses"
+
+    def has_permission(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return bool(request.user and request.user.is_authenticated)
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS:
+            return True
+        return is_owner(request, type(obj), obj.pk)
+
+
+class TeacherOwnedMixin:
+    """
+    Viewset mixin that checks the parent a row is attached to on create and
+    update, e.g. the quiz a new question is added to.
+
+    Set ``owner_parent_field`` to the serializer field holding the parent.
+    Viewsets whose parent is not a writable serializer field override
+    ``get_owner_parent``.
+    """
+    owner_parent_field = None
+    owner_denied_message = "You can only modify content in your own courses"
+
+    def get_owner_parent(self, serializer):
+        return serializer.validated_data.get(self.owner_parent_field)
+
+    def check_owner_parent(self, serializer, required):
+        from rest_framework.exceptions import PermissionDenied, ValidationError
+        parent = self.get_owner_parent(serializer)
+        if parent is None:
+            if required:
+                raise ValidationError({self.owner_parent_field: ["This field is required."]})
+            return None
+        if not is_owner(self.request, type(parent), parent.pk):
+            raise PermissionDenied(self.owner_denied_message)
+        return parent
+
+    def perform_create(self, serializer):
+        self.check_owner_parent(serializer, required=True)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        self.check_owner_parent(serializer, required=False)
+        serializer.save()
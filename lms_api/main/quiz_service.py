@@ -0,0 +1,228 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Quiz, Question, Answer
+from .cache_service import get_version, bump_version_on_commit
+
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60
+
+GRADE_THRESHOLDS = [
+    (90, 'A'),
+    (80, 'B'),
+    (70, 'C'),
+    (60, 'D'),
+    (50, 'E'),
+]
+
+
+def grade_for_percentage(percentage):
+    """Map a percentage onto the letter grade scale used by the quiz screen"""
+    for threshold, grade in GRADE_THRESHOLDS:
+        if percentage >= threshold:
+            return grade
+    return 'F'
+
+
+def build_answer_key(quiz_id):
+    """
+    Build the answer-key index for a quiz in two queries:
+    question id -> marks and correct answer ids, and answer id -> question id.
+    """
+    questions = {
+        question_id: {'marks': marks, 'correct': set()}
+        for question_id, marks in Question.objects.filter(quiz_id=quiz_id).values_list('id', 'marks')
+    }
+    answers = {}
+    for answer_id, question_id, is_correct in Answer.objects.filter(
+        question__quiz_id=quiz_id
+    ).values_list('id', 'question_id', 'is_correct'):
+        answers[answer_id] = question_id
+        if is_correct:
+            questions[question_id]['correct'].add(answer_id)
+    return {'questions': questions, 'answers': answers}
+
+
+def get_answer_key(quiz_id):
+    """Return the answer-key index for the current version of a quiz"""
+    cache_key = f"quiz-answer-key:{quiz_id}:{get_version('quiz', quiz_id)}"
+    answer_key = cache.get(cache_key)
+    if answer_key is None:
+        answer_key = build_answer_key(quiz_id)
+        cache.set(cache_key, answer_key, ANSWER_KEY_CACHE_TIMEOUT)
+    return answer_key
+
+
+def grade_quiz(quiz, answer_ids, reveal_answers=False):
+    """
+    Grade a set of chosen answer ids against the quiz answer key.
+
+    A question earns its marks when the chosen answers for it are exactly its
+    correct answers. The correct answer ids are only included with
+    ``reveal_answers``, so a student with attempts left cannot read the key
+    off a throwaway submission. Raises ValueError for answers that do not
+    belong to the quiz.
+    """
+    answer_key = get_answer_key(quiz.id)
+
+    chosen = {}
+    for answer_id in answer_ids:
+        question_id = answer_key['answers'].get(answer_id)
+        if question_id is None:
+            raise ValueError(f"Answer {answer_id} does not belong to this quiz")
+        chosen.setdefault(question_id, set()).add(answer_id)
+
+    score = 0
+    total = 0
+    breakdown = []
+    for question_id, question in answer_key['questions'].items():
+        selected = chosen.get(question_id, set())
+        is_correct = bool(question['correct']) and selected == question['correct']
+        marks_awarded = question['marks'] if is_correct else 0
+        score += marks_awarded
+        total += question['marks']
+        entry = {
+            'question': question_id,
+            'selected_answers': sorted(selected),
+            'is_correct': is_correct,
+            'marks': question['marks'],
+            'marks_awarded': marks_awarded,
+        }
+        if reveal_answers:
+            entry['correct_answers'] = sorted(question['correct'])
+        breakdown.append(entry)
+
+    percentage = (score / total) * 100 if total > 0 else 0
+    marks_obtained = (score / total) * quiz.total_marks if total > 0 else 0
+
+    return {
+        'score': score,
+        'total_marks': total,
+        'marks_obtained': round(marks_obtained, 2),
+        'quiz_total_marks': quiz.total_marks,
+        'percentage': round(percentage, 2),
+        'grade': grade_for_percentage(percentage),
+        'questions': breakdown,
+    }
+
+
+def sync_total_marks(quiz_ids):
+    """
+    Set each quiz's total_marks back to the sum of its question marks, for
+    questions written one at a time rather than through ``save_quiz_tree``.
+    Only quizzes whose total changed are saved.
+    """
+    quizzes = Quiz.objects.filter(id__in=quiz_ids).annotate(question_marks=Coalesce(Sum('questions__marks'), 0))
+    for quiz in quizzes:
+        if quiz.total_marks != quiz.question_marks:
+            quiz.total_marks = quiz.question_marks
+            quiz.save(update_fields=['total_marks', 'updated_at'])
+
+
+@transaction.atomic
+def save_quiz_tree(data, quiz=None):
+    """
+    Create a quiz, or replace an existing one, together with all its questions
+    and answers using bulk writes.
+
+    Questions and answers that carry an ``id`` are matched against the stored
+    ones and only rewritten when they changed; those without an ``id`` are
+    inserted and stored ones missing from the payload are deleted. The quiz
+    total_marks is kept equal to the sum of its question marks. Raises
+    ValueError for ids that do not belong to the quiz.
+    """
+    data = dict(data)
+    questions_data = data.pop('questions')
+    data['total_marks'] = sum(question['marks'] for question in questions_data)
+
+    if quiz is None:
+        quiz = Quiz.objects.create(**data)
+        existing = {}
+    else:
+        changed_fields = [field for field, value in data.items() if getattr(quiz, field) != value]
+        for field in changed_fields:
+            setattr(quiz, field, data[field])
+        if changed_fields:
+            quiz.save(update_fields=changed_fields + ['updated_at'])
+        existing = {question.id: question for question in quiz.questions.prefetch_related('answers')}
+
+    new_questions = []
+    new_answers = []
+    updated_questions = []
+    updated_answers = []
+    stale_answer_ids = []
+    kept_question_ids = set()
+
+    for question_data in questions_data:
+        question_id = question_data.get('id')
+        if question_id is None:
+            new_questions.append((
+                Question(quiz=quiz, text=question_data['text'], marks=question_data['marks']),
+                question_data['answers']
+            ))
+            continue
+
+        question = existing.get(question_id)
+        if question is None or question_id in kept_question_ids:
+            raise ValueError(f"Question {question_id} does not belong to this quiz")
+        kept_question_ids.add(question_id)
+
+        if question.text != question_data['text'] or question.marks != question_data['marks']:
+            question.text = question_data['text']
+            question.marks = question_data['marks']
+            updated_questions.append(question)
+
+        current_answers = {answer.id: answer for answer in question.answers.all()}
+        kept_answer_ids = set()
+        for answer_data in question_data['answers']:
+            answer_id = answer_data.get('id')
+            if answer_id is None:
+                new_answers.append(Answer(
+                    question=question, text=answer_data['text'], is_correct=answer_data['is_correct']
+                ))
+                continue
+
+            answer = current_answers.get(answer_id)
+            if answer is None or answer_id in kept_answer_ids:
+                raise ValueError(f"Answer {answer_id} does not belong to question {question_id}")
+            kept_answer_ids.add(answer_id)
+
+            if answer.text != answer_data['text'] or answer.is_correct != answer_data['is_correct']:
+                answer.text = answer_data['text']
+                answer.is_correct = answer_data['is_correct']
+                updated_answers.append(answer)
+
+        stale_answer_ids.extend(answer_id for answer_id in current_answers if answer_id not in kept_answer_ids)
+
+    stale_question_ids = [question_id for question_id in existing if question_id not in kept_question_ids]
+
+    if new_questions:
+        Question.objects.bulk_create([question for question, _ in new_questions])
+        for question, answers_data in new_questions:
+            new_answers.extend(
+                Answer(question=question, text=answer_data['text'], is_correct=answer_data['is_correct'])
+                for answer_data in answers_data
+            )
+    if new_answers:
+        Answer.objects.bulk_create(new_answers)
+    # bulk_update does not apply auto_now, so stamp updated_at explicitly
+    now = timezone.now()
+    if updated_questions:
+        for question in updated_questions:
+            question.updated_at = now
+        Question.objects.bulk_update(updated_questions, ['text', 'marks', 'updated_at'])
+    if updated_answers:
+        for answer in updated_answers:
+            answer.updated_at = now
+        Answer.objects.bulk_update(updated_answers, ['text', 'is_correct', 'updated_at'])
+    if stale_answer_ids:
+        Answer.objects.filter(id__in=stale_answer_ids).delete()
+    if stale_question_ids:
+        Question.objects.filter(id__in=stale_question_ids).delete()
+
+    # Bulk writes skip model signals, so invalidate the answer key and cached responses explicitly
+    bump_version_on_commit('quiz', quiz.id)
+    bump_version_on_commit('resource', 'question')
+    bump_version_on_commit('resource', 'answer')
+    return quiz
@@ -0,0 +1,145 @@
+import hashlib
+import threading
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .cache_service import aget_version, get_version, version_key
+from .db_router import pin_to_primary, recently_changed
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def record_cache_event(name, hit):
+    with _stats_lock:
+        _stats[(name, 'hits' if hit else 'misses')] += 1
+
+
+def cache_stats():
+    """Hit/miss counters of this process, per viewset and in total"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+
+    per_view = {}
+    for (name, kind), count in snapshot.items():
+        per_view.setdefault(name, {'hits': 0, 'misses': 0})[kind] = count
+
+    hits = sum(view['hits'] for view in per_view.values())
+    misses = sum(view['misses'] for view in per_view.values())
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+        'views': per_view,
+    }
+
+
+def resource_versions(resources):
+    """Current version of each resource, fetched with a single cache round trip"""
+    keys = [version_key('resource', name) for name in resources]
+    found = cache.get_many(keys)
+    return [
+        found[key] if key in found else get_version('resource', name)
+        for key, name in zip(keys, resources)
+    ]
+
+
+async def aresource_versions(resources):
+    """``resource_versions`` for async views"""
+    keys = [version_key('resource', name) for name in resources]
+    found = await cache.aget_many(keys)
+    return [
+        found[key] if key in found else await aget_version('resource', name)
+        for key, name in zip(keys, resources)
+    ]
+
+
+def response_cache_key(basename, action, variant, renderer_format, versions, full_path):
+    """Key of a cached response; shared by the DRF viewsets and the async read views"""
+    path = hashlib.sha256(full_path.encode()).hexdigest()
+    return (
+        f"response:{basename}:{action}:{variant}:{renderer_format}:"
+        f"{'.'.join(map(str, versions))}:{path}"
+    )
+
+
+def response_validators(cache_key, versions):
+    """(ETag, Last-Modified timestamp) of a response cached under ``cache_key``"""
+    etag = '"%s"' % hashlib.sha256(cache_key.encode()).hexdigest()[:32]
+    last_modified = max(versions) // 1_000_000_000 if versions else None
+    return etag, last_modified
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+
+
+class CachedResponseMixin:
+    """
+    Cache successful list and retrieve responses of read-mostly viewsets and
+    answer conditional GETs.
+
+    ``cache_resources`` names the resources the response is built from; each
+    has a version key that signals bump on every write to the underlying
+    table, so a cached response is never reused once its data has changed.
+    The same versions give a strong ETag and a Last-Modified stamp, so
+    If-None-Match / If-Modified-Since short-circuit to 304 before the
+    queryset or serializer runs.
+    """
+    cache_resources = ()
+    cache_timeout = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request, versions):
+        renderer = getattr(request, 'accepted_renderer', None)
+        return response_cache_key(
+            self.basename, self.action, self.get_serializer_class().__name__,
+            getattr(renderer, 'format', ''), versions, request.get_full_path()
+        )
+
+    def set_validators(self, response, etag, last_modified):
+        set_validators(response, etag, last_modified)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versions = resource_versions(self.cache_resources)
+        cache_key = self.get_response_cache_key(request, versions)
+        etag, last_modified = response_validators(cache_key, versions)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            self.set_validators(not_modified, etag, last_modified)
+            return not_modified
+
+        use_cache = getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+        data = cache.get(cache_key) if use_cache else None
+        if data is not None:
+            record_cache_event(self.basename, hit=True)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            self.set_validators(response, etag, last_modified)
+            return response
+
+        if use_cache and recently_changed(versions):
+            # A replica may not have the change yet; build what gets cached from the primary
+            pin_to_primary()
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            if use_cache:
+                record_cache_event(self.basename, hit=False)
+                timeout = self.cache_timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+                cache.set(cache_key, response.data, timeout)
+                response['X-Cache'] = 'MISS'
+            self.set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,205 @@
+import html
+import re
+from django.db import connection
+
+SEARCH_TABLE = 'main_search_index'
+
+# Each indexed row gets rowid = object id * len(KINDS) + kind code, so an
+# incremental update addresses its rows by rowid instead of scanning the index
+KINDS = {
+    'course': 0,
+    'lesson': 1,
+    'category': 2,
+    'teacher': 3,
+}
+
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+# snippet() marks matches with these control characters; the indexed text is
+# user content, so it is HTML-escaped before they become <mark> tags
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+# Set-based SELECTs producing (rowid, title, body, kind, object_id, course_id, available)
+_SOURCES = {
+    'course': """
+        SELECT main_course.id * {n} + {code}, main_course.title, main_course.description,
+               'course', main_course.id, main_course.id, main_course.is_available
+        FROM main_course {where}
+    """,
+    'lesson': """
+        SELECT main_lesson.id * {n} + {code}, main_lesson.title, main_lesson.content,
+               'lesson', main_lesson.id, main_lesson.course_id, main_course.is_available
+        FROM main_lesson JOIN main_course ON main_course.id = main_lesson.course_id {where}
+    """,
+    'category': """
+        SELECT main_coursecategory.id * {n} + {code}, main_coursecategory.title, main_coursecategory.description,
+               'category', main_coursecategory.id, NULL, 1
+        FROM main_coursecategory {where}
+    """,
+    'teacher': """
+        SELECT main_teacher.id * {n} + {code},
+               COALESCE(NULLIF(TRIM(auth_user.first_name || ' ' || auth_user.last_name), ''), auth_user.username),
+               main_teacher.expertise, 'teacher', main_teacher.id, NULL, auth_user.is_active
+        FROM main_teacher JOIN auth_user ON auth_user.id = main_teacher.user_id {where}
+    """,
+}
+
+_COLUMNS = 'rowid, title, body, kind, object_id, course_id, available'
+
+_TABLES = {
+    'course': 'main_course',
+    'lesson': 'main_lesson',
+    'category': 'main_coursecategory',
+    'teacher': 'main_teacher',
+}
+
+
+def search_enabled(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def _source_sql(kind, where=''):
+    return _SOURCES[kind].format(n=len(KINDS), code=KINDS[kind], where=where)
+
+
+def create_search_table(conn=None):
+    """Create the FTS5 table and make bm25 with the title/body weights its rank function"""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "title, body, kind UNINDEXED, object_id UNINDEXED, course_id UNINDEXED, available UNINDEXED, "
+            "tokenize = 'porter unicode61', prefix = '2 3')"
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', %s)",
+            [f'bm25({TITLE_WEIGHT}, {BODY_WEIGHT})']
+        )
+
+
+def drop_search_table(conn=None):
+    with (conn or connection).cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def rebuild_search_index(conn=None):
+    """Repopulate the whole index with one INSERT ... SELECT per kind, then merge its segments"""
+    conn = conn or connection
+    counts = {}
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        for kind in KINDS:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({_COLUMNS}) {_source_sql(kind)}")
+            counts[kind] = cursor.rowcount
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def index_object(kind, object_id):
+    """Insert or refresh the index row of one object"""
+    if not search_enabled():
+        return
+    table = _TABLES[kind]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [object_id * len(KINDS) + KINDS[kind]])
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({_COLUMNS}) {_source_sql(kind, f'WHERE {table}.id = %s')}",
+            [object_id]
+        )
+
+
+def index_course_lessons(course_id):
+    """Refresh the lessons of a course, which carry the course's availability"""
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+            f"(SELECT id * {len(KINDS)} + {KINDS['lesson']} FROM main_lesson WHERE course_id = %s)",
+            [course_id]
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({_COLUMNS}) {_source_sql('lesson', 'WHERE main_lesson.course_id = %s')}",
+            [course_id]
+        )
+
+
+def remove_object(kind, object_id):
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [object_id * len(KINDS) + KINDS[kind]])
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last word also matches as a prefix so results appear while typing.
+    """
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """Escape a snippet for HTML and wrap its matches in <mark>"""
+    return html.escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _ranked_hits(match, kinds, limit, exclude=()):
+    params = [MARK_START, MARK_END, match]
+    filters = ''
+    if kinds:
+        filters += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+        params.extend(kinds)
+    if exclude:
+        filters += f" AND rowid NOT IN ({', '.join(['%s'] * len(exclude))})"
+        params.extend(exclude)
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, kind, object_id, course_id, title, "
+            f"snippet({SEARCH_TABLE}, -1, %s, %s, '...', 16), rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND available = 1{filters} "
+            f"ORDER BY rank LIMIT %s",
+            params
+        )
+        return cursor.fetchall()
+
+
+def search(text, kinds=None, limit=20):
+    """
+    Return ranked hits with highlighted snippets, skipping unavailable courses
+    and their lessons.
+
+    bm25 has to score every matching row before the best ones can be picked,
+    and a common word matches a large part of the lesson bodies. Title matches
+    outrank body matches through the column weights anyway, so they are ranked
+    first on their own (titles are short, so far fewer rows match) and body
+    matches are only ranked when the titles do not fill the page.
+    """
+    match = build_match_query(text)
+    if match is None or not search_enabled():
+        return []
+
+    rows = _ranked_hits(f'{{title}} : ({match})', kinds, limit)
+    if len(rows) < limit:
+        rows += _ranked_hits(match, kinds, limit - len(rows), exclude=[row[0] for row in rows])
+
+    return [
+        {
+            'type': kind,
+            'id': object_id,
+            'course_id': course_id,
+            'title': title,
+            'snippet': highlight(snippet),
+            'score': round(-rank, 4),
+        }
+        for _, kind, object_id, course_id, title, snippet, rank in rows
+    ]
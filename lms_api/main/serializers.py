@@ -1,15 +1,14 @@
 from rest_framework import serializers
-from .models import Teacher , Student , Course ,  CourseCategory , Enrollment , Lesson , LessonCategory , LessonFile , Assignment , Submission , Quiz , Question , Answer , Result , Payment , Feedback , Resource , FileSubmission
+from .models import Teacher , Student , Course ,  CourseCategory , Enrollment , Lesson , LessonCategory , LessonFile , Assignment , Submission , Quiz , Question , Answer , Result , Payment , Feedback , Resource , FileSubmission , UploadSession
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 
 class TeacherSerializer(serializers.ModelSerializer):
     user_details = serializers.SerializerMethodField(read_only=True)
-    courses_count = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = Teacher
-        fields = ['id', 'user', 'user_details', 'qualification', 'mobile_no', 'experience', 'expertise', 'courses_count']
+        fields = ['id', 'user', 'user_details', 'qualification', 'mobile_no', 'experience', 'expertise', 'courses_count', 'updated_at']
     
     def get_user_details(self, obj):
         return {
@@ -18,9 +17,6 @@ class TeacherSerializer(serializers.ModelSerializer):
             'email': obj.user.email,
             'name': obj.user.get_full_name() or obj.user.username
         }
-    
-    def get_courses_count(self, obj):
-        return obj.courses.count()
 
 class StudentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,12 +31,11 @@ class CourseCategorySerializer(serializers.ModelSerializer):
 class CourseSerializer(serializers.ModelSerializer):
     category_details = CourseCategorySerializer(source='category', read_only=True)
     teacher_details = serializers.SerializerMethodField(read_only=True)
-    enrollment_count = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = Course
-        fields = ['id', 'category', 'category_details', 'teacher', 'teacher_details', 'code', 'title', 'description', 'price', 'is_available', 'created_at', 'enrollment_count']
-        read_only_fields = ['id', 'teacher', 'teacher_details', 'created_at', 'enrollment_count']
+        fields = ['id', 'category', 'category_details', 'teacher', 'teacher_details', 'code', 'title', 'description', 'price', 'is_available', 'created_at', 'updated_at', 'enrollment_count']
+        read_only_fields = ['id', 'teacher', 'teacher_details', 'created_at', 'updated_at', 'enrollment_count']
     
     def get_teacher_details(self, obj):
         try:
@@ -54,10 +49,6 @@ class CourseSerializer(serializers.ModelSerializer):
         except:
             return None
     
-    def get_enrollment_count(self, obj):
-        """Count the number of enrollments for this course"""
-        return obj.enrollment_set.count()
-
 class EnrollmentSerializer(serializers.ModelSerializer):
     course_details = CourseSerializer(source='course', read_only=True)
     student_name = serializers.CharField(source='student.user.get_full_name', read_only=True)
@@ -77,8 +68,8 @@ class LessonSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Lesson
-        fields = ['id', 'course', 'category', 'category_details', 'title', 'content', 'upload_date', 'video_url', 'order', 'files']
-        read_only_fields = ['id', 'course', 'upload_date']
+        fields = ['id', 'course', 'category', 'category_details', 'title', 'content', 'upload_date', 'video_url', 'order', 'files', 'updated_at']
+        read_only_fields = ['id', 'course', 'upload_date', 'updated_at']
     
     def get_files(self, obj):
         files = obj.files.all()
@@ -88,8 +79,8 @@ class LessonSerializer(serializers.ModelSerializer):
 class LessonFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = LessonFile
-        fields = ['id', 'lesson', 'title', 'file_url']
-        read_only_fields = ['id']
+        fields = ['id', 'lesson', 'title', 'file_url', 'updated_at']
+        read_only_fields = ['id', 'updated_at']
 
 
 class AssignmentSerializer(serializers.ModelSerializer):
@@ -103,8 +94,8 @@ class SubmissionSerializer(serializers.ModelSerializer):
 class QuizSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quiz
-        fields = ['id', 'lesson_category', 'title', 'description', 'total_marks', 'duration', 'order']
-        read_only_fields = ['id']
+        fields = ['id', 'lesson_category', 'title', 'description', 'total_marks', 'duration', 'order', 'updated_at']
+        read_only_fields = ['id', 'updated_at']
 
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -119,6 +110,53 @@ class QuestionSerializer(serializers.ModelSerializer):
         model = Question
         fields = ['id', 'quiz', 'text', 'marks', 'answers']
         read_only_fields = ['id']
+
+class StudentAnswerSerializer(serializers.ModelSerializer):
+    """Answer option as shown to quiz takers, without the answer key"""
+    class Meta:
+        model = Answer
+        fields = ['id', 'question', 'text']
+        read_only_fields = ['id', 'question', 'text']
+
+class StudentQuestionSerializer(serializers.ModelSerializer):
+    """Question as shown to quiz takers, without the answer key"""
+    answers = StudentAnswerSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ['id', 'quiz', 'text', 'marks', 'answers']
+        read_only_fields = ['id', 'quiz', 'text', 'marks']
+
+class QuizSubmissionSerializer(serializers.Serializer):
+    answers = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+
+class NestedAnswerSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    text = serializers.CharField()
+    is_correct = serializers.BooleanField(default=False)
+
+class NestedQuestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    text = serializers.CharField()
+    marks = serializers.IntegerField(min_value=0, default=1)
+    answers = NestedAnswerSerializer(many=True)
+
+    def validate_answers(self, value):
+        if not value:
+            raise serializers.ValidationError("Add at least one answer")
+        if not any(answer['is_correct'] for answer in value):
+            raise serializers.ValidationError("Mark at least one answer as correct")
+        return value
+
+class QuizAuthoringSerializer(serializers.ModelSerializer):
+    """Quiz with its full question and answer tree, written in one request"""
+    questions = NestedQuestionSerializer(many=True)
+
+    class Meta:
+        model = Quiz
+        fields = ['id', 'lesson_category', 'title', 'description', 'total_marks', 'duration', 'order', 'questions']
+        read_only_fields = ['id', 'total_marks']
+        extra_kwargs = {'lesson_category': {'required': True, 'allow_null': False}}
 class ResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = Result
@@ -141,6 +179,7 @@ class FileSubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = FileSubmission
         fields = '__all__'
+        read_only_fields = ['student']
 
     
 class RegisterSerializer(serializers.ModelSerializer):
@@ -194,6 +233,15 @@ class LoginSerializer(serializers.Serializer):
         raise serializers.ValidationError("Invalid credentials")
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'sha256', 'received', 'created_at', 'updated_at', 'completed_at']
+        read_only_fields = ['received', 'created_at', 'updated_at', 'completed_at']
+
+
 class OTPSerializer(serializers.Serializer):
     phone_number = serializers.CharField(max_length=20)
     otp_code = serializers.CharField(max_length=6, required=False)
@@ -0,0 +1,238 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .models import Teacher, Student, CourseCategory, Course, Enrollment, LessonCategory, Lesson, LessonFile, Quiz, Question, Answer, Resource, FileSubmission, Payment, Result, Feedback
+from .cache_service import bump_version_on_commit
+from .authentication import invalidate_token, invalidate_user_tokens
+from .search_service import index_object, index_course_lessons, remove_object
+from .blob_store import adjust_blob_refs
+from .analytics_service import contribution, apply_contribution
+from .counter_service import adjust_counter
+
+
+# Resource names whose version keys the response cache depends on
+CACHED_RESOURCES = {
+    User: 'user',
+    Teacher: 'teacher',
+    CourseCategory: 'course_category',
+    Course: 'course',
+    Enrollment: 'enrollment',
+    LessonCategory: 'lesson_category',
+    Lesson: 'lesson',
+    LessonFile: 'lesson_file',
+    Quiz: 'quiz',
+    Question: 'question',
+    Answer: 'answer',
+}
+
+
+@receiver([post_save, post_delete])
+def resource_changed(sender, **kwargs):
+    name = CACHED_RESOURCES.get(sender)
+    if name is not None:
+        bump_version_on_commit('resource', name)
+
+
+def bump_course_versions(course_ids):
+    for course_id in set(course_ids):
+        if course_id is not None:
+            bump_version_on_commit('course', course_id)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    bump_course_versions([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Teacher)
+def teacher_changed(sender, instance, **kwargs):
+    bump_course_versions(Course.objects.filter(teacher_id=instance.id).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=CourseCategory)
+def course_category_changed(sender, instance, **kwargs):
+    bump_course_versions(Course.objects.filter(category_id=instance.id).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=LessonCategory)
+@receiver([post_save, post_delete], sender=Lesson)
+def course_child_changed(sender, instance, **kwargs):
+    bump_course_versions([instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=LessonFile)
+def lesson_file_changed(sender, instance, **kwargs):
+    bump_course_versions(Lesson.objects.filter(id=instance.lesson_id).values_list('course_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    bump_version_on_commit('quiz', instance.id)
+    bump_course_versions(
+        LessonCategory.objects.filter(id=instance.lesson_category_id).values_list('course_id', flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    bump_version_on_commit('quiz', instance.quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    for quiz_id in Question.objects.filter(id=instance.question_id).values_list('quiz_id', flat=True):
+        bump_version_on_commit('quiz', quiz_id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Teacher)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    index_object('course', instance.id)
+    index_course_lessons(instance.id)
+
+
+@receiver(post_save, sender=Lesson)
+def index_lesson(sender, instance, **kwargs):
+    index_object('lesson', instance.id)
+
+
+@receiver(post_save, sender=CourseCategory)
+def index_course_category(sender, instance, **kwargs):
+    index_object('category', instance.id)
+
+
+@receiver(post_save, sender=Teacher)
+def index_teacher(sender, instance, **kwargs):
+    index_object('teacher', instance.id)
+
+
+@receiver(post_save, sender=User)
+def index_teacher_user(sender, instance, **kwargs):
+    for teacher_id in Teacher.objects.filter(user_id=instance.id).values_list('id', flat=True):
+        index_object('teacher', teacher_id)
+
+
+# Search kinds of the indexed models, used to drop their rows on delete
+SEARCH_KINDS = {
+    Course: 'course',
+    Lesson: 'lesson',
+    CourseCategory: 'category',
+    Teacher: 'teacher',
+}
+
+
+@receiver(post_delete)
+def unindex_object(sender, instance, **kwargs):
+    kind = SEARCH_KINDS.get(sender)
+    if kind is not None:
+        remove_object(kind, instance.id)
+
+
+@receiver(pre_save, sender=LessonFile)
+@receiver(pre_save, sender=Resource)
+@receiver(pre_save, sender=FileSubmission)
+def remember_file_url(sender, instance, **kwargs):
+    instance._previous_file_url = None
+    if instance.pk is not None:
+        instance._previous_file_url = sender.objects.filter(pk=instance.pk).values_list('file_url', flat=True).first()
+
+
+@receiver(post_save, sender=LessonFile)
+@receiver(post_save, sender=Resource)
+@receiver(post_save, sender=FileSubmission)
+def file_url_saved(sender, instance, **kwargs):
+    adjust_blob_refs(getattr(instance, '_previous_file_url', None), instance.file_url)
+
+
+@receiver(post_delete, sender=LessonFile)
+@receiver(post_delete, sender=Resource)
+@receiver(post_delete, sender=FileSubmission)
+def file_url_deleted(sender, instance, **kwargs):
+    adjust_blob_refs(instance.file_url, None)
+
+
+@receiver(pre_save, sender=Enrollment)
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Result)
+@receiver(pre_save, sender=Feedback)
+def remember_contribution(sender, instance, **kwargs):
+    previous = sender.objects.filter(pk=instance.pk).first() if instance.pk is not None else None
+    instance._previous_contribution = contribution(previous) if previous else None
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Result)
+@receiver(post_save, sender=Feedback)
+def rollup_saved(sender, instance, **kwargs):
+    apply_contribution(getattr(instance, '_previous_contribution', None), sign=-1)
+    apply_contribution(contribution(instance))
+
+
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Result)
+@receiver(post_delete, sender=Feedback)
+def rollup_deleted(sender, instance, **kwargs):
+    apply_contribution(contribution(instance), sign=-1)
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment_course(sender, instance, **kwargs):
+    instance._previous_course_id = None
+    if instance.pk is not None:
+        instance._previous_course_id = sender.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_counted(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_course_id', None)
+    if created:
+        adjust_counter(Course, 'enrollment_count', instance.course_id, 1)
+    elif previous is not None and previous != instance.course_id:
+        adjust_counter(Course, 'enrollment_count', previous, -1)
+        adjust_counter(Course, 'enrollment_count', instance.course_id, 1)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_uncounted(sender, instance, **kwargs):
+    adjust_counter(Course, 'enrollment_count', instance.course_id, -1)
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_teacher(sender, instance, **kwargs):
+    instance._previous_teacher_id = None
+    if instance.pk is not None:
+        instance._previous_teacher_id = sender.objects.filter(pk=instance.pk).values_list('teacher_id', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+def course_counted(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_teacher_id', None)
+    if created:
+        adjust_counter(Teacher, 'courses_count', instance.teacher_id, 1)
+    elif previous is not None and previous != instance.teacher_id:
+        adjust_counter(Teacher, 'courses_count', previous, -1)
+        adjust_counter(Teacher, 'courses_count', instance.teacher_id, 1)
+
+
+@receiver(post_delete, sender=Course)
+def course_uncounted(sender, instance, **kwargs):
+    adjust_counter(Teacher, 'courses_count', instance.teacher_id, -1)
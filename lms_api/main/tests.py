@@ -0,0 +1,1061 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from . import authentication, blob_store, counter_service, idempotency
+from .models import (
+    Teacher, Student, CourseCategory, Course, Enrollment, Lesson, LessonCategory, LessonFile, Assignment,
+    Resource, Quiz, Question, Answer, Result, Payment, OTP, Blob
+)
+from .throttling import parse_rate
+
+
+def make_teacher(username):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    return Teacher.objects.create(user=user, qualification='-', mobile_no='-', experience=1, expertise='-')
+
+
+def make_student(username):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    return Student.objects.create(user=user, qualification='-', mobile_no='-', address='-', interested_categories='')
+
+
+def make_course(teacher, code, price=0):
+    category, _ = CourseCategory.objects.get_or_create(title='Category', defaults={'description': '-'})
+    return Course.objects.create(
+        category=category, teacher=teacher, code=code, title=code, description='-', price=price
+    )
+
+
+def client_for(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+    return client
+
+
+def public_url(url):
+    """The test server's host is not accepted by URLField, so links are stored under another one"""
+    return url.replace('http://testserver/', 'http://localhost/')
+
+
+def media_name(url):
+    return url.split('/media/', 1)[1]
+
+
+class MediaAccessTests(TestCase):
+    """Who may download uploaded files through /media/"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.teacher = make_teacher('teacher')
+        self.paid = make_course(self.teacher, 'PAID', price=100)
+        self.free = make_course(make_teacher('other_teacher'), 'FREE')
+        self.student = make_student('student')
+        Enrollment.objects.create(student=self.student, course=self.free, status='active')
+
+        self.url = self.upload(self.teacher.user, b'paid lesson notes')
+        lesson = Lesson.objects.create(course=self.paid, title='Lesson', content='-')
+        response = client_for(self.teacher.user).post(
+            '/api/lesson-file/', {'lesson': lesson.pk, 'title': 'Notes', 'file_url': public_url(self.url)}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def upload(self, user, content):
+        response = client_for(user).post(
+            '/api/upload/', {'file': SimpleUploadedFile('notes.txt', content)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['url']
+
+    def download(self, user, url):
+        cache.clear()
+        return client_for(user).get('/media/' + media_name(url))
+
+    def test_course_teacher_and_enrolled_students_download_lesson_files(self):
+        self.assertEqual(self.download(self.teacher.user, self.url).status_code, 200)
+        Enrollment.objects.create(student=self.student, course=self.paid, status='active')
+        response = self.download(self.student.user, self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'paid lesson notes')
+
+    def test_students_not_enrolled_are_refused(self):
+        self.assertEqual(self.download(self.student.user, self.url).status_code, 403)
+
+    def test_students_cannot_add_resources(self):
+        response = client_for(self.student.user).post(
+            '/api/resource/', {'course': self.free.pk, 'title': 'Stolen', 'file_url': public_url(self.url)}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Resource.objects.exists())
+
+    def test_a_resource_linking_someone_elses_upload_grants_nothing(self):
+        response = client_for(self.free.teacher.user).post(
+            '/api/resource/', {'course': self.free.pk, 'title': 'Stolen', 'file_url': public_url(self.url)}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.download(self.student.user, self.url).status_code, 403)
+
+    def test_teachers_cannot_add_resources_to_other_teachers_courses(self):
+        response = client_for(self.free.teacher.user).post(
+            '/api/resource/', {'course': self.paid.pk, 'title': 'Mine', 'file_url': 'http://localhost/x.pdf'}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_uploaders_download_their_own_files_and_nobody_else_does(self):
+        url = self.upload(self.student.user, b'my homework')
+        self.assertEqual(self.download(self.student.user, url).status_code, 200)
+        self.assertEqual(self.download(make_student('classmate').user, url).status_code, 403)
+
+    def test_a_submission_shows_the_file_to_the_assignment_teacher_only(self):
+        Enrollment.objects.create(student=self.student, course=self.paid, status='active')
+        lesson = Lesson.objects.create(course=self.paid, title='Homework', content='-')
+        assignment = Assignment.objects.create(lesson=lesson, title='A', description='-', due_date='2030-01-01', max_marks=10)
+        url = self.upload(self.student.user, b'my homework')
+        response = client_for(self.student.user).post(
+            '/api/filesubmission/', {'assignment': assignment.pk, 'file_url': public_url(url)}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.download(self.teacher.user, url).status_code, 200)
+        self.assertEqual(self.download(self.free.teacher.user, url).status_code, 403)
+
+    def test_a_submission_does_not_unlock_files_for_its_student(self):
+        Enrollment.objects.create(student=self.student, course=self.paid, status='active')
+        lesson = Lesson.objects.create(course=self.paid, title='Homework', content='-')
+        assignment = Assignment.objects.create(lesson=lesson, title='A', description='-', due_date='2030-01-01', max_marks=10)
+        other_file = self.upload(make_teacher('third_teacher').user, b'someone else')
+        client_for(self.student.user).post(
+            '/api/filesubmission/', {'assignment': assignment.pk, 'file_url': public_url(other_file)}, format='json'
+        )
+        self.assertEqual(self.download(self.student.user, other_file).status_code, 403)
+        self.assertEqual(self.download(self.teacher.user, other_file).status_code, 403)
+
+
+    def signed_link(self, user, url):
+        response = client_for(user).post('/api/media-link/', {'url': public_url(url)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['url'].replace('http://testserver', '')
+
+    def test_signed_links_open_the_file_without_the_login_token(self):
+        link = self.signed_link(self.teacher.user, self.url)
+        self.assertNotIn(Token.objects.get(user=self.teacher.user).key, link)
+        response = APIClient().get(link)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'paid lesson notes')
+
+    def test_links_are_only_signed_for_users_with_access(self):
+        response = client_for(self.student.user).post('/api/media-link/', {'url': public_url(self.url)}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_a_signed_link_opens_only_its_own_file(self):
+        other = self.upload(self.teacher.user, b'other notes')
+        link = self.signed_link(self.teacher.user, self.url)
+        signature = link.split('?', 1)[1]
+        response = APIClient().get('/media/' + media_name(other) + '?' + signature)
+        self.assertEqual(response.status_code, 401)
+
+    def test_signed_links_expire(self):
+        link = self.signed_link(self.teacher.user, self.url)
+        with override_settings(MEDIA_LINK_MAX_AGE=-1):
+            self.assertEqual(APIClient().get(link).status_code, 401)
+
+    def test_the_login_token_is_not_accepted_in_the_url(self):
+        key = Token.objects.get(user=self.teacher.user).key
+        response = APIClient().get('/media/' + media_name(self.url) + '?token=' + key)
+        self.assertIn(response.status_code, (401, 403))
+
+
+
+@override_settings(QUIZ_MAX_ATTEMPTS=2)
+class QuizSubmissionTests(TestCase):
+    """Grading through /api/quiz/{id}/submit/ without handing out the answer key"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_teacher('teacher')
+        self.course = make_course(self.teacher, 'C1')
+        section = LessonCategory.objects.create(course=self.course, title='Section')
+        self.quiz = Quiz.objects.create(lesson_category=section, title='Quiz', description='-', total_marks=3, duration=10)
+        self.right, self.wrong = [], []
+        for marks in (1, 2):
+            question = Question.objects.create(quiz=self.quiz, text=f'Q{marks}', marks=marks)
+            self.right.append(Answer.objects.create(question=question, text='right', is_correct=True).pk)
+            self.wrong.append(Answer.objects.create(question=question, text='wrong', is_correct=False).pk)
+        self.student = make_student('student')
+        Enrollment.objects.create(student=self.student, course=self.course, status='active')
+
+    def submit(self, user, answers):
+        return client_for(user).post(f'/api/quiz/{self.quiz.pk}/submit/', {'answers': answers}, format='json')
+
+    def test_answers_are_graded_and_the_attempt_is_recorded(self):
+        response = self.submit(self.student.user, [self.right[0], self.wrong[1]])
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data['score'], 1)
+        self.assertEqual(data['attempts_left'], 1)
+        self.assertEqual(Result.objects.get(student=self.student, quiz=self.quiz).score, 1)
+
+    def test_the_key_is_withheld_until_the_last_attempt(self):
+        first = self.submit(self.student.user, []).json()
+        self.assertTrue(all('correct_answers' not in question for question in first['questions']))
+        last = self.submit(self.student.user, []).json()
+        self.assertEqual(sorted(q['correct_answers'][0] for q in last['questions']), sorted(self.right))
+
+    def test_no_attempts_after_the_limit(self):
+        self.submit(self.student.user, [])
+        self.submit(self.student.user, [])
+        self.assertEqual(self.submit(self.student.user, self.right).status_code, 403)
+        self.assertEqual(Result.objects.filter(student=self.student).count(), 2)
+
+    def test_students_not_enrolled_cannot_submit(self):
+        response = self.submit(make_student('outsider').user, [])
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Result.objects.exists())
+
+    def test_teachers_cannot_submit(self):
+        self.assertEqual(self.submit(self.teacher.user, []).status_code, 403)
+
+    def test_answers_from_other_quizzes_are_rejected(self):
+        other = Quiz.objects.create(title='Other', description='-', total_marks=1, duration=1)
+        answer = Answer.objects.create(question=Question.objects.create(quiz=other, text='Q', marks=1), text='a', is_correct=True)
+        self.assertEqual(self.submit(self.student.user, [answer.pk]).status_code, 400)
+        self.assertFalse(Result.objects.exists())
+
+    def test_students_read_questions_without_the_key(self):
+        response = client_for(self.student.user).get(f'/api/question/?quiz={self.quiz.pk}')
+        self.assertNotIn('is_correct', str(response.content))
+        response = client_for(self.teacher.user).get(f'/api/question/?quiz={self.quiz.pk}')
+        self.assertIn('is_correct', str(response.content))
+
+
+
+class QuizAuthoringTests(TestCase):
+    """Writing a quiz with its questions and answers through /api/quiz/nested/"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_teacher('teacher')
+        self.section = LessonCategory.objects.create(course=make_course(self.teacher, 'C1'), title='Section')
+        self.client = client_for(self.teacher.user)
+
+    def quiz_data(self, questions):
+        return {'lesson_category': self.section.pk, 'title': 'Quiz', 'description': '-', 'duration': 10, 'questions': questions}
+
+    def create(self):
+        response = self.client.post('/api/quiz/nested/', self.quiz_data([
+            {'text': 'Q1', 'marks': 2, 'answers': [{'text': 'a', 'is_correct': True}, {'text': 'b', 'is_correct': False}]},
+            {'text': 'Q2', 'marks': 3, 'answers': [{'text': 'c', 'is_correct': True}]},
+        ]), format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_total_marks_is_the_sum_of_question_marks(self):
+        quiz = self.create()
+        self.assertEqual(quiz['total_marks'], 5)
+        self.assertEqual(Answer.objects.filter(question__quiz_id=quiz['id']).count(), 3)
+
+    def test_update_keeps_matched_rows_and_drops_missing_ones(self):
+        quiz = self.create()
+        first, second = quiz['questions']
+        first['marks'] = 4
+        first['answers'] = first['answers'][:1]
+        response = self.client.put(f"/api/quiz/{quiz['id']}/nested/", self.quiz_data([first]), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_marks'], 4)
+        self.assertEqual(list(Question.objects.filter(quiz_id=quiz['id']).values_list('id', flat=True)), [first['id']])
+        self.assertEqual(Answer.objects.filter(question_id=first['id']).count(), 1)
+        self.assertFalse(Question.objects.filter(pk=second['id']).exists())
+
+    def test_ids_from_other_quizzes_are_rejected(self):
+        quiz = self.create()
+        other = self.create()
+        stolen = other['questions'][0]
+        response = self.client.put(f"/api/quiz/{quiz['id']}/nested/", self.quiz_data([stolen]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Question.objects.filter(pk=stolen['id'], quiz_id=other['id']).exists())
+        self.assertEqual(Question.objects.filter(quiz_id=quiz['id']).count(), 2)
+
+    def test_questions_written_one_at_a_time_keep_total_marks_in_sync(self):
+        quiz = self.create()
+        response = self.client.post('/api/question/', {'quiz': quiz['id'], 'text': 'Q3', 'marks': 5}, format='json')
+        self.assertEqual(Quiz.objects.get(pk=quiz['id']).total_marks, 10)
+        self.client.patch(f"/api/question/{response.json()['id']}/", {'marks': 1}, format='json')
+        self.assertEqual(Quiz.objects.get(pk=quiz['id']).total_marks, 6)
+        self.client.delete(f"/api/question/{quiz['questions'][0]['id']}/")
+        self.assertEqual(Quiz.objects.get(pk=quiz['id']).total_marks, 4)
+
+
+class CursorPaginationTests(TestCase):
+    """Cursor pages over lessons in their (order, id) order"""
+
+    def setUp(self):
+        cache.clear()
+        course = make_course(make_teacher('teacher'), 'C1')
+        self.lessons = [
+            Lesson.objects.create(course=course, title=f'L{i}', content='-', order=i // 2) for i in range(7)
+        ]
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids = []
+        while url:
+            page = self.client.get(url).json()
+            ids.extend(lesson['id'] for lesson in page['results'])
+            url = page['next']
+        return ids
+
+    def test_lists_stay_plain_arrays_unless_a_page_is_asked_for(self):
+        response = self.client.get('/api/lesson/')
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 7)
+
+    @override_settings(LEGACY_UNPAGINATED_LISTS=False)
+    def test_lists_are_paginated_by_default_without_the_legacy_switch(self):
+        page = self.client.get('/api/lesson/').json()
+        self.assertEqual(len(page['results']), 7)
+        self.assertIsNone(page['next'])
+
+    def test_pages_follow_the_lesson_order_without_gaps_or_repeats(self):
+        self.assertEqual(self.walk('/api/lesson/?page_size=2'), [lesson.pk for lesson in self.lessons])
+
+    def test_rows_added_before_the_cursor_do_not_shift_later_pages(self):
+        page = self.client.get('/api/lesson/?page_size=3').json()
+        Lesson.objects.create(course=self.lessons[0].course, title='Early', content='-', order=0)
+        ids = [lesson['id'] for lesson in page['results']] + self.walk(page['next'])
+        self.assertEqual(ids, [lesson.pk for lesson in self.lessons])
+
+
+class OwnershipTests(TestCase):
+    """Teachers change content only in their own courses"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_teacher('owner')
+        self.course = make_course(self.owner, 'MINE')
+        self.section = LessonCategory.objects.create(course=self.course, title='Section')
+        self.lesson = Lesson.objects.create(course=self.course, title='Lesson', content='-')
+        self.quiz = Quiz.objects.create(lesson_category=self.section, title='Quiz', description='-', total_marks=1, duration=10)
+        self.question = Question.objects.create(quiz=self.quiz, text='Q', marks=1)
+        self.answer = Answer.objects.create(question=self.question, text='A', is_correct=True)
+
+        self.other = make_teacher('other')
+        self.other_course = make_course(self.other, 'THEIRS')
+        self.other_quiz = Quiz.objects.create(
+            lesson_category=LessonCategory.objects.create(course=self.other_course, title='Section'),
+            title='Quiz', description='-', total_marks=0, duration=10
+        )
+        self.student = make_student('student')
+
+    def test_owners_add_and_edit_content(self):
+        client = client_for(self.owner.user)
+        response = client.post('/api/lesson/', {'course': self.course.pk, 'title': 'New', 'content': '-'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = client.post('/api/question/', {'quiz': self.quiz.pk, 'text': 'Q2', 'marks': 2}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = client.patch(f'/api/answer/{self.answer.pk}/', {'text': 'B'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_teachers_cannot_add_to_the_course(self):
+        client = client_for(self.other.user)
+        requests = [
+            ('/api/lesson/', {'course': self.course.pk, 'title': 'New', 'content': '-'}),
+            ('/api/lesson-category/', {'course': self.course.pk, 'title': 'New'}),
+            ('/api/lesson-file/', {'lesson': self.lesson.pk, 'title': 'New', 'file_url': 'http://localhost/notes.pdf'}),
+            ('/api/quiz/', {'lesson_category': self.section.pk, 'title': 'New', 'description': '-', 'total_marks': 1, 'duration': 1}),
+            ('/api/question/', {'quiz': self.quiz.pk, 'text': 'New', 'marks': 1}),
+            ('/api/answer/', {'question': self.question.pk, 'text': 'New', 'is_correct': False}),
+        ]
+        for url, data in requests:
+            with self.subTest(url=url):
+                self.assertEqual(client.post(url, data, format='json').status_code, 403)
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 1)
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_other_teachers_cannot_edit_or_delete(self):
+        client = client_for(self.other.user)
+        self.assertEqual(client.patch(f'/api/lesson/{self.lesson.pk}/', {'title': 'Taken'}, format='json').status_code, 403)
+        self.assertEqual(client.patch(f'/api/course/{self.course.pk}/', {'title': 'Taken'}, format='json').status_code, 403)
+        self.assertEqual(client.delete(f'/api/question/{self.question.pk}/').status_code, 403)
+        self.assertEqual(client.patch(f'/api/answer/{self.answer.pk}/', {'is_correct': False}, format='json').status_code, 403)
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.title, 'Lesson')
+        self.assertTrue(Answer.objects.get(pk=self.answer.pk).is_correct)
+
+    def test_rows_cannot_be_moved_into_someone_elses_course(self):
+        response = client_for(self.other.user).post(
+            '/api/question/', {'quiz': self.other_quiz.pk, 'text': 'Mine', 'marks': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        response = client_for(self.other.user).patch(
+            f"/api/question/{response.json()['id']}/", {'quiz': self.quiz.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_nested_quizzes_only_go_into_own_sections(self):
+        quiz = {
+            'lesson_category': self.section.pk, 'title': 'Nested', 'description': '-', 'duration': 10,
+            'questions': [{'text': 'Q', 'marks': 1, 'answers': [{'text': 'A', 'is_correct': True}]}],
+        }
+        self.assertEqual(client_for(self.other.user).post('/api/quiz/nested/', quiz, format='json').status_code, 403)
+        self.assertEqual(client_for(self.owner.user).post('/api/quiz/nested/', quiz, format='json').status_code, 201)
+
+    def test_students_cannot_write(self):
+        client = client_for(self.student.user)
+        self.assertEqual(client.post('/api/lesson/', {'course': self.course.pk, 'title': 'New', 'content': '-'}, format='json').status_code, 403)
+        self.assertEqual(client.patch(f'/api/quiz/{self.quiz.pk}/', {'title': 'Taken'}, format='json').status_code, 403)
+
+    def test_anonymous_users_read_but_cannot_write(self):
+        client = APIClient()
+        self.assertEqual(client.get(f'/api/lesson/{self.lesson.pk}/').status_code, 200)
+        self.assertIn(client.delete(f'/api/lesson/{self.lesson.pk}/').status_code, (401, 403))
+
+
+class ConditionalGetTests(TestCase):
+    """ETag and Last-Modified on cached read endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_teacher('teacher')
+        self.course = make_course(self.teacher, 'C1')
+        self.url = f'/api/course/{self.course.pk}/'
+        self.client = APIClient()
+
+    def test_an_unchanged_resource_answers_304(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        repeat = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.content, b'')
+        self.assertEqual(repeat['ETag'], first['ETag'])
+
+    def test_a_change_gives_a_new_etag(self):
+        first = self.client.get(self.url)
+        # Cached versions are bumped once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client_for(self.teacher.user).patch(self.url, {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        after = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['title'], 'Renamed')
+        self.assertNotEqual(after['ETag'], first['ETag'])
+
+
+class SearchTests(TestCase):
+    """Full-text search through /api/search/"""
+
+    def setUp(self):
+        cache.clear()
+        self.course = make_course(make_teacher('teacher'), 'C1')
+        self.lesson = Lesson.objects.create(
+            course=self.course, title='Photosynthesis', content='<script>alert(1)</script> chlorophyll absorbs light'
+        )
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get('/api/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_snippets_escape_indexed_html_and_mark_matches(self):
+        [hit] = self.search('chlorophyll')
+        self.assertEqual((hit['type'], hit['id']), ('lesson', self.lesson.pk))
+        self.assertNotIn('<script>', hit['snippet'])
+        self.assertIn('&lt;script&gt;', hit['snippet'])
+        self.assertIn('<mark>chlorophyll</mark>', hit['snippet'])
+
+    def test_the_last_word_matches_as_a_prefix(self):
+        self.assertEqual([hit['id'] for hit in self.search('photosyn')], [self.lesson.pk])
+
+    def test_query_syntax_is_treated_as_plain_text(self):
+        for query in ['"photosynthesis', 'title:photosynthesis', 'NEAR(a b)', 'light OR', '*', 'a AND (b']:
+            with self.subTest(query=query):
+                self.search(query)
+
+    def test_unavailable_courses_and_their_lessons_are_hidden(self):
+        self.course.is_available = False
+        self.course.save()
+        self.assertEqual(self.search('photosynthesis'), [])
+
+
+class ExportTests(TestCase):
+    """CSV and NDJSON exports are scoped to the exporting teacher's courses"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_teacher('teacher')
+        self.course = make_course(self.teacher, 'MINE', price=10)
+        self.other_course = make_course(make_teacher('other'), 'THEIRS', price=10)
+        self.student = make_student('student')
+        self.student.user.first_name = '=HYPERLINK("http://example.com")'
+        self.student.user.save()
+        for course in (self.course, self.other_course):
+            Enrollment.objects.create(student=self.student, course=course, status='active')
+            Payment.objects.create(student=self.student, course=course, amount=10, payment_status='completed')
+
+    def export(self, user, url):
+        response = client_for(user).get(url)
+        content = b''.join(response.streaming_content).decode() if response.streaming else ''
+        return response, content
+
+    def test_teachers_export_their_own_courses_only(self):
+        response, content = self.export(self.teacher.user, '/api/enrollment/export/csv/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('MINE', content)
+        self.assertNotIn('THEIRS', content)
+        self.assertEqual(len(content.splitlines()), 2)
+
+    def test_staff_export_everything(self):
+        staff = User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True)
+        _, content = self.export(staff, '/api/payment/export/ndjson/')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(sorted(row['course_code'] for row in rows), ['MINE', 'THEIRS'])
+
+    def test_students_cannot_export(self):
+        response, _ = self.export(self.student.user, '/api/payment/export/csv/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_filters_narrow_the_export_and_reject_bad_ids(self):
+        _, content = self.export(self.teacher.user, f'/api/payment/export/ndjson/?course={self.other_course.pk}')
+        self.assertEqual(content, '')
+        response, _ = self.export(self.teacher.user, '/api/enrollment/export/csv/?course=abc')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cells_are_not_exported_as_formulas(self):
+        _, content = self.export(self.teacher.user, '/api/enrollment/export/csv/')
+        self.assertIn("'=HYPERLINK", content)
+
+
+class UploadSessionTests(TestCase):
+    """Chunked, resumable uploads through /api/upload/sessions/"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = make_teacher('teacher').user
+        self.client = client_for(self.user)
+        self.content = os.urandom(3000)
+
+    def open_session(self, **data):
+        response = self.client.post(
+            '/api/upload/sessions/', {'filename': 'video.mp4', 'size': len(self.content), **data}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def send(self, session_id, start, end, checksum=None):
+        chunk = self.content[start:end + 1]
+        return self.client.put(
+            f'/api/upload/sessions/{session_id}/', chunk, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}',
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest()
+        )
+
+    def test_chunks_are_assembled_into_one_stored_file(self):
+        session_id = self.open_session(sha256=hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(self.send(session_id, 0, 999).json()['received'], 1000)
+        self.assertEqual(self.send(session_id, 1000, 2999).json()['received'], 3000)
+        response = self.client.post(f'/api/upload/sessions/{session_id}/complete/')
+        self.assertEqual(response.status_code, 201)
+        name = media_name(response.json()['url'])
+        with blob_store.get_blob_storage().open(name) as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_out_of_order_chunks_are_refused_with_the_resume_offset(self):
+        session_id = self.open_session()
+        self.send(session_id, 0, 999)
+        response = self.send(session_id, 2000, 2999)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 1000)
+
+    def test_a_corrupted_chunk_is_discarded(self):
+        session_id = self.open_session()
+        response = self.send(session_id, 0, 999, checksum='0' * 64)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['received'], 0)
+        self.assertEqual(self.send(session_id, 0, 999).status_code, 200)
+
+    def test_incomplete_uploads_cannot_be_completed(self):
+        session_id = self.open_session()
+        self.send(session_id, 0, 999)
+        self.assertEqual(self.client.post(f'/api/upload/sessions/{session_id}/complete/').status_code, 409)
+
+    def test_sessions_belong_to_their_user(self):
+        session_id = self.open_session()
+        other = client_for(make_student('student').user)
+        self.assertEqual(other.get(f'/api/upload/sessions/{session_id}/').status_code, 404)
+        self.assertEqual(other.post(f'/api/upload/sessions/{session_id}/complete/').status_code, 404)
+
+
+class CounterTests(TestCase):
+    """Denormalized enrollment_count and courses_count"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_teacher('teacher')
+        self.other = make_teacher('other')
+        self.course = make_course(self.teacher, 'C1')
+        self.other_course = make_course(self.other, 'C2')
+        self.student = make_student('student')
+
+    def counts(self):
+        return (
+            Course.objects.get(pk=self.course.pk).enrollment_count,
+            Course.objects.get(pk=self.other_course.pk).enrollment_count,
+            Teacher.objects.get(pk=self.teacher.pk).courses_count,
+            Teacher.objects.get(pk=self.other.pk).courses_count,
+        )
+
+    def test_counters_follow_enrollments_and_courses(self):
+        enrollment = Enrollment.objects.create(student=self.student, course=self.course, status='active')
+        self.assertEqual(self.counts(), (1, 0, 1, 1))
+        enrollment.course = self.other_course
+        enrollment.save()
+        self.assertEqual(self.counts(), (0, 1, 1, 1))
+        self.course.teacher = self.other
+        self.course.save()
+        self.assertEqual(self.counts(), (0, 1, 0, 2))
+        enrollment.delete()
+        self.assertEqual(self.counts(), (0, 0, 0, 2))
+
+    def test_course_reads_report_the_stored_count(self):
+        Enrollment.objects.create(student=self.student, course=self.course, status='active')
+        response = APIClient().get(f'/api/course/{self.course.pk}/')
+        self.assertEqual(response.json()['enrollment_count'], 1)
+
+    def test_reconcile_fixes_drift(self):
+        Enrollment.objects.create(student=self.student, course=self.course, status='active')
+        Course.objects.filter(pk=self.course.pk).update(enrollment_count=5)
+        Teacher.objects.filter(pk=self.other.pk).update(courses_count=0)
+        self.assertEqual(
+            counter_service.reconcile_counters(), {'Course.enrollment_count': 1, 'Teacher.courses_count': 1}
+        )
+        self.assertEqual(self.counts(), (1, 0, 1, 1))
+        self.assertEqual(counter_service.reconcile_counters(dry_run=True), {'Course.enrollment_count': 0, 'Teacher.courses_count': 0})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginThrottleTests(TestCase):
+    """Token bucket throttles on /api/login/"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user('student', 'student@example.com', 'pw')
+        self.client = APIClient()
+
+    def login(self, username='student', password='wrong', address='198.51.100.1'):
+        return self.client.post('/api/login/', {'username': username, 'password': password}, format='json', REMOTE_ADDR=address)
+
+    def test_guessing_one_username_is_throttled_from_any_address(self):
+        for attempt in range(5):
+            self.assertEqual(self.login(address=f'198.51.100.{attempt}').status_code, 400)
+        response = self.login(username=' STUDENT ', password='pw', address='203.0.113.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_one_address_is_throttled_across_usernames(self):
+        for attempt in range(20):
+            self.assertEqual(self.login(username=f'user{attempt}').status_code, 400)
+        self.assertEqual(self.login(username='someone-else').status_code, 429)
+        self.assertEqual(self.login(password='pw', address='198.51.100.2').status_code, 200)
+
+    def test_buckets_refill_over_the_period(self):
+        now = time.time()
+        with mock.patch('main.throttling.time.time', return_value=now):
+            for _ in range(5):
+                self.login()
+            self.assertEqual(self.login().status_code, 429)
+        with mock.patch('main.throttling.time.time', return_value=now + 12):
+            self.assertEqual(self.login().status_code, 400)
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_rates_parse_into_capacity_and_refill_interval(self):
+        self.assertEqual(parse_rate('5/min'), (5, 12))
+        self.assertEqual(parse_rate('3/10min'), (3, 200))
+        with self.assertRaises(ImproperlyConfigured):
+            parse_rate('5/fortnight')
+
+
+@override_settings(AUTH_TOKEN_TTL_HOURS=24, AUTH_TOKEN_REFRESH_MINUTES=60)
+class TokenExpiryTests(TestCase):
+    """Auth tokens that expire after a period without use"""
+
+    def setUp(self):
+        cache.clear()
+        authentication.get_auth_cache().clear()
+        self.user = make_student('student').user
+        self.token = Token.objects.create(user=self.user)
+
+    def age(self, **delta):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(**delta))
+
+    def me(self):
+        return client_for(self.user).get('/api/me/')
+
+    def test_tokens_unused_for_longer_than_the_ttl_are_refused_and_deleted(self):
+        self.age(hours=25)
+        self.assertEqual(self.me().status_code, 401)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+    def test_using_a_token_slides_its_expiry_at_most_once_per_refresh_period(self):
+        self.age(hours=23)
+        self.assertEqual(self.me().status_code, 200)
+        refreshed = Token.objects.get(pk=self.token.pk).created
+        self.assertGreater(refreshed, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.me().status_code, 200)
+        self.assertEqual(Token.objects.get(pk=self.token.pk).created, refreshed)
+
+    def test_a_cached_token_still_expires(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.age(hours=25)
+        with mock.patch('main.authentication.timezone.now', return_value=timezone.now() + timedelta(hours=25)):
+            self.assertEqual(self.me().status_code, 401)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_logging_in_replaces_an_expired_token(self):
+        self.user.set_password('pw')
+        self.user.save()
+        self.age(hours=25)
+        response = APIClient().post('/api/login/', {'username': 'student', 'password': 'pw'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(Token.objects.get(user=self.user).key, self.token.key)
+
+    def test_purge_deletes_only_expired_tokens(self):
+        fresh = Token.objects.create(user=make_student('fresh').user)
+        self.age(hours=25)
+        self.assertEqual(authentication.purge_expired_credentials(), (1, 0))
+        self.assertEqual(list(Token.objects.values_list('pk', flat=True)), [fresh.pk])
+
+
+class BulkEnrollTests(TestCase):
+    """Enrolling a cohort through /api/enrollment/bulk/"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_teacher('teacher')
+        self.course = make_course(self.teacher, 'MINE')
+        self.other_course = make_course(make_teacher('other'), 'THEIRS')
+        self.students = [make_student(f'student{i}') for i in range(3)]
+        Enrollment.objects.create(student=self.students[0], course=self.course, status='active')
+        self.client = client_for(self.teacher.user)
+
+    def bulk(self, data, query='', **kwargs):
+        response = self.client.post('/api/enrollment/bulk/' + query, data, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_json_rows_are_enrolled_and_reported(self):
+        report = self.bulk({
+            'course_ids': [self.course.pk],
+            'usernames': ['student0', 'student1', 'student1', 'nobody'],
+            'student_ids': [self.students[2].pk],
+        }, format='json')
+        self.assertEqual(report['summary'], {'enrolled': 2, 'already_enrolled': 1, 'duplicate': 1, 'error': 1})
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).enrollment_count, 3)
+
+    def test_csv_bodies_take_the_course_from_the_query(self):
+        report = self.bulk('username\nstudent1\nstudent2\n', f'?course_ids={self.course.pk}', content_type='text/csv')
+        self.assertEqual(report['summary']['enrolled'], 2)
+
+    def test_teachers_only_enroll_into_their_own_courses(self):
+        report = self.bulk({'course_ids': [self.other_course.pk], 'usernames': ['student1']}, format='json')
+        self.assertEqual(report['summary']['error'], 1)
+        self.assertFalse(Enrollment.objects.filter(course=self.other_course).exists())
+
+    def test_students_cannot_bulk_enroll(self):
+        response = client_for(self.students[1].user).post(
+            '/api/enrollment/bulk/', {'course_ids': [self.course.pk], 'usernames': ['student1']}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class CheckoutTests(TestCase):
+    """Paying for and enrolling in a course through /api/enrollment/checkout/"""
+
+    def setUp(self):
+        cache.clear()
+        teacher = make_teacher('teacher')
+        self.paid = make_course(teacher, 'PAID', price=250)
+        self.free = make_course(teacher, 'FREE')
+        self.student = make_student('student')
+        self.client = client_for(self.student.user)
+
+    def verify_otp(self, phone_number='03001234567'):
+        OTP.objects.create(
+            phone_number=phone_number, otp_code='123456', is_verified=True,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        return phone_number
+
+    def checkout(self, course, **data):
+        return self.client.post('/api/enrollment/checkout/', {'course_id': course.pk, **data}, format='json')
+
+    def test_paid_checkout_charges_the_course_price_and_consumes_the_otp(self):
+        phone_number = self.verify_otp()
+        response = self.checkout(self.paid, phone_number=phone_number, amount=1)
+        self.assertEqual(response.status_code, 201)
+        payment = Payment.objects.get(student=self.student)
+        self.assertEqual(payment.amount, 250)
+        self.assertEqual(payment.payment_status, 'completed')
+        self.assertTrue(Enrollment.objects.filter(student=self.student, course=self.paid).exists())
+        self.assertFalse(OTP.objects.get(phone_number=phone_number).is_verified)
+
+    def test_paid_courses_need_a_verified_otp(self):
+        self.assertEqual(self.checkout(self.paid).status_code, 400)
+        self.assertEqual(self.checkout(self.paid, phone_number='03001234567').status_code, 403)
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+
+    def test_an_otp_pays_for_one_course_only(self):
+        phone_number = self.verify_otp()
+        other = make_course(self.paid.teacher, 'OTHER', price=100)
+        self.assertEqual(self.checkout(self.paid, phone_number=phone_number).status_code, 201)
+        self.assertEqual(self.checkout(other, phone_number=phone_number).status_code, 403)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_retries_do_not_charge_twice(self):
+        phone_number = self.verify_otp()
+        first = self.checkout(self.paid, phone_number=phone_number)
+        retry = self.checkout(self.paid, phone_number=phone_number)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()['payment']['id'], first.json()['payment']['id'])
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual(Enrollment.objects.count(), 1)
+
+    def test_free_courses_skip_the_otp_and_the_payment(self):
+        response = self.checkout(self.free)
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.json()['payment'])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_paid_courses_cannot_be_enrolled_in_without_checkout(self):
+        response = self.client.post('/api/enrollment/enroll_course/', {'course_id': self.paid.pk}, format='json')
+        self.assertEqual(response.status_code, 402)
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_unavailable_courses_and_teachers_are_refused(self):
+        self.free.is_available = False
+        self.free.save()
+        self.assertEqual(self.checkout(self.free).status_code, 404)
+        response = client_for(self.paid.teacher.user).post(
+            '/api/enrollment/checkout/', {'course_id': self.paid.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class IdempotencyTests(TestCase):
+    """Idempotency-Key on payment, enrollment, submission and result writes"""
+
+    def setUp(self):
+        cache.clear()
+        idempotency.get_idempotency_cache().clear()
+        self.course = make_course(make_teacher('teacher'), 'C1')
+        self.student = make_student('student')
+        self.client = client_for(self.student.user)
+
+    def pay(self, key, amount=10, client=None):
+        return (client or self.client).post(
+            '/api/payment/', {'course': self.course.pk, 'amount': amount, 'payment_status': 'pending'},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_a_repeat_replays_the_first_response(self):
+        first = self.pay('key-1')
+        repeat = self.pay('key-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(repeat.status_code, 201)
+        self.assertEqual(repeat.json(), first.json())
+        self.assertEqual(repeat['Idempotent-Replayed'], 'true')
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_requests_without_a_key_are_not_deduplicated(self):
+        self.pay('')
+        self.pay('')
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_a_key_reused_for_a_different_request_is_refused(self):
+        self.pay('key-1')
+        self.assertEqual(self.pay('key-1', amount=20).status_code, 422)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self.pay('key-1')
+        other = client_for(make_student('other').user)
+        self.assertNotIn('Idempotent-Replayed', self.pay('key-1', client=other))
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_enroll_course_is_replayed_instead_of_reporting_a_duplicate(self):
+        enroll = lambda: self.client.post(
+            '/api/enrollment/enroll_course/', {'course_id': self.course.pk}, format='json', HTTP_IDEMPOTENCY_KEY='enroll'
+        )
+        self.assertEqual(enroll().status_code, 201)
+        self.assertEqual(enroll().status_code, 201)
+        self.assertEqual(Enrollment.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_a_repeat_of_a_request_still_running_is_not_run_again(self):
+        with mock.patch.object(idempotency, 'claim', wraps=idempotency.claim) as claim:
+            self.pay('key-1')
+        _, fingerprint = claim.call_args.args
+        in_flight = 'idempotency:' + hashlib.sha256(f'{self.student.user.pk}:key-2'.encode()).hexdigest()
+        idempotency.get_idempotency_cache().add(in_flight + ':lock', fingerprint)
+        self.assertEqual(self.pay('key-2').status_code, 409)
+        self.assertEqual(Payment.objects.count(), 1)
+
+
+class BlobSweepTests(TestCase):
+    """Deduplicated blobs, their reference counts, and sweep_blobs against references that change while it runs"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.name = blob_store.save_blob(SimpleUploadedFile('notes.txt', b'notes'), 'notes.txt')
+        Blob.objects.filter(name=self.name).update(updated_at=timezone.now() - timedelta(days=2))
+        self.lesson = Lesson.objects.create(course=make_course(make_teacher('teacher'), 'C1'), title='L', content='-')
+
+    def test_unreferenced_old_blobs_are_deleted(self):
+        stats = blob_store.sweep_blobs()
+        self.assertEqual(stats['deleted'], 1)
+        self.assertFalse(Blob.objects.filter(name=self.name).exists())
+        self.assertFalse(blob_store.get_blob_storage().exists(self.name))
+
+    def test_a_blob_referenced_after_the_scan_is_kept(self):
+        scan = blob_store.count_blob_refs
+
+        def scan_then_reference():
+            counts = scan()
+            LessonFile.objects.create(lesson=self.lesson, title='Notes', file_url='http://localhost/media/' + self.name)
+            return counts
+
+        with mock.patch.object(blob_store, 'count_blob_refs', scan_then_reference):
+            stats = blob_store.sweep_blobs()
+        self.assertEqual(stats['deleted'], 0)
+        self.assertEqual(Blob.objects.get(name=self.name).ref_count, 1)
+        self.assertTrue(blob_store.get_blob_storage().exists(self.name))
+
+    def test_a_blob_stored_again_after_the_scan_is_kept(self):
+        scan = blob_store.count_blob_refs
+
+        def scan_then_store():
+            counts = scan()
+            blob_store.save_blob(SimpleUploadedFile('again.txt', b'notes'), 'again.txt')
+            return counts
+
+        with mock.patch.object(blob_store, 'count_blob_refs', scan_then_store):
+            stats = blob_store.sweep_blobs()
+        self.assertEqual(stats['deleted'], 0)
+        self.assertTrue(blob_store.get_blob_storage().exists(self.name))
+
+    def test_identical_content_is_stored_once(self):
+        again = blob_store.save_blob(SimpleUploadedFile('copy.txt', b'notes'), 'copy.txt')
+        self.assertEqual(again, self.name)
+        self.assertEqual(Blob.objects.count(), 1)
+
+    def test_references_follow_file_urls(self):
+        url = 'http://localhost/media/' + self.name
+        first = LessonFile.objects.create(lesson=self.lesson, title='Notes', file_url=url)
+        second = LessonFile.objects.create(lesson=self.lesson, title='Copy', file_url=url)
+        self.assertEqual(Blob.objects.get(name=self.name).ref_count, 2)
+        second.file_url = 'http://example.com/elsewhere.pdf'
+        second.save()
+        first.delete()
+        self.assertEqual(Blob.objects.get(name=self.name).ref_count, 0)
+
+
+REPLICA = 'replica_test'
+
+
+class LaggingReplicaTests(TransactionTestCase):
+    """
+    Reads served from a replica that has not caught up with the primary: a
+    snapshot of the test database taken before the change stands in for it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings[REPLICA] = {
+            **connections['default'].settings_dict, 'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3')
+        }
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        shutil.rmtree(cls.replica_dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('teacher', 't@example.com', 'pw')
+        teacher = Teacher.objects.create(user=user, qualification='-', mobile_no='-', experience=1, expertise='-')
+        category = CourseCategory.objects.create(title='Category', description='-')
+        self.course = Course.objects.create(
+            category=category, teacher=teacher, code='C1', title='Old title', description='-', price=0
+        )
+        # The replica is a snapshot of the primary as it is now
+        self.catch_up_replica()
+
+        replica_settings = override_settings(REPLICA_DATABASES=[REPLICA], RESPONSE_CACHE_ENABLED=True)
+        replica_settings.enable()
+        self.addCleanup(replica_settings.disable)
+
+    def catch_up_replica(self):
+        connections[REPLICA].close()
+        connections['default'].ensure_connection()
+        target = sqlite3.connect(connections.settings[REPLICA]['NAME'])
+        connections['default'].connection.backup(target)
+        target.close()
+
+    def test_replica_serves_reads_that_do_not_go_into_the_cache(self):
+        Course.objects.filter(pk=self.course.pk).update(title='New title')
+
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            response = APIClient().get(f'/api/course/{self.course.pk}/')
+        self.assertEqual(response.json()['title'], 'Old title')
+
+    def test_outline_after_a_write_is_built_from_the_primary(self):
+        self.course.title = 'New title'
+        self.course.save()
+
+        response = APIClient().get(f'/api/course/{self.course.pk}/outline/')
+        self.assertEqual(response.json()['course']['title'], 'New title')
+
+        self.catch_up_replica()
+        response = APIClient().get(f'/api/course/{self.course.pk}/outline/')
+        self.assertEqual(response.json()['course']['title'], 'New title')
@@ -0,0 +1,214 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+PERIOD_RE = re.compile(r'^(\d*)([smhd])')
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Buckets are updated under one of these locks (and, for FileBasedCache, the
+# matching lock file), chosen by key
+LOCK_STRIPES = 64
+_thread_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+def parse_rate(rate):
+    """
+    Parse ``'<burst>/<period>'`` (e.g. ``'5/min'`` or ``'3/10min'``) into
+    (capacity, seconds per token): a bucket holding ``burst`` tokens that
+    refills completely over one period.
+    """
+    burst, period = rate.split('/')
+    match = PERIOD_RE.match(period)
+    if not match:
+        raise ImproperlyConfigured(f"Invalid throttle rate '{rate}'")
+    capacity = int(burst)
+    return capacity, int(match.group(1) or 1) * PERIODS[match.group(2)] / capacity
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket throttle keyed by ``get_ident_value()``.
+
+    The bucket is stored in the cache as its theoretical arrival time (the
+    moment it would be full again, in milliseconds); taking a token adds one
+    interval to it. A request is refused when taking its token would push
+    that time more than ``capacity`` tokens into the future; the token is then
+    given back and ``wait()`` reports when one will be available.
+
+    What concurrent requests can get past the limit depends on the backend:
+
+    * memcached and Redis: ``incr`` is atomic and the buckets are shared by
+      all workers, so the limit holds across them.
+    * FileBasedCache: shared by the workers on one host, but ``incr`` reads,
+      adds and rewrites the file, so two workers can take the same token.
+      Bucket updates are therefore made under a lock file (see
+      ``bucket_lock``), which holds the limit across the workers of one host.
+    * LocMemCache: each worker process has its own buckets, so a client gets
+      up to ``capacity`` tokens per worker. Use LMS_CACHE_BACKEND=file (or a
+      shared cache server) when running several workers.
+
+    ``manage.py benchmark_throttle`` measures how many requests each backend
+    lets through under concurrent load.
+
+    Rates come from ``DEFAULT_THROTTLE_RATES[scope]``; a scope whose rate is
+    None is not throttled.
+    """
+    scope = None
+    cache = cache
+    # Serialise bucket updates in this process and, on FileBasedCache, between processes
+    serialize_updates = True
+
+    def __init__(self):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        if self.scope not in rates:
+            raise ImproperlyConfigured(f"No throttle rate set for scope '{self.scope}'")
+        self.rate = rates[self.scope]
+        self.retry_after = None
+
+    def get_ident_value(self, request, view):
+        """Value the bucket is keyed by, or None to let the request through unthrottled"""
+        raise NotImplementedError('.get_ident_value() must be overridden')
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_value(request, view)
+        if not ident:
+            return None
+        return f'throttle:{self.scope}:' + hashlib.sha256(str(ident).encode()).hexdigest()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        capacity, interval = parse_rate(self.rate)
+        interval_ms = int(interval * 1000)
+        burst_ms = capacity * interval_ms
+        now = int(time.time() * 1000)
+
+        with self.bucket_lock(key):
+            return self.take_token(key, now, interval_ms, burst_ms)
+
+    @contextmanager
+    def bucket_lock(self, key):
+        """
+        Hold the key's lock while its bucket is updated: a thread lock, since
+        the add/incr/set sequence is not atomic as a whole, and for a
+        FileBasedCache also an exclusive lock on a file next to the cache,
+        since its ``incr`` is a read-modify-write shared with other processes.
+        """
+        if not self.serialize_updates:
+            yield
+            return
+        stripe = zlib.crc32(key.encode()) % LOCK_STRIPES
+        with _thread_locks[stripe]:
+            if fcntl is None or not isinstance(self.cache, FileBasedCache):
+                yield
+                return
+            lock_dir = os.path.join(self.cache._dir, 'throttle-locks')
+            os.makedirs(lock_dir, exist_ok=True)
+            with open(os.path.join(lock_dir, f'{stripe}.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def take_token(self, key, now, interval_ms, burst_ms):
+        self.cache.add(key, now, timeout=math.ceil(burst_ms / 1000) + 1)
+        try:
+            arrival = self.cache.incr(key, interval_ms)
+        except ValueError:
+            # Expired between add and incr
+            self.cache.add(key, now, timeout=math.ceil(burst_ms / 1000) + 1)
+            arrival = self.cache.incr(key, interval_ms)
+
+        if arrival - interval_ms < now:
+            # The bucket had refilled completely: start again from now
+            arrival = now + interval_ms
+            self.cache.set(key, arrival, timeout=math.ceil(interval_ms / 1000) + 1)
+            return True
+
+        if arrival - now > burst_ms:
+            self.cache.decr(key, interval_ms)
+            self.retry_after = (arrival - burst_ms - now) / 1000
+            return False
+
+        # Keep the bucket until it would be full again
+        self.cache.touch(key, math.ceil((arrival - now) / 1000) + 1)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Bucket per client address (honours NUM_PROXIES for X-Forwarded-For)"""
+
+    def get_ident_value(self, request, view):
+        return self.get_ident(request)
+
+
+class RequestFieldThrottle(TokenBucketThrottle):
+    """Bucket per value of a request body field, e.g. the username being logged into"""
+    field = None
+
+    def get_ident_value(self, request, view):
+        value = request.data.get(self.field) if hasattr(request.data, 'get') else None
+        if not isinstance(value, str):
+            return None
+        return value.strip().lower()
+
+
+class PhoneNumberThrottle(RequestFieldThrottle):
+    field = 'phone_number'
+
+    def get_ident_value(self, request, view):
+        value = super().get_ident_value(request, view)
+        # Spaces, dashes and a leading + do not make a different number
+        return ''.join(ch for ch in value if ch.isdigit()) if value else None
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login'
+
+
+class LoginUsernameThrottle(RequestFieldThrottle):
+    scope = 'login_username'
+    field = 'username'
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = 'register'
+
+
+class OTPSendIPThrottle(IPThrottle):
+    scope = 'otp_send'
+
+
+class OTPSendPhoneThrottle(PhoneNumberThrottle):
+    scope = 'otp_send_phone'
+
+
+class OTPVerifyIPThrottle(IPThrottle):
+    scope = 'otp_verify'
+
+
+class OTPVerifyPhoneThrottle(PhoneNumberThrottle):
+    scope = 'otp_verify_phone'
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from .models import UploadSession
+from .blob_store import hash_path, store_blob_path
+
+READ_BLOCK_SIZE = 64 * 1024
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """A chunk or finalize request that cannot be applied; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def partial_dir():
+    """
+    Directory holding the partial files of open sessions. It lives inside
+    MEDIA_ROOT so finalizing is a rename on the same filesystem.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, '.partial')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def partial_path(session):
+    return os.path.join(partial_dir(), f'{session.id}.part')
+
+
+def create_session(user, filename, size, sha256=''):
+    max_size = getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+    if size > max_size:
+        raise UploadError(f"File is larger than the {max_size} byte limit", status=413)
+
+    session = UploadSession.objects.create(
+        user=user,
+        filename=get_valid_filename(os.path.basename(filename)),
+        size=size,
+        sha256=sha256.lower(),
+    )
+    # Create the empty partial file up front so chunks can always open it for update
+    open(partial_path(session), 'wb').close()
+    return session
+
+
+def parse_content_range(header, session):
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError("Content-Range must look like 'bytes <first>-<last>/<size>'")
+    start, end, total = (int(value) for value in match.groups())
+    if total != session.size or end < start or end >= total:
+        raise UploadError(f"Content-Range does not fit a file of {session.size} bytes", status=416)
+    return start, end
+
+
+def write_chunk(session, stream, content_range, checksum):
+    """
+    Append one chunk of the request body to the session's partial file.
+
+    The body is copied to disk in small blocks while its sha256 is computed,
+    so nothing larger than a block is held in memory. Chunks must arrive in
+    order: a chunk that does not start at the current offset is rejected with
+    409 and the offset to resume from. If the checksum does not match, the
+    file is truncated back to the previous offset.
+    """
+    if session.completed_at is not None:
+        raise UploadError("Upload is already complete", status=409)
+    if not checksum:
+        raise UploadError("X-Chunk-SHA256 header is required")
+
+    start, end = parse_content_range(content_range, session)
+    if start != session.received:
+        raise UploadError(f"Expected a chunk starting at byte {session.received}", status=409)
+
+    max_chunk = getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 ** 2)
+    length = end - start + 1
+    if length > max_chunk:
+        raise UploadError(f"Chunks may not exceed {max_chunk} bytes", status=413)
+
+    digest = hashlib.sha256()
+    remaining = length
+    with open(partial_path(session), 'r+b') as part:
+        part.seek(start)
+        while remaining:
+            block = stream.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            part.write(block)
+            digest.update(block)
+            remaining -= len(block)
+
+        if remaining or digest.hexdigest() != checksum.lower():
+            part.truncate(start)
+            if remaining:
+                raise UploadError(f"Request body ended {remaining} bytes short of the Content-Range")
+            raise UploadError("Chunk checksum does not match X-Chunk-SHA256", status=422)
+        part.flush()
+        os.fsync(part.fileno())
+
+    # Only advance the offset if no other request moved it meanwhile
+    updated = UploadSession.objects.filter(id=session.id, received=start, completed_at=None).update(
+        received=end + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        raise UploadError("Another chunk was written concurrently; fetch the session and resume", status=409)
+    session.received = end + 1
+    return session
+
+
+def finalize_session(session):
+    """
+    Move a fully received upload into the blob store and return its storage
+    name. The partial file is hard-linked to its content address, so a
+    half-written file never appears at the public path, and content that is
+    already stored is not written again.
+    """
+    if session.completed_at is not None:
+        return session.file_path
+    if session.received != session.size:
+        raise UploadError(f"Only {session.received} of {session.size} bytes have been received", status=409)
+
+    source = partial_path(session)
+    if not os.path.exists(source):
+        # A concurrent finalize already moved the file
+        session.refresh_from_db()
+        if session.completed_at is not None:
+            return session.file_path
+        raise UploadError("Partial file is missing; start a new upload", status=410)
+    digest = hash_path(source)
+    if session.sha256 and digest != session.sha256:
+        raise UploadError("File checksum does not match the sha256 given when the session was created", status=422)
+
+    name = store_blob_path(source, session.filename, digest, user=session.user)
+    os.remove(source)
+
+    session.file_path = name
+    session.completed_at = timezone.now()
+    session.save(update_fields=['file_path', 'completed_at', 'updated_at'])
+    return name
+
+
+def abort_session(session):
+    if session.completed_at is None:
+        try:
+            os.remove(partial_path(session))
+        except FileNotFoundError:
+            pass
+    session.delete()
+
+
+def purge_stale_sessions(hours=24):
+    """Delete sessions idle for longer than ``hours``, with the partial files of unfinished ones"""
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    count = 0
+    for session in stale.iterator():
+        abort_session(session)
+        count += 1
+    return count
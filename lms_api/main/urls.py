@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter 
-from .views import TeacherViewSet, StudentViewSet , CourseViewSet , CourseCategoryViewSet , EnrollmentViewSet , LessonViewSet , LessonCategoryViewSet , LessonFileViewSet , AssignmentViewSet , SubmissionViewSet , QuizViewSet , QuestionViewSet , AnswerViewSet , ResultViewSet , PaymentViewSet , FeedbackViewSet , ResourceViewSet , FileSubmissionViewSet , RegisterView, LoginView, OTPViewSet, CurrentUserView
-from .views import FileUploadView
+from .views import TeacherViewSet, StudentViewSet , CourseViewSet , CourseCategoryViewSet , EnrollmentViewSet , LessonViewSet , LessonCategoryViewSet , LessonFileViewSet , AssignmentViewSet , SubmissionViewSet , QuizViewSet , QuestionViewSet , AnswerViewSet , ResultViewSet , PaymentViewSet , FeedbackViewSet , ResourceViewSet , FileSubmissionViewSet , RegisterView, LoginView, LogoutView, OTPViewSet, CurrentUserView, CacheStatsView, SearchView
+from .views import UploadSessionViewSet
+from .views import FileUploadView, MediaLinkView
 
 router = DefaultRouter()
 router.register(r'teacher', TeacherViewSet)
@@ -23,11 +25,28 @@ router.register(r'feedback', FeedbackViewSet)
 router.register(r'resource', ResourceViewSet)
 router.register(r'filesubmission', FileSubmissionViewSet)
 router.register(r'otp', OTPViewSet, basename='otp')
+router.register(r'upload/sessions', UploadSessionViewSet, basename='upload-session')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('upload/', FileUploadView.as_view(), name='file-upload'),
+    path('media-link/', MediaLinkView.as_view(), name='media-link'),
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('me/', CurrentUserView.as_view(), name='me'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from . import async_views
+
+    # Async-native versions of the hottest reads, ahead of the router's routes
+    urlpatterns = [
+        path('course/', async_views.course_list),
+        path('course/<int:pk>/', async_views.course_detail),
+        path('lesson/', async_views.lesson_list),
+        path('question/', async_views.question_list),
+        path('me/', async_views.current_user),
+    ] + urlpatterns
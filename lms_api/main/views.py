@@ -5,48 +5,77 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.permissions import AllowAny , IsAuthenticated
+from rest_framework.permissions import AllowAny , IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
 
-from .models import Teacher, Student , Course , CourseCategory , Enrollment , Lesson , LessonCategory , LessonFile , Assignment , Submission , Quiz , Question , Answer , Result , Payment , Feedback , Resource , FileSubmission , OTP
-from .serializers import TeacherSerializer, StudentSerializer , CourseSerializer , CourseCategorySerializer , EnrollmentSerializer , LessonSerializer , LessonCategorySerializer , LessonFileSerializer , AssignmentSerializer , SubmissionSerializer , QuizSerializer , QuestionSerializer , AnswerSerializer , ResultSerializer , PaymentSerializer , FeedbackSerializer , ResourceSerializer , FileSubmissionSerializer , RegisterSerializer, LoginSerializer, OTPSerializer
+from .models import Teacher, Student , Course , CourseCategory , Enrollment , Lesson , LessonCategory , LessonFile , Assignment , Submission , Quiz , Question , Answer , Result , Payment , Feedback , Resource , FileSubmission , OTP, UploadSession
+from .serializers import TeacherSerializer, StudentSerializer , CourseSerializer , CourseCategorySerializer , EnrollmentSerializer , LessonSerializer , LessonCategorySerializer , LessonFileSerializer , AssignmentSerializer , SubmissionSerializer , QuizSerializer , QuestionSerializer , AnswerSerializer , ResultSerializer , PaymentSerializer , FeedbackSerializer , ResourceSerializer , FileSubmissionSerializer , RegisterSerializer, LoginSerializer, OTPSerializer, UploadSessionSerializer
+from .serializers import StudentQuestionSerializer, StudentAnswerSerializer, QuizSubmissionSerializer, QuizAuthoringSerializer
 from .otp_service import send_otp_email, verify_otp, is_otp_verified
+from .throttling import (
+    LoginIPThrottle, LoginUsernameThrottle, RegisterIPThrottle,
+    OTPSendIPThrottle, OTPSendPhoneThrottle, OTPVerifyIPThrottle, OTPVerifyPhoneThrottle,
+)
+from .outline_service import get_course_outline
+from .quiz_service import grade_quiz, save_quiz_tree, sync_total_marks
+from .permissions import IsTeacherOwner, TeacherOwnedMixin, is_owner
+from .authentication import issue_token, describe_user, CachedTokenAuthentication, SignedMediaAuthentication
+from .response_cache import CachedResponseMixin, cache_stats
+from .search_service import KINDS, search
+from .export_service import ExportMixin
+from .idempotency import IdempotentMixin
+from .checkout_service import CheckoutError, checkout
+from .enrollment_service import BulkEnrollError, bulk_enroll, rows_from_csv, rows_from_json
+from .blob_store import save_blob
+from .analytics_service import teacher_analytics
+from .media_service import media_path, media_name_from_url, can_access_media, media_response, signed_media_url
+from .upload_service import UploadError, create_session, write_chunk, finalize_session, abort_session
 from django.conf import settings
-from django.core.files.storage import default_storage
-import os
 
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.views import APIView
 
-class TeacherViewSet(viewsets.ModelViewSet):
-    queryset = Teacher.objects.all()
+
+class TeacherViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = Teacher.objects.select_related('user')
     serializer_class = TeacherSerializer
+    cache_resources = ('teacher', 'user', 'course')
     
     def get_permissions(self):
+        if self.action == 'analytics':
+            return [IsAuthenticated()]
         if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
             return [AllowAny()]
         return [IsAuthenticated()]
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Enrollments, revenue, average score and rating per course, and a daily series over ?days= (default 30)"""
+        teacher = self.get_object()
+        if teacher.user_id != request.user.id and not request.user.is_staff:
+            return Response(
+                {"error": "You can only view analytics for your own courses"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        except ValueError:
+            return Response({"error": "days must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(teacher_analytics(teacher, days), status=status.HTTP_200_OK)
     
 class StudentViewSet(viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
     permission_classes = [IsAuthenticated]
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
-    permission_classes = [AllowAny]
-    
-    def get_permissions(self):
-        """
-        GET requests are allowed for anyone (AllowAny)
-        POST/PATCH/DELETE require authentication (IsAuthenticated)
-        """
-        if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
-            return [AllowAny()]
-        return [IsAuthenticated()]
+    cache_resources = ('course', 'course_category', 'teacher', 'user', 'enrollment')
+    permission_classes = [IsTeacherOwner]
     
     def get_queryset(self):
         if self.request.method in ['PATCH', 'PUT', 'DELETE']:
@@ -54,7 +83,7 @@ class CourseViewSet(viewsets.ModelViewSet):
             return Course.objects.all()
         
       
-        return Course.objects.filter(is_available=True)
+        return Course.objects.filter(is_available=True).select_related('category', 'teacher__user')
     
     def perform_create(self, serializer):
         user = self.request.user
@@ -67,25 +96,13 @@ class CourseViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Only teachers can create courses")
     
     def perform_update(self, serializer):
-        user = self.request.user
+        course = serializer.instance
+        is_available_new = serializer.validated_data.get('is_available', course.is_available)
         
-        try:
-            teacher = Teacher.objects.get(user=user)
-            course = self.get_object()
-            
-            if course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only update your own courses")
-            
-            is_available_new = serializer.validated_data.get('is_available', course.is_available)
-            
-            if course.is_available and not is_available_new:
-                Enrollment.objects.filter(course=course).delete()
-            
-            serializer.save()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can update courses")
+        if course.is_available and not is_available_new:
+            Enrollment.objects.filter(course=course).delete()
+        
+        serializer.save()
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_courses(self, request):
@@ -93,7 +110,7 @@ class CourseViewSet(viewsets.ModelViewSet):
         
         try:
             teacher = Teacher.objects.get(user=user)
-            courses = Course.objects.filter(teacher=teacher)
+            courses = Course.objects.filter(teacher=teacher).select_related('category', 'teacher__user')
             serializer = self.get_serializer(courses, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Teacher.DoesNotExist:
@@ -102,6 +119,15 @@ class CourseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def outline(self, request, pk=None):
+        """
+        Return the course, its ordered lesson category tree with lessons, files
+        and quizzes, and the caller's own results as a single document.
+        """
+        course = self.get_object()
+        return Response(get_course_outline(course.id, request.user), status=status.HTTP_200_OK)
+
 
 class FileUploadView(APIView):
     permission_classes = [IsAuthenticated]
@@ -112,27 +138,136 @@ class FileUploadView(APIView):
         if not upload:
             return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # create uploads directory inside MEDIA_ROOT
-        upload_path = os.path.join('uploads', upload.name)
-        saved_path = default_storage.save(upload_path, upload)
+        # identical content is stored once under blobs/ and shared by every row that links to it
+        saved_path = save_blob(upload, upload.name, user=request.user)
         file_url = request.build_absolute_uri(settings.MEDIA_URL + str(saved_path))
         return Response({"url": file_url}, status=status.HTTP_201_CREATED)
 
-class CourseCategoryViewSet(viewsets.ModelViewSet):
+class MediaLinkView(APIView):
+    """Exchange the URL of a media file for a short-lived signed link the browser can open on its own"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        name = media_name_from_url(request.data.get('url'))
+        if name is None or media_path(name) is None:
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not can_access_media(request.user, name):
+            return Response({"error": "You don't have access to this file"}, status=status.HTTP_403_FORBIDDEN)
+        return Response({
+            "url": signed_media_url(request, request.user, name),
+            "expires_in": getattr(settings, 'MEDIA_LINK_MAX_AGE', 600),
+        })
+
+class MediaView(APIView):
+    """Serve uploaded media to users allowed to see it, with range and conditional request support.
+
+    Browsers cannot add an Authorization header to links and <video> sources,
+    so those open a signed link from ``MediaLinkView`` instead.
+    """
+    authentication_classes = [CachedTokenAuthentication, SignedMediaAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, name):
+        path = media_path(name)
+        if path is None:
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not can_access_media(request.user, name):
+            return Response({"error": "You don't have access to this file"}, status=status.HTTP_403_FORBIDDEN)
+        return media_response(request, name, path)
+
+
+class UploadSessionViewSet(viewsets.ViewSet):
+    """Chunked, resumable uploads for files too large for a single request.
+
+    1. ``POST /upload/sessions/`` with ``filename``, ``size`` and optionally the
+       file's ``sha256`` opens a session.
+    2. ``PUT /upload/sessions/{id}/`` sends the next chunk as the raw request
+       body with ``Content-Range: bytes first-last/size`` and
+       ``X-Chunk-SHA256``. After a dropped connection, ``GET`` the session and
+       continue from ``received``.
+    3. ``POST /upload/sessions/{id}/complete/`` publishes the file and returns
+       ``{"url": ...}`` like ``/upload/``.
+    """
+    permission_classes = [IsAuthenticated]
+    lookup_value_regex = '[0-9a-f-]{36}'
+
+    def get_session(self, pk):
+        return get_object_or_404(UploadSession, pk=pk, user=self.request.user)
+
+    def create(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = create_session(request.user, **serializer.validated_data)
+        except UploadError as e:
+            return Response({"error": e.message}, status=e.status)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(UploadSessionSerializer(self.get_session(pk)).data)
+
+    def update(self, request, pk=None):
+        session = self.get_session(pk)
+        try:
+            write_chunk(
+                session, request.stream, request.headers.get('Content-Range'),
+                request.headers.get('X-Chunk-SHA256')
+            )
+        except UploadError as e:
+            return Response({"error": e.message, "received": session.received}, status=e.status)
+        return Response(UploadSessionSerializer(session).data)
+
+    def destroy(self, request, pk=None):
+        abort_session(self.get_session(pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_session(pk)
+        try:
+            saved_path = finalize_session(session)
+        except UploadError as e:
+            return Response({"error": e.message, "received": session.received}, status=e.status)
+        file_url = request.build_absolute_uri(settings.MEDIA_URL + str(saved_path))
+        return Response({"url": file_url}, status=status.HTTP_201_CREATED)
+
+
+class CourseCategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = CourseCategory.objects.all()
     serializer_class = CourseCategorySerializer
+    cache_resources = ('course_category',)
     permission_classes = [AllowAny]
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(IdempotentMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAuthenticated]
+    idempotent_actions = ('enroll_course', 'checkout')
+    export_name = 'enrollments'
+    export_owner_path = 'course__teacher__user'
+    export_filters = {'course': 'course_id', 'status': 'status'}
+    export_columns = (
+        ('id', 'id'),
+        ('student_id', 'student_id'),
+        ('username', 'student__user__username'),
+        ('first_name', 'student__user__first_name'),
+        ('last_name', 'student__user__last_name'),
+        ('email', 'student__user__email'),
+        ('course_id', 'course_id'),
+        ('course_code', 'course__code'),
+        ('course_title', 'course__title'),
+        ('status', 'status'),
+        ('enrollment_date', 'enrollment_date'),
+    )
 
     def get_queryset(self):
         """Filter enrollments based on user role"""
         user = self.request.user
+        enrollments = Enrollment.objects.select_related(
+            'student__user', 'course__category', 'course__teacher__user'
+        )
         if hasattr(user, 'student'):
-            return Enrollment.objects.filter(student__user=user)
-        return Enrollment.objects.all()
+            return enrollments.filter(student__user=user)
+        return enrollments
 
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def enroll_course(self, request):
@@ -163,6 +298,13 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        # Paid courses are enrolled through checkout, which takes the payment
+        if course.price > 0:
+            return Response(
+                {"error": "Paid courses are enrolled through checkout"},
+                status=status.HTTP_402_PAYMENT_REQUIRED
+            )
+        
         enrollment_exists = Enrollment.objects.filter(
             student=student,
             course=course
@@ -174,11 +316,18 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        enrollment = Enrollment.objects.create(
-            student=student,
-            course=course,
-            status=enrollment_status
-        )
+        try:
+            with transaction.atomic():
+                enrollment = Enrollment.objects.create(
+                    student=student,
+                    course=course,
+                    status=enrollment_status
+                )
+        except IntegrityError:
+            return Response(
+                {"error": "You are already enrolled in this course"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         serializer = EnrollmentSerializer(enrollment)
         return Response(
@@ -186,6 +335,78 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """
+        Pay for and enroll in a course in one request: checks the OTP verified
+        for ``phone_number``, then creates the payment and the enrollment and
+        consumes the OTP in a single transaction. Retrying is safe.
+        """
+        try:
+            student = Student.objects.get(user=request.user)
+        except Student.DoesNotExist:
+            return Response(
+                {"error": "Only students can enroll in courses"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        course_id = request.data.get('course_id')
+        if not course_id:
+            return Response(
+                {"error": "course_id is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            enrollment, payment, created = checkout(student, course_id, request.data.get('phone_number'))
+        except (ValueError, TypeError):
+            return Response({"error": "course_id must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        except CheckoutError as e:
+            return Response({"error": e.message}, status=e.status)
+
+        return Response(
+            {
+                "message": "Successfully enrolled in course" if created else "You are already enrolled in this course",
+                "enrollment": EnrollmentSerializer(enrollment).data,
+                "payment": PaymentSerializer(payment).data if payment else None,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_enroll(self, request):
+        """
+        Enroll a cohort in one request. Accepts JSON (``usernames`` and/or
+        ``student_ids`` with ``course_ids``, or ``rows``), a CSV upload in
+        ``file`` or a ``text/csv`` body; CSV may leave out the course column
+        and pass ``course_ids`` instead. Staff can enroll into any course,
+        teachers into their own.
+        """
+        user = request.user
+        if not user.is_staff and not hasattr(user, 'teacher'):
+            return Response(
+                {"error": "Only teachers and staff can bulk enroll students"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            if request.content_type.startswith('text/csv'):
+                options = request.query_params
+                rows = rows_from_csv(request.body.decode('utf-8-sig'), options.get('course_ids', '').split(','))
+            elif 'file' in request.FILES:
+                options = request.data
+                rows = rows_from_csv(request.FILES['file'].read().decode('utf-8-sig'), options.get('course_ids', '').split(','))
+            else:
+                options = request.data
+                rows = rows_from_json(options)
+            report = bulk_enroll(rows, user, options.get('status') or 'active')
+        except UnicodeDecodeError:
+            return Response({"error": "CSV must be UTF-8 encoded"}, status=status.HTTP_400_BAD_REQUEST)
+        except BulkEnrollError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(report, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_enrollments(self, request):
         user = request.user
@@ -198,7 +419,9 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        enrollments = Enrollment.objects.filter(student=student)
+        enrollments = Enrollment.objects.filter(student=student).select_related(
+            'student__user', 'course__category', 'course__teacher__user'
+        )
         serializer = EnrollmentSerializer(enrollments, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -234,23 +457,18 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
                 {"error": "Enrollment not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
-class LessonViewSet(viewsets.ModelViewSet):
+class LessonViewSet(CachedResponseMixin, TeacherOwnedMixin, viewsets.ModelViewSet):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
-    permission_classes = [AllowAny]
-    
-    def get_permissions(self):
-        """
-        GET requests are allowed for anyone (AllowAny)
-        POST/PATCH/DELETE require authentication (IsAuthenticated)
-        """
-        if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
-            return [AllowAny()]
-        return [IsAuthenticated()]
+    cache_resources = ('lesson', 'lesson_category', 'lesson_file')
+    cursor_ordering = ('order', 'id')
+    permission_classes = [IsTeacherOwner]
+    owner_parent_field = 'course'
+    owner_denied_message = "You can only add lessons to your own courses"
     
     def get_queryset(self):
         """Filter lessons by course if course parameter is provided"""
-        queryset = Lesson.objects.all()
+        queryset = Lesson.objects.select_related('category').prefetch_related('files')
         course_id = self.request.query_params.get('course', None)
         
         if course_id is not None:
@@ -258,56 +476,20 @@ class LessonViewSet(viewsets.ModelViewSet):
         
         return queryset
     
-    def perform_create(self, serializer):
-        user = self.request.user
-        course_id = self.request.data.get('course')
+    def get_owner_parent(self, serializer):
+        """The course is read-only on the serializer, so it comes from the request on create"""
+        if serializer.instance is not None:
+            return None
         
         try:
-            teacher = Teacher.objects.get(user=user)
-            course = Course.objects.get(id=course_id)
-            
-            if course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only add lessons to your own courses")
-            
-            serializer.save(course=course)
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can create lessons")
-        except Course.DoesNotExist:
+            return Course.objects.get(id=self.request.data.get('course'))
+        except (Course.DoesNotExist, ValueError, TypeError):
             from rest_framework.exceptions import ValidationError
             raise ValidationError("Course not found")
     
-    def perform_update(self, serializer):
-        user = self.request.user
-        lesson = self.get_object()
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if lesson.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only edit lessons in your own courses")
-            
-            serializer.save()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can edit lessons")
-    
-    def perform_destroy(self, instance):
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if instance.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only delete lessons in your own courses")
-            
-            instance.delete()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can delete lessons")
+    def perform_create(self, serializer):
+        course = self.check_owner_parent(serializer, required=True)
+        serializer.save(course=course)
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_lessons(self, request):
@@ -327,14 +509,14 @@ class LessonViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-class LessonCategoryViewSet(viewsets.ModelViewSet):
+class LessonCategoryViewSet(CachedResponseMixin, TeacherOwnedMixin, viewsets.ModelViewSet):
     queryset = LessonCategory.objects.all()
     serializer_class = LessonCategorySerializer
-    
-    def get_permissions(self):
-        if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
-            return [AllowAny()]
-        return [IsAuthenticated()]
+    cache_resources = ('lesson_category',)
+    cursor_ordering = ('order', 'id')
+    permission_classes = [IsTeacherOwner]
+    owner_parent_field = 'course'
+    owner_denied_message = "You can only add categories to your own courses"
     
     def get_queryset(self):
         """Filter categories by course if course parameter is provided"""
@@ -345,67 +527,15 @@ class LessonCategoryViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(course_id=course_id)
         
         return queryset
-    
-    def perform_create(self, serializer):
-        user = self.request.user
-        course_id = self.request.data.get('course')
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            course = Course.objects.get(id=course_id)
-            
-            if course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only add categories to your own courses")
-            
-            serializer.save(course=course)
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can create categories")
-        except Course.DoesNotExist:
-            from rest_framework.exceptions import ValidationError
-            raise ValidationError("Course not found")
-    
-    def perform_update(self, serializer):
-        user = self.request.user
-        category = self.get_object()
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if category.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only edit categories in your own courses")
-            
-            serializer.save()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can edit categories")
-    
-    def perform_destroy(self, instance):
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if instance.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only delete categories in your own courses")
-            
-            instance.delete()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can delete categories")
 
 
-class LessonFileViewSet(viewsets.ModelViewSet):
+class LessonFileViewSet(CachedResponseMixin, TeacherOwnedMixin, viewsets.ModelViewSet):
     queryset = LessonFile.objects.all()
     serializer_class = LessonFileSerializer
-
-    def get_permissions(self):
-        if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
-            return [AllowAny()]
-        return [IsAuthenticated()]
+    cache_resources = ('lesson_file',)
+    permission_classes = [IsTeacherOwner]
+    owner_parent_field = 'lesson'
+    owner_denied_message = "You don't have permission to add files to this lesson"
 
     def get_queryset(self):
         """Filter files by lesson if provided in query params"""
@@ -415,54 +545,21 @@ class LessonFileViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(lesson=lesson_id)
         return queryset
 
-    def perform_create(self, serializer):
-        """Validate that teacher owns the course before creating file"""
-        lesson = serializer.validated_data.get('lesson')
-        course = lesson.course
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            if course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You don't have permission to add files to this lesson")
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can create lesson files")
-        
-        serializer.save()
-
-    def perform_destroy(self, instance):
-        """Validate ownership before deleting"""
-        course = instance.lesson.course
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            if course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You don't have permission to delete this file")
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can delete lesson files")
-        
-        instance.delete()
-
 
 class AssignmentViewSet(viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
-class SubmissionViewSet(viewsets.ModelViewSet):
+class SubmissionViewSet(IdempotentMixin, viewsets.ModelViewSet):
     queryset = Submission.objects.all()
     serializer_class = SubmissionSerializer
-class QuizViewSet(viewsets.ModelViewSet):
+class QuizViewSet(CachedResponseMixin, TeacherOwnedMixin, viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
-
-    def get_permissions(self):
-        if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
-            return [AllowAny()]
-        return [IsAuthenticated()]
+    cache_resources = ('quiz',)
+    cursor_ordering = ('order', 'id')
+    permission_classes = [IsTeacherOwner]
+    owner_parent_field = 'lesson_category'
+    owner_denied_message = "You don't have permission to add quizzes to this course"
 
     def get_queryset(self):
         """Filter quizzes by lesson_category if provided in query params"""
@@ -472,199 +569,209 @@ class QuizViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(lesson_category=lesson_category_id)
         return queryset.order_by('order')
 
-    def perform_create(self, serializer):
-        """Validate that teacher owns the course before creating quiz"""
-        lesson_category = serializer.validated_data.get('lesson_category')
-        course = lesson_category.course
-        user = self.request.user
-        
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def submit(self, request, pk=None):
+        """
+        Grade the chosen answer ids server-side and record the attempt as the
+        student's result. Students enrolled in the quiz's course get
+        ``QUIZ_MAX_ATTEMPTS`` attempts; the correct answers come back with
+        the last one.
+        """
+        quiz = self.get_object()
+
         try:
-            teacher = Teacher.objects.get(user=user)
-            if course.teacher != teacher:
-                return Response(
-                    {"error": "You don't have permission to add quizzes to this course"},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-        except Teacher.DoesNotExist:
+            student = Student.objects.get(user=request.user)
+        except Student.DoesNotExist:
             return Response(
-                {"error": "Only teachers can create quizzes"},
+                {"error": "Only students can submit quizzes"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        serializer.save()
 
-    def perform_update(self, serializer):
-        """Validate ownership before updating"""
-        quiz = self.get_object()
-        course = quiz.lesson_category.course
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            if course.teacher != teacher:
+        if not Enrollment.objects.filter(student=student, course__lesson_categories__quizzes=quiz).exists():
+            return Response(
+                {"error": "You can only take quizzes of courses you are enrolled in"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = QuizSubmissionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        max_attempts = getattr(settings, 'QUIZ_MAX_ATTEMPTS', 3)
+        with transaction.atomic():
+            attempts = Result.objects.filter(quiz=quiz, student=student).count()
+            if max_attempts and attempts >= max_attempts:
                 return Response(
-                    {"error": "You don't have permission to edit this quiz"},
+                    {"error": f"You have used all {max_attempts} attempts at this quiz"},
                     status=status.HTTP_403_FORBIDDEN
                 )
-        except Teacher.DoesNotExist:
+            attempts += 1
+            last_attempt = bool(max_attempts) and attempts >= max_attempts
+
+            try:
+                grading = grade_quiz(quiz, serializer.validated_data['answers'], reveal_answers=last_attempt)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            result = Result.objects.create(
+                quiz=quiz,
+                student=student,
+                score=grading['marks_obtained'],
+                grade_awarded=grading['grade']
+            )
+
+        return Response(
+            dict(
+                grading,
+                result=ResultSerializer(result).data,
+                attempts_used=attempts,
+                attempts_left=max_attempts - attempts if max_attempts else None,
+            ),
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['post'], url_path='nested', permission_classes=[IsAuthenticated])
+    def create_nested(self, request):
+        """Create a quiz with all its questions and answers in one transaction"""
+        serializer = QuizAuthoringSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        lesson_category = serializer.validated_data['lesson_category']
+        if not is_owner(request, LessonCategory, lesson_category.id):
             return Response(
-                {"error": "Only teachers can edit quizzes"},
+                {"error": "You don't have permission to add quizzes to this course"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        serializer.save()
 
-    def perform_destroy(self, instance):
-        """Validate ownership before deleting"""
-        course = instance.lesson_category.course
-        user = self.request.user
-        
         try:
-            teacher = Teacher.objects.get(user=user)
-            if course.teacher != teacher:
-                return Response(
-                    {"error": "You don't have permission to delete this quiz"},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-        except Teacher.DoesNotExist:
+            quiz = save_quiz_tree(serializer.validated_data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        quiz = Quiz.objects.prefetch_related('questions__answers').get(id=quiz.id)
+        return Response(QuizAuthoringSerializer(quiz).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['put'], url_path='nested', permission_classes=[IsTeacherOwner])
+    def update_nested(self, request, pk=None):
+        """Replace a quiz's questions and answers, rewriting only what changed"""
+        quiz = self.get_object()
+        serializer = QuizAuthoringSerializer(quiz, data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        lesson_category = serializer.validated_data['lesson_category']
+        if not is_owner(request, LessonCategory, lesson_category.id):
             return Response(
-                {"error": "Only teachers can delete quizzes"},
+                {"error": "You don't have permission to edit this quiz"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        instance.delete()
-class QuestionViewSet(viewsets.ModelViewSet):
+
+        try:
+            quiz = save_quiz_tree(serializer.validated_data, quiz=quiz)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        quiz = Quiz.objects.prefetch_related('questions__answers').get(id=quiz.id)
+        return Response(QuizAuthoringSerializer(quiz).data, status=status.HTTP_200_OK)
+class QuestionViewSet(CachedResponseMixin, TeacherOwnedMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
-    
-    def get_permissions(self):
-        if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
-            return [AllowAny()]
-        return [IsAuthenticated()]
+    cache_resources = ('question', 'answer')
+    permission_classes = [IsTeacherOwner]
+    owner_parent_field = 'quiz'
+    owner_denied_message = "You can only add questions to your own quizzes"
     
     def get_queryset(self):
         """Filter questions by quiz if provided in query params"""
-        queryset = Question.objects.all()
+        queryset = Question.objects.prefetch_related('answers')
         quiz_id = self.request.query_params.get('quiz', None)
         if quiz_id:
             queryset = queryset.filter(quiz=quiz_id)
         return queryset
-    
+
+    def get_serializer_class(self):
+        """Only the owning teacher reads questions with the answer key"""
+        if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
+            quiz_id = self.request.query_params.get('quiz', None)
+            pk = self.kwargs.get('pk')
+            if pk is not None:
+                shows_key = is_owner(self.request, Question, pk)
+            elif quiz_id:
+                shows_key = is_owner(self.request, Quiz, quiz_id)
+            else:
+                shows_key = False
+            if not shows_key:
+                return StudentQuestionSerializer
+        return QuestionSerializer
+
+    # Keep the quiz's total_marks equal to the sum of its question marks
+    @transaction.atomic
     def perform_create(self, serializer):
-        quiz_id = self.request.data.get('quiz')
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            quiz = Quiz.objects.get(id=quiz_id)
-            
-            if quiz.lesson_category.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only add questions to your own quizzes")
-            
-            serializer.save()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can create questions")
-        except Quiz.DoesNotExist:
-            from rest_framework.exceptions import ValidationError
-            raise ValidationError("Quiz not found")
-    
+        super().perform_create(serializer)
+        sync_total_marks([serializer.instance.quiz_id])
+
+    @transaction.atomic
     def perform_update(self, serializer):
-        question = self.get_object()
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if question.quiz.lesson_category.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only edit questions in your own quizzes")
-            
-            serializer.save()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can edit questions")
-    
+        previous_quiz_id = serializer.instance.quiz_id
+        super().perform_update(serializer)
+        sync_total_marks({previous_quiz_id, serializer.instance.quiz_id})
+
+    @transaction.atomic
     def perform_destroy(self, instance):
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if instance.quiz.lesson_category.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only delete questions from your own quizzes")
-            
-            instance.delete()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can delete questions")
+        quiz_id = instance.quiz_id
+        super().perform_destroy(instance)
+        sync_total_marks([quiz_id])
 
 
-class AnswerViewSet(viewsets.ModelViewSet):
+class AnswerViewSet(CachedResponseMixin, TeacherOwnedMixin, viewsets.ModelViewSet):
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
-    
-    def get_permissions(self):
+    cache_resources = ('answer',)
+    permission_classes = [IsTeacherOwner]
+    owner_parent_field = 'question'
+    owner_denied_message = "You can only add answers to your own questions"
+
+    def get_queryset(self):
+        """Filter answers by question if provided in query params"""
+        queryset = Answer.objects.all()
+        question_id = self.request.query_params.get('question', None)
+        if question_id:
+            queryset = queryset.filter(question=question_id)
+        return queryset
+
+    def get_serializer_class(self):
+        """Only the owning teacher reads answers with the answer key"""
         if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
-            return [AllowAny()]
-        return [IsAuthenticated()]
-    
-    def perform_create(self, serializer):
-        question_id = self.request.data.get('question')
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            question = Question.objects.get(id=question_id)
-            
-            if question.quiz.lesson_category.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only add answers to your own questions")
-            
-            serializer.save()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can create answers")
-        except Question.DoesNotExist:
-            from rest_framework.exceptions import ValidationError
-            raise ValidationError("Question not found")
-    
-    def perform_update(self, serializer):
-        answer = self.get_object()
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if answer.question.quiz.lesson_category.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only edit answers in your own quizzes")
-            
-            serializer.save()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can edit answers")
-    
-    def perform_destroy(self, instance):
-        user = self.request.user
-        
-        try:
-            teacher = Teacher.objects.get(user=user)
-            
-            if instance.question.quiz.lesson_category.course.teacher != teacher:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("You can only delete answers from your own quizzes")
-            
-            instance.delete()
-        except Teacher.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Only teachers can delete answers")
-class ResultViewSet(viewsets.ModelViewSet):
+            question_id = self.request.query_params.get('question', None)
+            pk = self.kwargs.get('pk')
+            if pk is not None:
+                shows_key = is_owner(self.request, Answer, pk)
+            elif question_id:
+                shows_key = is_owner(self.request, Question, question_id)
+            else:
+                shows_key = False
+            if not shows_key:
+                return StudentAnswerSerializer
+        return AnswerSerializer
+class ResultViewSet(IdempotentMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
     permission_classes = [IsAuthenticated]
+    export_name = 'results'
+    export_owner_path = 'quiz__lesson_category__course__teacher__user'
+    export_filters = {'course': 'quiz__lesson_category__course_id', 'quiz': 'quiz_id'}
+    export_columns = (
+        ('id', 'id'),
+        ('student_id', 'student_id'),
+        ('username', 'student__user__username'),
+        ('first_name', 'student__user__first_name'),
+        ('last_name', 'student__user__last_name'),
+        ('course_id', 'quiz__lesson_category__course_id'),
+        ('quiz_id', 'quiz_id'),
+        ('quiz_title', 'quiz__title'),
+        ('total_marks', 'quiz__total_marks'),
+        ('score', 'score'),
+        ('grade_awarded', 'grade_awarded'),
+    )
     
     def get_queryset(self):
         """Filter results to only show results for the current user if they're a student"""
@@ -676,10 +783,36 @@ class ResultViewSet(viewsets.ModelViewSet):
            
             return Result.objects.all()
         return Result.objects.none()
-class PaymentViewSet(viewsets.ModelViewSet):
+
+    def perform_create(self, serializer):
+        if hasattr(self.request.user, 'student'):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("Quiz results are recorded by submitting the quiz")
+        serializer.save()
+
+    def perform_update(self, serializer):
+        if hasattr(self.request.user, 'student'):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("Students cannot change quiz results")
+        serializer.save()
+class PaymentViewSet(IdempotentMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    export_name = 'payments'
+    export_owner_path = 'course__teacher__user'
+    export_filters = {'course': 'course_id', 'status': 'payment_status'}
+    export_columns = (
+        ('id', 'id'),
+        ('student_id', 'student_id'),
+        ('username', 'student__user__username'),
+        ('email', 'student__user__email'),
+        ('course_id', 'course_id'),
+        ('course_code', 'course__code'),
+        ('amount', 'amount'),
+        ('payment_status', 'payment_status'),
+        ('payment_date', 'payment_date'),
+    )
     
     def get_queryset(self):
         """Filter payments to only show payments for the current user if they're a student"""
@@ -700,45 +833,62 @@ class PaymentViewSet(viewsets.ModelViewSet):
 class FeedbackViewSet(viewsets.ModelViewSet):
     queryset = Feedback.objects.all()
     serializer_class = FeedbackSerializer
-class ResourceViewSet(viewsets.ModelViewSet):
+class ResourceViewSet(TeacherOwnedMixin, viewsets.ModelViewSet):
     queryset = Resource.objects.all()
     serializer_class = ResourceSerializer
+    permission_classes = [IsTeacherOwner]
+    owner_parent_field = 'course'
+    owner_denied_message = "You can only add resources to your own courses"
 class FileSubmissionViewSet(viewsets.ModelViewSet):
     queryset = FileSubmission.objects.all()
     serializer_class = FileSubmissionSerializer
- 
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Students see their own file submissions, teachers the ones made to their assignments"""
+        user = self.request.user
+        if user.is_staff:
+            return FileSubmission.objects.all()
+        if hasattr(user, 'student'):
+            return FileSubmission.objects.filter(student=user.student)
+        return FileSubmission.objects.filter(assignment__lesson__course__teacher__user=user)
+
+    def check_enrolled(self, student, assignment):
+        if not Enrollment.objects.filter(student=student, course_id=assignment.lesson.course_id).exists():
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("You can only submit files to assignments of courses you are enrolled in")
+
+    def perform_create(self, serializer):
+        if not hasattr(self.request.user, 'student'):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("Only students can submit files")
+        student = self.request.user.student
+        self.check_enrolled(student, serializer.validated_data['assignment'])
+        serializer.save(student=student)
+
+    def perform_update(self, serializer):
+        from rest_framework.exceptions import PermissionDenied
+        changed = set(serializer.validated_data)
+        if hasattr(self.request.user, 'student'):
+            if 'grade' in changed:
+                raise PermissionDenied("Students cannot grade their own submissions")
+            if 'assignment' in changed:
+                self.check_enrolled(self.request.user.student, serializer.validated_data['assignment'])
+        elif not self.request.user.is_staff and changed - {'grade'}:
+            raise PermissionDenied("Teachers can only grade file submissions")
+        serializer.save()
+
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterIPThrottle]
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()  
-            token, _ = Token.objects.get_or_create(user=user)
-
-            if hasattr(user, 'student'):
-                role = 'student'
-                profile = user.student
-                profile_data = {
-                    "id": profile.id,
-                    "qualification": profile.qualification,
-                    "mobile_no": profile.mobile_no,
-                    "interested_categories": profile.interested_categories
-                }
-            elif hasattr(user, 'teacher'):
-                role = 'teacher'
-                profile = user.teacher
-                profile_data = {
-                    "id": profile.id,
-                    "qualification": profile.qualification,
-                    "mobile_no": profile.mobile_no,
-                    "experience": profile.experience,
-                    "expertise": profile.expertise
-                }
-            else:
-                role = 'unknown'
-                profile_data = {}
+            token = issue_token(user)
+            role, profile_data = describe_user(user)
 
             return Response({
                 "user_id": user.id,
@@ -754,35 +904,15 @@ class RegisterView(APIView):
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    # Checked before the serializer runs the password hasher
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data
-            token, _ = Token.objects.get_or_create(user=user)
-
-            if hasattr(user, 'student'):
-                role = 'student'
-                profile = user.student
-                profile_data = {
-                    "id": profile.id,
-                    "qualification": profile.qualification,
-                    "mobile_no": profile.mobile_no,
-                    "interested_categories": profile.interested_categories
-                }
-            elif hasattr(user, 'teacher'):
-                role = 'teacher'
-                profile = user.teacher
-                profile_data = {
-                    "id": profile.id,
-                    "qualification": profile.qualification,
-                    "mobile_no": profile.mobile_no,
-                    "experience": profile.experience,
-                    "expertise": profile.expertise
-                }
-            else:
-                role = 'unknown'
-                profile_data = {}
+            token = issue_token(user)
+            role, profile_data = describe_user(user)
 
             return Response({
                 "user_id": user.id,
@@ -796,6 +926,15 @@ class LoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class LogoutView(APIView):
+    """Delete the caller's auth token; the token cache entry is dropped by signal."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        Token.objects.filter(user=request.user).delete()
+        return Response({"message": "Logged out"}, status=status.HTTP_200_OK)
+
+
 class CurrentUserView(APIView):
     """Return current authenticated user's basic info.
 
@@ -805,34 +944,8 @@ class CurrentUserView(APIView):
 
     def get(self, request):
         user = request.user
-        token = None
-        try:
-            token = Token.objects.filter(user=user).first()
-        except Exception:
-            token = None
-
-        if hasattr(user, 'student'):
-            role = 'student'
-            profile = user.student
-            profile_data = {
-                "id": profile.id,
-                "qualification": profile.qualification,
-                "mobile_no": profile.mobile_no,
-                "interested_categories": profile.interested_categories
-            }
-        elif hasattr(user, 'teacher'):
-            role = 'teacher'
-            profile = user.teacher
-            profile_data = {
-                "id": profile.id,
-                "qualification": profile.qualification,
-                "mobile_no": profile.mobile_no,
-                "experience": profile.experience,
-                "expertise": profile.expertise
-            }
-        else:
-            role = 'unknown'
-            profile_data = {}
+        token = request.auth if isinstance(request.auth, Token) else Token.objects.filter(user=user).first()
+        role, profile_data = describe_user(user)
 
         return Response({
             "user_id": user.id,
@@ -844,10 +957,47 @@ class CurrentUserView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class CacheStatsView(APIView):
+    """Report response cache hit/miss counters for this worker process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+class SearchView(APIView):
+    """Full-text search over courses, lessons, course categories and teachers.
+
+    ``q`` is the query text, ``type`` an optional comma separated subset of
+    course, lesson, category and teacher, and ``limit`` caps the hits (max 50).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            return Response(
+                {"error": f"Unknown type: {', '.join(unknown)}. Use {', '.join(KINDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"query": query, "results": search(query, kinds, limit)}, status=status.HTTP_200_OK)
+
+
 class OTPViewSet(viewsets.ViewSet):
     permission_classes = [AllowAny]
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=[OTPSendIPThrottle, OTPSendPhoneThrottle])
     def send_otp(self, request):
         phone_number = request.data.get('phone_number')
         email = request.data.get('email')
@@ -861,7 +1011,7 @@ class OTPViewSet(viewsets.ViewSet):
         result = send_otp_email(phone_number, email)
         return Response(result, status=status.HTTP_200_OK if result['success'] else status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=[OTPVerifyIPThrottle, OTPVerifyPhoneThrottle])
     def verify_otp(self, request):
         """Verify OTP code"""
         serializer = OTPSerializer(data=request.data)